@@ -0,0 +1,65 @@
+from Modules import Module, Splitter, Merger
+
+# Minimal modules used to build synthetic benchmark pipelines
+# Commands are never really run so they only need to be cheap to generate
+
+class BenchmarkTool(Module):
+
+    def __init__(self, module_id, is_docker=False):
+        super(BenchmarkTool, self).__init__(module_id, is_docker)
+        self.output_keys    = ["bench_file"]
+
+    def define_input(self):
+        self.add_argument("bench_file",     is_required=True)
+        self.add_argument("nr_cpus",        is_required=True, default_value=1)
+        self.add_argument("mem",            is_required=True, default_value=1)
+
+    def define_output(self):
+        self.add_output("bench_file", self.generate_unique_file_name(extension=".bench"))
+
+    def define_command(self):
+        return "cat %s > %s" % (self.get_argument("bench_file"), self.get_output("bench_file"))
+
+
+class BenchmarkSplitter(Splitter):
+
+    def __init__(self, module_id, is_docker=False):
+        super(BenchmarkSplitter, self).__init__(module_id, is_docker)
+        self.output_keys    = ["bench_file"]
+
+    def define_input(self):
+        self.add_argument("bench_file",     is_required=True)
+        self.add_argument("nr_splits",      is_required=True, default_value=2)
+        self.add_argument("nr_cpus",        is_required=True, default_value=1)
+        self.add_argument("mem",            is_required=True, default_value=1)
+
+    def define_output(self):
+        # Create the splits
+        for i in range(int(self.get_argument("nr_splits"))):
+            split_id = "s%d" % i
+            self.make_split(split_id=split_id)
+            self.add_output(split_id, "bench_file", self.generate_unique_file_name(split_id, extension=".bench"))
+
+    def define_command(self):
+        return None
+
+
+class BenchmarkMerger(Merger):
+
+    def __init__(self, module_id, is_docker=False):
+        super(BenchmarkMerger, self).__init__(module_id, is_docker)
+        self.output_keys    = ["bench_file"]
+
+    def define_input(self):
+        self.add_argument("bench_file",     is_required=True)
+        self.add_argument("nr_cpus",        is_required=True, default_value=1)
+        self.add_argument("mem",            is_required=True, default_value=1)
+
+    def define_output(self):
+        self.add_output("bench_file", self.generate_unique_file_name(extension=".bench"))
+
+    def define_command(self):
+        bench_files = self.get_argument("bench_file")
+        if not isinstance(bench_files, list):
+            bench_files = [bench_files]
+        return "cat %s > %s" % (" ".join(bench_files), self.get_output("bench_file"))
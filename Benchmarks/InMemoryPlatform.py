@@ -0,0 +1,84 @@
+import logging
+import threading
+
+from System.Platform import Platform, Processor, OutputBuffer
+
+class InMemoryProcessor(Processor):
+    # Processor that only records the commands it's given and completes them instantly
+
+    def __init__(self, name, nr_cpus, mem, disk_space, **kwargs):
+        super(InMemoryProcessor, self).__init__(name, nr_cpus, mem, disk_space, **kwargs)
+
+        # Number of commands run on processor
+        self.nr_cmds = 0
+
+    def create(self):
+        self.set_start_time()
+        super(InMemoryProcessor, self).create()
+
+    def destroy(self, wait=True):
+        self.set_stop_time()
+        super(InMemoryProcessor, self).destroy(wait)
+
+    def run(self, job_name, cmd, num_retries=None, docker_image=None, quiet_failure=False):
+        # Throw error if attempting to run command on stopped processor
+        if self.is_locked():
+            logging.error("(%s) Attempt to run process'%s' on locked processor!" % (self.name, job_name))
+            raise RuntimeError("Attempt to run command on locked processor!")
+
+        self.processes[job_name] = cmd
+        self.nr_cmds += 1
+
+    def wait_process(self, proc_name):
+        # Commands finish as soon as they're run and don't produce any output
+        return "", ""
+
+    def get_output_buffers(self, proc_name):
+        return OutputBuffer(), OutputBuffer()
+
+    def release_output(self, proc_names=None):
+        pass
+
+    def is_process_finished(self, proc_name):
+        return True
+
+    def adapt_cmd(self, cmd):
+        return cmd
+
+
+class InMemoryPlatform(Platform):
+    # Platform whose processors complete instantly so scheduling overhead can be measured on its own
+
+    CONFIG_SPEC = "Benchmarks/InMemoryPlatform.validate"
+
+    def __init__(self, name, platform_config_file, final_output_dir):
+        super(InMemoryPlatform, self).__init__(name, platform_config_file, final_output_dir)
+
+        # Total number of processors and commands run on the platform
+        self.nr_procs   = 0
+        self.nr_cmds    = 0
+        self.__lock     = threading.Lock()
+
+    def init_task_processor(self, name, nr_cpus, mem, disk_space):
+        with self.__lock:
+            self.nr_procs += 1
+        return InMemoryProcessor(name, nr_cpus, mem, disk_space, wrk_dir=self.wrk_dir)
+
+    def init_helper_processor(self, name, nr_cpus, mem, disk_space):
+        return InMemoryProcessor(name, nr_cpus, mem, disk_space, wrk_dir=self.wrk_dir)
+
+    def deallocate_resources(self, proc):
+        # Commands of tasks on shared processors are run on their host and counted when the host is removed
+        if isinstance(proc, InMemoryProcessor):
+            with self.__lock:
+                self.nr_cmds += proc.nr_cmds
+        super(InMemoryPlatform, self).deallocate_resources(proc)
+
+    def publish_report(self, report):
+        pass
+
+    def validate(self):
+        pass
+
+    def clean_up(self):
+        pass
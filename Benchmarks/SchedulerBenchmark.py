@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import shutil
+import logging
+import resource
+import tempfile
+import threading
+from collections import OrderedDict
+
+from System.Graph import Graph, Scheduler, Task
+from System.Datastore import Datastore, ResourceKit, SampleSet
+from Benchmarks import InMemoryPlatform
+
+class SchedulerBenchmark(object):
+    # Run a synthetic pipeline with nested splitters on a platform whose processors complete instantly
+    # Everything measured is overhead of the graph, datastore, and scheduler
+
+    # Module implementing the synthetic pipeline tasks
+    MODULE = "Benchmarks.BenchmarkModules"
+
+    def __init__(self, nr_tasks, depth=2, plat_nr_cpus=1000):
+
+        # Approximate number of tasks in the pipeline once every splitter has been split
+        self.nr_tasks       = nr_tasks
+
+        # Number of nested splitters
+        self.depth          = depth
+
+        # Number of tasks that can run at the same time
+        self.plat_nr_cpus   = plat_nr_cpus
+
+        # Number of splits created by each splitter
+        self.nr_splits      = self.get_nr_splits(nr_tasks, depth)
+
+        # Time spent in each call to the methods being timed (method name -> list of seconds)
+        self.timings        = OrderedDict()
+        self.__timing_lock  = threading.Lock()
+
+    def run(self):
+        # Run benchmark and return its measurements
+        wrk_dir = tempfile.mkdtemp(prefix="cc_bench_")
+        try:
+            return self.__run(wrk_dir)
+        finally:
+            shutil.rmtree(wrk_dir, ignore_errors=True)
+
+    def __run(self, wrk_dir):
+
+        result = OrderedDict()
+        result["nr_tasks"]      = self.nr_tasks
+        result["depth"]         = self.depth
+        result["nr_splits"]     = self.nr_splits
+        result["plat_nr_cpus"]  = self.plat_nr_cpus
+
+        start_rss = self.__get_max_rss()
+
+        # Track number of threads while pipeline runs
+        thread_monitor = ThreadMonitor()
+        thread_monitor.start()
+
+        # Load pipeline components
+        start = time.time()
+        graph       = Graph(self.__write_graph_config(wrk_dir))
+        platform    = InMemoryPlatform("bench", self.__write_platform_config(wrk_dir), "/bench_output/")
+        datastore   = Datastore(graph,
+                                ResourceKit(self.__write_resource_kit(wrk_dir)),
+                                self.__load_sample_set(wrk_dir),
+                                platform)
+        result["load_time"] = time.time() - start
+
+        # Time graph splits and argument resolution
+        graph.split_graph = self.__timed("split_graph", graph.split_graph)
+        datastore.set_task_input_args = self.__timed("set_task_input_args", datastore.set_task_input_args)
+
+        # Run pipeline
+        scheduler = Scheduler(graph, datastore, platform)
+        start = time.time()
+        scheduler.run()
+        result["run_time"] = time.time() - start
+
+        thread_monitor.stop()
+
+        # Check that every task ran
+        if not graph.is_complete():
+            logging.error("Benchmark pipeline didn't complete!")
+            raise RuntimeError("Benchmark pipeline didn't complete!")
+
+        nr_run_tasks = len(scheduler.get_task_workers())
+        result["nr_run_tasks"]          = nr_run_tasks
+        result["nr_procs"]              = platform.nr_procs
+        result["nr_cmds"]               = platform.nr_cmds
+        result["overhead_per_task"]     = result["run_time"] / nr_run_tasks
+        for name, timings in self.timings.items():
+            result["%s_calls" % name]   = len(timings)
+            result["%s_mean" % name]    = sum(timings) / len(timings) if len(timings) > 0 else 0
+            result["%s_max" % name]     = max(timings) if len(timings) > 0 else 0
+        result["task_split_mean"]       = self.__time_task_split()
+        result["peak_threads"]          = thread_monitor.get_peak()
+        result["peak_rss_mb"]           = self.__get_max_rss()
+        result["rss_growth_mb"]         = result["peak_rss_mb"] - start_rss
+        return result
+
+    def __timed(self, name, method):
+        # Wrap a method so the duration of each call is recorded
+        self.timings[name] = []
+
+        def timed_method(*args, **kwargs):
+            start = time.time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                duration = time.time() - start
+                with self.__timing_lock:
+                    self.timings[name].append(duration)
+
+        return timed_method
+
+    def __time_task_split(self, nr_clones=1000):
+        # Return mean time (sec) to clone a task for a split
+        task = Task("bench_task", module=self.MODULE, submodule="BenchmarkTool", final_output=[])
+        start = time.time()
+        for i in range(nr_clones):
+            task.split("bench_splitter", "s%d" % i, None)
+        return (time.time() - start) / nr_clones
+
+    def __write_graph_config(self, wrk_dir):
+        # Pipeline is a chain of nested scatter-gathers:
+        # start -> split_1 -> work_1 -> split_2 -> work_2 ... -> merge_2 -> merge_1 -> end
+        tasks = OrderedDict()
+        tasks["start"] = ("BenchmarkTool", None, {})
+        parent = "start"
+        for level in range(1, self.depth + 1):
+            tasks["split_%d" % level]   = ("BenchmarkSplitter", parent, {"nr_splits": self.nr_splits})
+            tasks["work_%d" % level]    = ("BenchmarkTool", "split_%d" % level, {})
+            parent = "work_%d" % level
+        for level in range(self.depth, 0, -1):
+            tasks["merge_%d" % level]   = ("BenchmarkMerger", parent, {})
+            parent = "merge_%d" % level
+        tasks["end"] = ("BenchmarkTool", parent, {})
+
+        graph_config = os.path.join(wrk_dir, "graph.config")
+        with open(graph_config, "w") as out:
+            for task_id, (submodule, input_from, args) in tasks.items():
+                out.write("[%s]\n" % task_id)
+                out.write("module = %s\n" % self.MODULE)
+                out.write("submodule = %s\n" % submodule)
+                if input_from is not None:
+                    out.write("input_from = %s\n" % input_from)
+                if len(args) > 0:
+                    out.write("    [[args]]\n")
+                    for arg_type, arg_val in args.items():
+                        out.write("    %s = %s\n" % (arg_type, arg_val))
+        return graph_config
+
+    def __write_platform_config(self, wrk_dir):
+        platform_config = os.path.join(wrk_dir, "platform.config")
+        with open(platform_config, "w") as out:
+            out.write("PLAT_MAX_NR_CPUS = %d\n" % self.plat_nr_cpus)
+            out.write("PLAT_MAX_MEM = %d\n" % self.plat_nr_cpus)
+            out.write("PLAT_MAX_DISK_SPACE = %d\n" % (self.plat_nr_cpus * 100))
+            out.write("PROC_MAX_NR_CPUS = 1\n")
+            out.write("PROC_MAX_MEM = 1\n")
+            out.write("PROC_MAX_DISK_SPACE = 100\n")
+        return platform_config
+
+    @staticmethod
+    def __write_resource_kit(wrk_dir):
+        resource_kit = os.path.join(wrk_dir, "resource_kit.config")
+        with open(resource_kit, "w") as out:
+            out.write("[Docker]\n[Path]\n")
+        return resource_kit
+
+    @staticmethod
+    def __load_sample_set(wrk_dir):
+        sample_sheet = os.path.join(wrk_dir, "sample_sheet.json")
+        with open(sample_sheet, "w") as out:
+            json.dump({"samples": [{"name": "bench_sample", "paths": {"bench_file": "gs://bench/bench_sample.bench"}}]}, out)
+        sample_set = SampleSet(sample_sheet)
+
+        # Input sizes are normally set when inputs are validated
+        for sample in sample_set.samples:
+            for path in sample.get_paths().values():
+                path.set_size(1)
+        return sample_set
+
+    @staticmethod
+    def __get_max_rss():
+        # Peak resident memory (MB) of the process
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+    @staticmethod
+    def get_nr_tasks(nr_splits, depth):
+        # Number of tasks in the pipeline once every splitter has been split
+        # Each level adds a splitter and a merger per split of the level above plus a worker per split of its own
+        nr_tasks = 2
+        for level in range(1, depth + 1):
+            nr_tasks += nr_splits ** level + 2 * nr_splits ** (level - 1)
+        return nr_tasks
+
+    @staticmethod
+    def get_nr_splits(nr_tasks, depth):
+        # Return number of splits per splitter that gets closest to the requested number of tasks
+        nr_splits = 1
+        while SchedulerBenchmark.get_nr_tasks(nr_splits + 1, depth) <= nr_tasks:
+            nr_splits += 1
+        above = SchedulerBenchmark.get_nr_tasks(nr_splits + 1, depth) - nr_tasks
+        below = nr_tasks - SchedulerBenchmark.get_nr_tasks(nr_splits, depth)
+        return nr_splits + 1 if above < below else nr_splits
+
+
+class ThreadMonitor(threading.Thread):
+    # Samples the number of live threads in the background to find the peak
+
+    def __init__(self, interval=0.005):
+        super(ThreadMonitor, self).__init__()
+        self.daemon     = True
+        self.interval   = interval
+        self.peak       = threading.active_count()
+        self.__stopped  = threading.Event()
+
+    def run(self):
+        while not self.__stopped.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def stop(self):
+        self.__stopped.set()
+        self.join()
+
+    def get_peak(self):
+        # Don't count the monitor itself
+        return self.peak - 1
+
+
+class BenchmarkResults(object):
+    # Benchmark results stored as JSON lines so runs can be compared across commits
+
+    def __init__(self, results_file):
+        self.results_file = results_file
+
+    def add_result(self, git_version, result):
+        record = OrderedDict()
+        record["git_version"]   = git_version
+        record["timestamp"]     = time.strftime("%Y-%m-%d %H:%M:%S")
+        record["result"]        = result
+        with open(self.results_file, "a") as out:
+            out.write("%s\n" % json.dumps(record))
+
+    def get_result(self, git_version, nr_tasks, depth):
+        # Return latest result of a benchmark run at a commit (None if it wasn't run)
+        if not os.path.exists(self.results_file):
+            return None
+
+        latest = None
+        with open(self.results_file, "r") as results_fh:
+            for line in results_fh:
+                if line.strip() == "":
+                    continue
+                record = json.loads(line, object_pairs_hook=OrderedDict)
+                result = record["result"]
+                if record["git_version"].startswith(git_version) \
+                        and result["nr_tasks"] == nr_tasks and result["depth"] == depth:
+                    latest = result
+        return latest
@@ -0,0 +1,2 @@
+from .InMemoryPlatform import InMemoryPlatform, InMemoryProcessor
+from .SchedulerBenchmark import SchedulerBenchmark, BenchmarkResults
@@ -44,7 +44,7 @@ class Module(object, metaclass=abc.ABCMeta):
     def define_command(self):
         pass
 
-    def add_argument(self, key, is_required=False, is_resource=False, default_value=None):
+    def add_argument(self, key, is_required=False, is_resource=False, default_value=None, is_streamed=False):
 
         # Check if the argument key is present or not
         if key in self.arguments:
@@ -58,7 +58,8 @@ class Module(object, metaclass=abc.ABCMeta):
             self.arguments[key] = Argument(key,
                                            is_required=is_required,
                                            is_resource=is_resource,
-                                           default_value=default_value)
+                                           default_value=default_value,
+                                           is_streamed=is_streamed)
 
             # Set the old value to the new argument
             self.arguments[key].set(old_value)
@@ -68,7 +69,8 @@ class Module(object, metaclass=abc.ABCMeta):
             self.arguments[key] = Argument(key,
                                            is_required=is_required,
                                            is_resource=is_resource,
-                                           default_value=default_value)
+                                           default_value=default_value,
+                                           is_streamed=is_streamed)
 
     def add_output(self, key, value, is_path=True, **kwargs):
         if key in self.output:
@@ -123,6 +125,18 @@ class Module(object, metaclass=abc.ABCMeta):
         # Example: Module that determines how many lines are in a file
         pass
 
+    def process_cmd_output_line(self, line):
+        # Function to be overriden by inheriting classes that process output from their command one line at a time
+        # Lines are read back one at a time so the output never has to be held in memory all at once
+        pass
+
+    def uses_cmd_output(self):
+        # Command output is only read back from the processor for modules that process it
+        return type(self).process_cmd_output is not Module.process_cmd_output
+
+    def uses_cmd_output_lines(self):
+        return type(self).process_cmd_output_line is not Module.process_cmd_output_line
+
     def generate_unique_file_name(self, extension=".dat", output_dir=None):
 
         # Generate file basename
@@ -199,6 +213,10 @@ class Module(object, metaclass=abc.ABCMeta):
             raise RuntimeError("Attempt to set undeclared output type for module!")
         self.output[key] = value
 
+    def restore_output(self, output):
+        # Replace output with output produced by a previous run of the module
+        self.output = output
+
     def get_output_dir(self):
         return self.output_dir
 
@@ -216,13 +234,16 @@ class Module(object, metaclass=abc.ABCMeta):
 
 class Argument(object):
     # Class for holding data and metadata for module input arguments
-    def __init__(self, name, is_required=False, is_resource=False, default_value=None):
+    def __init__(self, name, is_required=False, is_resource=False, default_value=None, is_streamed=False):
 
         self.__name = name
 
         self.__is_required = is_required
         self.__is_resource = is_resource
 
+        # Remote files are read from a named pipe as they're downloaded instead of being downloaded first
+        self.__is_streamed = is_streamed
+
         self.__default_value = default_value
 
         self.__value = None
@@ -247,3 +268,6 @@ class Argument(object):
 
     def is_resource(self):
         return self.__is_resource
+
+    def is_streamed(self):
+        return self.__is_streamed
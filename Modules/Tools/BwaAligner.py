@@ -6,8 +6,8 @@ class BwaAligner(Module):
         self.output_keys = ["bam", "bam_sorted"]
 
     def define_input(self):
-        self.add_argument("R1",             is_required=True)
-        self.add_argument("R2")
+        self.add_argument("R1",             is_required=True, is_streamed=True)
+        self.add_argument("R2",             is_streamed=True)
         self.add_argument("bwa",            is_required=True, is_resource=True)
         self.add_argument("samtools",       is_required=True, is_resource=True)
         self.add_argument("ref",            is_required=True, is_resource=True)
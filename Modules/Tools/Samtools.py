@@ -49,7 +49,7 @@ class Flagstat(Module):
         self.output_keys = ["flagstat"]
 
     def define_input(self):
-        self.add_argument("bam",        is_required=True)
+        self.add_argument("bam",        is_required=True, is_streamed=True)
         self.add_argument("bam_idx",    is_required=True)
         self.add_argument("samtools",   is_required=True, is_resource=True)
         self.add_argument("nr_cpus",    is_required=True, default_value=2)
@@ -222,7 +222,7 @@ class Fastq(Module):
         self.output_keys    = ["R1", "R2"]
 
     def define_input(self):
-        self.add_argument("bam",            is_required=True)
+        self.add_argument("bam",            is_required=True,   is_streamed=True)
         self.add_argument("bam_idx",        is_required=True)
         self.add_argument("samtools",       is_required=True,   is_resource=True)
         self.add_argument("nr_cpus",        is_required=True,   default_value=4)
@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from System.Datastore import GAPFile
+from System.Datastore.RunJournal import encode_output, decode_output
+
+class CallCache(object):
+    # Outputs of successful task calls indexed by a hash of everything that determines them
+    # Used to reuse outputs produced by previous runs instead of running identical calls again
+
+    def __init__(self, cache_file):
+
+        # Path to JSONL file where one record is appended for every successful call
+        self.cache_file = cache_file
+
+        # Encoded output of each call (indexed by call key)
+        self.calls = self.__load()
+
+        # Helper used to make sure cached output files still exist before they're reused
+        self.storage_helper = None
+
+        # Lock for writing to cache from multiple task workers
+        self.__lock = threading.Lock()
+
+    def set_storage_helper(self, storage_helper):
+        self.storage_helper = storage_helper
+
+    def get_call_key(self, task, docker_image=None):
+        # Return hash of the module, resolved arguments, and docker image of a task whose input arguments have been set
+        module = task.module
+        call = OrderedDict()
+        call["task_id"]     = task.get_ID()
+        call["module"]      = "%s.%s" % (module.__class__.__module__, module.__class__.__name__)
+        call["args"]        = OrderedDict((arg_type, self.__describe(arg.get_value()))
+                                          for arg_type, arg in sorted(module.get_arguments().items()))
+        call["docker"]      = None if docker_image is None else [docker_image.get_image_name(), docker_image.get_digest()]
+        call_string         = json.dumps(call, sort_keys=True, default=str)
+        return hashlib.sha256(call_string.encode("utf8")).hexdigest()
+
+    def get_output(self, call_key):
+        # Return output of a previous identical call or None if no call exists or its output files are gone
+        with self.__lock:
+            if call_key not in self.calls:
+                return None
+            output = decode_output(self.calls[call_key])
+
+        # Temporary output of previous runs is removed when they finish so check that output files are still there
+        if self.storage_helper is not None:
+            for output_file in self.__get_files(output):
+                if not self.storage_helper.path_exists(output_file.get_transferrable_path()):
+                    logging.debug("Cached output file '%s' no longer exists!" % output_file.get_path())
+                    return None
+
+        return output
+
+    def add_output(self, call_key, task_id, output):
+        # Append output of a successful call to the cache
+        # Output files are marked with the call that created them so later calls using them depend on it
+        for output_file in self.__get_files(output):
+            output_file.set_metadata("call_key", call_key)
+
+        record = OrderedDict()
+        record["call_key"]  = call_key
+        record["task_id"]   = task_id
+        record["output"]    = encode_output(output)
+
+        with self.__lock:
+            self.calls[call_key] = record["output"]
+            with open(self.cache_file, "a") as cache_fh:
+                cache_fh.write("%s\n" % json.dumps(record))
+
+    def __load(self):
+        # Read calls cached by previous runs. Later calls replace earlier calls with the same key.
+        calls = {}
+        if not os.path.exists(self.cache_file):
+            return calls
+
+        with open(self.cache_file, "r") as cache_fh:
+            for line in cache_fh:
+                if line.strip() == "":
+                    continue
+                try:
+                    record = json.loads(line, object_pairs_hook=OrderedDict)
+                except ValueError:
+                    # Skip records cut off by a pipeline that died while writing them
+                    logging.warning("Ignoring incomplete record in call cache '%s'." % self.cache_file)
+                    continue
+                calls[record["call_key"]] = record["output"]
+
+        return calls
+
+    def __describe(self, value):
+        # Files are identified by their location, size, checksum, and the call that created them (if any)
+        # Output paths don't change between runs so a recomputed input file is only told apart by its call
+        if isinstance(value, GAPFile):
+            call_key = value.get_metadata("call_key") if value.has_metadata_type("call_key") else None
+            return [value.get_transferrable_path(), value.get_size(), value.get_checksum(), call_key]
+        elif isinstance(value, list):
+            return [self.__describe(x) for x in value]
+        return value
+
+    def __get_files(self, value):
+        # Return list of files in (possibly nested) output
+        if isinstance(value, GAPFile):
+            return [value]
+        elif isinstance(value, list):
+            return [x for val in value for x in self.__get_files(val)]
+        elif isinstance(value, dict):
+            return [x for val in value.values() for x in self.__get_files(val)]
+        return []
@@ -35,6 +35,13 @@ class Datastore(object):
             val = self.__get_task_arg(task_id, input_type, is_resource=input_arg.is_resource())
             if val is None:
                 val = input_arg.get_default_value()
+
+            # Mark files the module reads as a stream
+            if input_arg.is_streamed() and val is not None:
+                for arg_val in flatten(val if isinstance(val, list) else [val]):
+                    if isinstance(arg_val, GAPFile):
+                        arg_val.flag("stream")
+
             task_module.set_argument(input_type, val)
             logging.debug("(%s) Arg type: %s, val: %s" % (task_id, input_type, val))
 
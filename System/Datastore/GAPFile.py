@@ -31,6 +31,9 @@ class GAPFile(object):
         # File size
         self.size = kwargs.pop("file_size", None)
 
+        # Checksum identifying file contents
+        self.checksum = kwargs.pop("checksum", None)
+
         # Sample information
         self.sample_name = kwargs.pop("sample_name", None)
 
@@ -91,6 +94,9 @@ class GAPFile(object):
     def get_size(self):
         return self.size
 
+    def get_checksum(self):
+        return self.checksum
+
     def get_protocol(self):
         return self.protocol
 
@@ -108,6 +114,9 @@ class GAPFile(object):
         # Set file size (GB)
         self.size = file_size
 
+    def set_checksum(self, checksum):
+        self.checksum = checksum
+
     def flag(self, flag_type):
         if flag_type not in self.flags:
             self.flags.append(flag_type)
@@ -165,6 +174,31 @@ class GAPFile(object):
             # Remove wildcard character from path is path is prefix
             self.path = self.path.replace("*", "")
 
+    def to_dict(self):
+        # Return file information in a form that can be saved and used to re-create the file
+        return {"file_id": self.file_id,
+                "type": self.type,
+                "path": self.path + "*" if self.__is_prefix else self.path,
+                "containing_dir": self.containing_dir,
+                "size": self.size,
+                "checksum": self.checksum,
+                "sample_name": self.sample_name,
+                "metadata": self.metadata,
+                "flags": self.flags}
+
+    @staticmethod
+    def from_dict(file_data):
+        # Re-create file from information returned by to_dict()
+        gap_file = GAPFile(file_data["file_id"], file_data["type"], file_data["path"],
+                           containing_dir=file_data["containing_dir"],
+                           file_size=file_data["size"],
+                           checksum=file_data.get("checksum"),
+                           sample_name=file_data["sample_name"],
+                           **file_data["metadata"])
+        for flag_type in file_data["flags"]:
+            gap_file.flag(flag_type)
+        return gap_file
+
     def __str__(self):
         return self.path
 
@@ -178,6 +212,7 @@ class GAPFile(object):
         to_return += "is_remote:\t%s\n" % self.is_remote()
         to_return += "is_prefix:\t%s\n" % self.__is_prefix
         to_return += "size:\t%s\n" % self.size
+        to_return += "checksum:\t%s\n" % self.checksum
         to_return += "flags:\t%s\n" % ",".join(self.flags)
         to_return += "=============\n"
         return to_return
@@ -0,0 +1,112 @@
+import os
+import json
+import logging
+from collections import OrderedDict
+
+from System.Datastore import GAPFile
+
+class RunJournal(object):
+    # Append-only record of the tasks completed by a pipeline run
+    # Used to resume a failed run without re-running tasks that already completed
+
+    def __init__(self, journal_file):
+
+        # Path to JSONL file where one record is written for every completed task
+        self.journal_file = journal_file
+
+        # Tasks completed by previous runs (in the order they completed)
+        self.records = self.__load()
+
+        # Handle to journal file. Opened the first time a task is recorded.
+        self.__journal_fh = None
+
+    def get_records(self):
+        return self.records
+
+    def restore(self, graph):
+        # Restore output of tasks completed by previous runs and mark them complete in the graph
+        # Tasks are restored in the order they completed so splits exist before their tasks are restored
+        for record in self.records:
+            task_id = record["task_id"]
+            if task_id not in graph.get_tasks():
+                logging.error("Run journal '%s' records task '%s' which isn't part of the pipeline!" % (self.journal_file, task_id))
+                raise RuntimeError("Run journal doesn't match the pipeline being run!")
+
+            task = graph.get_tasks(task_id)
+            task.module.restore_output(decode_output(record["output"]))
+
+            # Split subgraph if task is a splitter
+            if task.is_splitter_task():
+                graph.split_graph(task_id)
+
+            graph.set_complete(task_id)
+
+        if len(self.records) > 0:
+            logging.info("Restored %d tasks completed by previous runs from journal '%s'." % (len(self.records), self.journal_file))
+
+    def record_task(self, task, runtime, cost, start_time):
+        # Append record of a completed task and its output to the journal
+        record = OrderedDict()
+        record["task_id"]       = task.get_ID()
+        record["start_time"]    = start_time
+        record["runtime"]       = runtime
+        record["cost"]          = cost
+        record["output"]        = encode_output(task.module.get_output())
+
+        if self.__journal_fh is None:
+            self.__journal_fh = open(self.journal_file, "a")
+
+        # Make sure record is on disk before moving on in case the pipeline dies
+        self.__journal_fh.write("%s\n" % json.dumps(record))
+        self.__journal_fh.flush()
+        os.fsync(self.__journal_fh.fileno())
+
+    def close(self):
+        if self.__journal_fh is not None:
+            self.__journal_fh.close()
+            self.__journal_fh = None
+
+    def __load(self):
+        # Read records written by previous runs
+        records = []
+        if not os.path.exists(self.journal_file):
+            return records
+
+        with open(self.journal_file, "r") as journal_fh:
+            lines = journal_fh.read().splitlines()
+
+        for i, line in enumerate(lines):
+            if line.strip() == "":
+                continue
+            try:
+                records.append(json.loads(line, object_pairs_hook=OrderedDict))
+            except ValueError:
+                # Last record may be incomplete if the pipeline died while it was being written
+                if i == len(lines) - 1:
+                    logging.warning("Ignoring incomplete last record in run journal '%s'." % self.journal_file)
+                    continue
+                logging.error("Run journal '%s' is corrupted at line %d!" % (self.journal_file, i + 1))
+                raise IOError("Unable to read run journal!")
+
+        return records
+
+
+def encode_output(value):
+    # Convert module output to values that can be written as JSON
+    if isinstance(value, GAPFile):
+        return {"__gap_file__": value.to_dict()}
+    elif isinstance(value, list):
+        return [encode_output(x) for x in value]
+    elif isinstance(value, dict):
+        return OrderedDict((key, encode_output(val)) for key, val in value.items())
+    return value
+
+def decode_output(value):
+    # Re-create module output from values read as JSON
+    if isinstance(value, dict) and "__gap_file__" in value:
+        return GAPFile.from_dict(value["__gap_file__"])
+    elif isinstance(value, list):
+        return [decode_output(x) for x in value]
+    elif isinstance(value, dict):
+        return OrderedDict((key, decode_output(val)) for key, val in value.items())
+    return value
@@ -1,4 +1,6 @@
 from .GAPFile import GAPFile
 from .Datastore import Datastore
 from .ResourceKit import ResourceKit
-from .SampleSet import SampleSet
\ No newline at end of file
+from .SampleSet import SampleSet
+from .RunJournal import RunJournal
+from .CallCache import CallCache
\ No newline at end of file
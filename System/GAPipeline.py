@@ -1,10 +1,11 @@
+import os
 import logging
 import importlib
 import json
 from collections import OrderedDict
 
 from System.Graph import Graph, Scheduler
-from System.Datastore import ResourceKit, SampleSet, Datastore
+from System.Datastore import ResourceKit, SampleSet, Datastore, RunJournal, CallCache
 from System.Validators import GraphValidator, InputValidator, SampleValidator
 from System.Platform import StorageHelper, DockerHelper
 
@@ -16,7 +17,10 @@ class GAPipeline(object):
                  sample_data_config,
                  platform_config,
                  platform_module,
-                 final_output_dir):
+                 final_output_dir,
+                 runtime_report=None,
+                 journal_file=None,
+                 call_cache_file=None):
 
         # GAP run id
         self.pipeline_id    = pipeline_id
@@ -33,6 +37,15 @@ class GAPipeline(object):
         # Final output directory where output is saved
         self.__final_output_dir     = final_output_dir
 
+        # Report from a previous run used to estimate task runtimes
+        self.__runtime_report       = runtime_report
+
+        # Journal of completed tasks used to resume the pipeline
+        self.__journal_file         = journal_file
+
+        # Cache of task outputs shared across runs
+        self.__call_cache_file      = call_cache_file
+
         # Obtain pipeline name and append to final output dir
 
         self.graph          = None
@@ -46,6 +59,12 @@ class GAPipeline(object):
         # Task scheduler for running jobs
         self.scheduler = None
 
+        # Journal recording tasks as they complete
+        self.journal = None
+
+        # Task outputs that can be reused from previous runs
+        self.call_cache = None
+
         # Helper processor for handling platform operations
         self.helper_processor   = None
         self.storage_helper     = None
@@ -62,14 +81,27 @@ class GAPipeline(object):
         # Load the graph
         self.graph = Graph(self.__graph_config)
 
+        # Prioritize tasks using runtimes from a previous run
+        if self.__runtime_report is not None:
+            self.graph.set_runtime_estimates(GAPReport.get_task_runtimes(self.__runtime_report))
+
         # Load platform
         plat_module     = importlib.import_module(self.__plat_module)
         plat_class      = plat_module.__dict__[self.__plat_module]
         self.platform   = plat_class(self.pipeline_id, self.__platform_config, self.__final_output_dir)
 
+        # Restore tasks completed by previous runs so they aren't run again
+        if self.__journal_file is not None:
+            self.journal = RunJournal(self.__journal_file)
+            self.journal.restore(self.graph)
+
+        # Load outputs of previous runs that can be reused
+        if self.__call_cache_file is not None:
+            self.call_cache = CallCache(self.__call_cache_file)
+
         # Create datastore and scheduler
         self.datastore = Datastore(self.graph, self.resource_kit, self.sample_data, self.platform)
-        self.scheduler = Scheduler(self.graph, self.datastore, self.platform)
+        self.scheduler = Scheduler(self.graph, self.datastore, self.platform, journal=self.journal, call_cache=self.call_cache)
 
     def validate(self):
 
@@ -103,6 +135,10 @@ class GAPipeline(object):
         self.storage_helper     = StorageHelper(self.helper_processor)
         self.docker_helper      = DockerHelper(self.helper_processor)
 
+        # Check that cached outputs still exist before they're reused
+        if self.call_cache is not None:
+            self.call_cache.set_storage_helper(self.storage_helper)
+
         # Validate all pipeline inputs can be found on platform
         input_validator = InputValidator(self.resource_kit, self.sample_data, self.storage_helper, self.docker_helper)
         has_errors = input_validator.validate() or has_errors
@@ -112,6 +148,9 @@ class GAPipeline(object):
             raise SystemError("One or more errors have been encountered during validation. "
                               "See the above logs for more information")
 
+        # Read resources from the platform's reference disk instead of transferring them to every task
+        self.__map_reference_resources()
+
         # Validate that pipeline workspace can be created
         workspace = self.datastore.get_task_workspace()
         for dir_type, dir_path in workspace.get_workspace().items():
@@ -133,7 +172,10 @@ class GAPipeline(object):
                     logging.error("Received the following err message:\n%s" % e)
 
     def save_progress(self):
-        pass
+        # Tasks are recorded as they complete so just make sure the journal has been written
+        if self.journal is not None:
+            self.journal.close()
+            logging.info("Progress saved to run journal '%s'. Re-run pipeline with the same journal to resume." % self.__journal_file)
 
     def publish_report(self, err=False, err_msg=None, git_version=None):
         # Create and publish GAP pipeline report
@@ -162,6 +204,29 @@ class GAPipeline(object):
         if self.platform is not None:
             self.platform.clean_up()
 
+        # Close the run journal
+        if self.journal is not None:
+            self.journal.close()
+
+    def __map_reference_resources(self):
+        # Point resources at their copies on the reference disk
+        # Resources missing from the disk keep their original path and are transferred as usual
+        for resources in self.resource_kit.get_resources().values():
+            for resource in resources.values():
+                ref_path = self.platform.get_reference_path(resource.get_transferrable_path())
+                if ref_path is None:
+                    continue
+
+                if not self.storage_helper.path_exists(ref_path, job_name="check_reference_%s" % resource.get_file_id()):
+                    logging.info("Resource '%s' not found on reference disk. It will be transferred to each task."
+                                 % resource.get_file_id())
+                    continue
+
+                # Update path as if the resource had been transferred to where it's found on the reference disk
+                logging.debug("Resource '%s' will be read from reference disk at '%s'." % (resource.get_file_id(), ref_path))
+                resource.update_path(new_dir=os.path.dirname(ref_path.rstrip("/")))
+                resource.flag("reference")
+
     def __make_pipeline_report(self, err, err_msg, git_version):
 
         # Create a pipeline report that summarizes features of pipeline
@@ -176,6 +241,25 @@ class GAPipeline(object):
                                  run_time=self.helper_processor.get_runtime(),
                                  cost=self.helper_processor.compute_cost())
 
+        # Register time processors spent idle waiting to be reused
+        if self.platform is not None and (self.platform.pool_idle_ttl > 0 or self.platform.locality_handoff):
+            pool_runtime, pool_cost = self.platform.get_pool_usage()
+            report.register_task(task_name="ProcessorPool",
+                                 start_time=None,
+                                 run_time=pool_runtime,
+                                 cost=pool_cost)
+
+        # Register runtime data and output files for tasks completed by previous runs
+        if self.journal is not None:
+            for record in self.journal.get_records():
+                task_name = record["task_id"]
+                report.register_task(task_name=task_name,
+                                     start_time=None,
+                                     run_time=record["runtime"],
+                                     cost=record["cost"],
+                                     task_data={"parent_task" : task_name.split(".")[0]})
+                self.__register_output_files(report, task_name, err)
+
         # Register runtime data for pipeline tasks
         if self.scheduler is not None:
             task_workers = self.scheduler.get_task_workers()
@@ -197,19 +281,23 @@ class GAPipeline(object):
 
                 # Register data about task output files
                 if task.is_complete():
-                    output_files = self.datastore.get_task_output_files(task_id=task_name)
-                    for output_file in output_files:
-                        file_type       = output_file.get_type()
-                        file_path       = output_file.get_path()
-                        is_final_output = file_type in task.get_final_output_keys()
-                        file_size       = output_file.get_size()
-                        if is_final_output or err:
-                            # Only declare output files if file is final output file
-                            # OR file is temporary output file but pipeline failed
-                            report.register_output_file(task_name, file_type, file_path, file_size, is_final_output)
+                    self.__register_output_files(report, task_name, err)
 
         return report
 
+    def __register_output_files(self, report, task_name, err):
+        task = self.graph.get_tasks(task_name)
+        output_files = self.datastore.get_task_output_files(task_id=task_name)
+        for output_file in output_files:
+            file_type       = output_file.get_type()
+            file_path       = output_file.get_path()
+            is_final_output = file_type in task.get_final_output_keys()
+            file_size       = output_file.get_size()
+            if is_final_output or err:
+                # Only declare output files if file is final output file
+                # OR file is temporary output file but pipeline failed
+                report.register_output_file(task_name, file_type, file_path, file_size, is_final_output)
+
 
 class GAPReport(object):
     # Object for holding metadata related to a GAP pipeline run
@@ -321,3 +409,26 @@ class GAPReport(object):
     def __str__(self):
         return json.dumps(self.to_dict(), indent=4)
 
+    @staticmethod
+    def get_task_runtimes(report_file):
+        # Return average runtime (sec) of each task declared in the graph config from a previous pipeline report
+        with open(report_file, "r") as report_fh:
+            report = json.load(report_fh)
+
+        # Group runtimes of split tasks with the task they were split from
+        runtimes = {}
+        for task in report["tasks"]:
+            if task["name"] in ["Helper", "ProcessorPool"]:
+                continue
+
+            # Skip tasks that never finished (e.g. failed or cancelled) and didn't record a runtime
+            if task.get("runtime(sec)") is None:
+                continue
+
+            parent_task = task.get("parent_task", task["name"].split(".")[0])
+            if parent_task not in runtimes:
+                runtimes[parent_task] = []
+            runtimes[parent_task].append(float(task["runtime(sec)"]))
+
+        return {task_id: sum(times) / len(times) for task_id, times in runtimes.items()}
+
@@ -1,11 +1,14 @@
 import logging
-from collections import OrderedDict
+from collections import OrderedDict, deque
 
 from Config import ConfigParser
 from System.Graph import Task
 
 class Graph(object):
 
+    # Runtime weight given to tasks without a runtime estimate when no estimates are available
+    DEFAULT_RUNTIME_ESTIMATE = 1
+
     def __init__(self, pipeline_config_file):
 
         # Parse and validate pipeline config
@@ -19,9 +22,44 @@ class Graph(object):
         # Check validity of adjacency list
         self.__check_adjacency_list()
 
+        # Index of children for each task (reverse of adjacency list)
+        self.child_list = self.__generate_child_list()
+
         # Check for cycles
         self.__check_cycles()
 
+        # Number of unfinished parents for each task
+        self.__num_unfinished_parents = {}
+
+        # Tasks that haven't been completed
+        self.__unfinished_tasks = OrderedDict()
+
+        # Queue of tasks whose parents have all completed and the set of tasks currently in the queue
+        self.__ready_queue = deque()
+        self.__queued_tasks = set()
+
+        # Initialize counters and ready queue from the current graph
+        self.__init_ready_tracking()
+
+        # Expected runtime of each task (indexed by task id in graph config)
+        self.__runtime_estimates = {}
+
+        # Critical path length of each task. Recomputed lazily after the structure of the graph changes.
+        # Splits created from a template share the priority of the task they were split from.
+        self.__priorities = None
+
+        # Templates describing the split subgraph created by each splitter (indexed by splitter task id)
+        self.__split_templates = {}
+
+        # Tasks that are split by a template and stand in for splits that haven't been created yet
+        self.__template_tasks = set()
+
+        # Order in which split dependencies were added to tasks that have waited on split tasks that didn't exist yet
+        self.__split_parent_order = {}
+
+        # Tasks waiting on each split task that hasn't been created yet
+        self.__pending_children = {}
+
     def add_task(self, task):
         # Connect new node to existing graph
         if task.get_ID() in self.tasks:
@@ -31,6 +69,13 @@ class Graph(object):
         # Add new node to nodelist
         self.tasks[task.get_ID()] = task
         self.adj_list[task.get_ID()] = []
+        self.child_list[task.get_ID()] = []
+
+        # Track task until it has been completed
+        self.__num_unfinished_parents[task.get_ID()] = 0
+        if not task.is_complete():
+            self.__unfinished_tasks[task.get_ID()] = task
+            self.__enqueue_ready_task(task.get_ID())
 
     def remove_task(self, task_id):
         # Remove node and all edges from Graph
@@ -38,14 +83,26 @@ class Graph(object):
             logging.error("Attempt to remove non-existant task from Graph: %s" % task_id)
             raise RuntimeError("Graph Error: Attempt to remove non-existant task from graph!")
 
+        # Release children waiting on task
+        if not self.tasks[task_id].is_complete():
+            for child_task_id in self.get_children(task_id):
+                self.__release_child(child_task_id)
+
+        # Invalidate critical paths
+        self.__priorities = None
+
+        # Remove all references to node in adjacency list and child index
+        for parent_task_id in self.adj_list[task_id]:
+            self.child_list[parent_task_id].remove(task_id)
+        for child_task_id in self.child_list[task_id]:
+            self.adj_list[child_task_id].remove(task_id)
+
         # Remove node from vertice list
         self.tasks.pop(task_id)
         self.adj_list.pop(task_id)
-
-        # Remove all references to node in adjacency list
-        for adj_list in self.adj_list.values():
-            if task_id in adj_list:
-                adj_list.remove(task_id)
+        self.child_list.pop(task_id)
+        self.__num_unfinished_parents.pop(task_id)
+        self.__unfinished_tasks.pop(task_id, None)
 
     def add_dependency(self, child_task_id, parent_task_id):
         # Adds dependency where dep_nod_id must wait until ind_node_id is finished
@@ -58,6 +115,11 @@ class Graph(object):
 
         # Add dependency
         self.adj_list[child_task_id].append(parent_task_id)
+        self.child_list[parent_task_id].append(child_task_id)
+
+        # Child must now also wait on parent
+        if not self.tasks[parent_task_id].is_complete():
+            self.__num_unfinished_parents[child_task_id] += 1
 
     def get_tasks(self, task_id=None):
         if task_id is None:
@@ -65,17 +127,54 @@ class Graph(object):
         return self.tasks[task_id]
 
     def get_unfinished_tasks(self):
-        return [task for task in list(self.tasks.values()) if not task.is_complete()]
+        return list(self.__unfinished_tasks.values())
+
+    def set_complete(self, task_id):
+        # Mark task as complete and release any children waiting on it
+        if task_id not in self.tasks:
+            logging.error("Cannot complete non-existant task: %s" % task_id)
+            raise RuntimeError("Graph Error: Attempt to complete nonexistant task!")
+
+        # Don't release children more than once
+        task = self.tasks[task_id]
+        if task.is_complete():
+            return
+
+        # Make sure splits that depend on the task exist before they're released
+        self.__create_split_children(task_id)
+
+        task.set_complete(True)
+        self.__unfinished_tasks.pop(task_id, None)
+        for child_task_id in self.get_children(task_id):
+            self.__release_child(child_task_id)
+
+    def pop_ready_tasks(self):
+        # Remove and return all tasks that are ready to run (parents complete, not deprecated, not complete)
+        ready_tasks = []
+        while len(self.__ready_queue) > 0:
+            task_id = self.__ready_queue.popleft()
+            self.__queued_tasks.discard(task_id)
+
+            # Skip tasks that have since been removed, completed, deprecated, or given new dependencies
+            task = self.tasks.get(task_id)
+            if task is None or task.is_complete() or task.is_deprecated():
+                continue
+            if self.__num_unfinished_parents[task_id] > 0:
+                continue
+
+            ready_tasks.append(task)
+
+        # Create the splits that will run once the ready tasks complete
+        for task in ready_tasks:
+            self.__create_split_children(task.get_ID())
+
+        return ready_tasks
 
     def get_children(self, task_id):
         if task_id not in self.tasks:
             logging.error("Cannot list children for non-existant task: %s" % task_id)
             raise RuntimeError("Graph Error: Attempt to get children from nonexistant task!")
-        dependents = []
-        for task, edges in self.adj_list.items():
-            if task_id in edges:
-                dependents.append(task)
-        return dependents
+        return [x for x in self.child_list[task_id]]
 
     def get_parents(self, task_id):
         if task_id not in self.tasks:
@@ -84,52 +183,213 @@ class Graph(object):
         return [x for x in self.adj_list[task_id]]
 
     def is_complete(self):
-        return len(self.get_unfinished_tasks()) < 1
+        return len(self.__unfinished_tasks) < 1
+
+    def set_runtime_estimates(self, runtime_estimates):
+        # Set expected runtimes (sec) of tasks, indexed by the task ids declared in the graph config
+        self.__runtime_estimates = runtime_estimates
+        self.__priorities = None
+
+    def get_priority(self, task_id):
+        # Return length of the critical (longest) path from the start of a task to the end of the pipeline
+        if task_id not in self.tasks:
+            logging.error("Cannot get priority for non-existant task: %s" % task_id)
+            raise RuntimeError("Graph Error: Attempt to get priority of nonexistant task!")
+        priority_task_id = self.__get_priority_task_id(task_id)
+        if priority_task_id is None:
+            # Task was added outside of a split so critical paths need to be recomputed
+            self.__priorities = self.__compute_priorities()
+            priority_task_id = task_id
+        return self.__priorities[priority_task_id]
+
+    def get_affinity_child(self, task_id):
+        # Return the child that gets all its inputs from a task (the one on the longest path if several do)
+        # Returns None if no such child exists or the task's children will be replaced when it splits the graph
+        if task_id not in self.tasks:
+            logging.error("Cannot get affinity child for non-existant task: %s" % task_id)
+            raise RuntimeError("Graph Error: Attempt to get affinity child of nonexistant task!")
+        if self.tasks[task_id].is_splitter_task():
+            return None
+        children = [x for x in self.child_list[task_id] if self.adj_list[x] == [task_id]]
+        if len(children) == 0:
+            return None
+        return max(children, key=self.get_priority)
 
     def parents_complete(self, task_id):
         # Determine if all task parents have completed
-        parents = self.get_parents(task_id)
-        return len(parents) == len([x for x in parents if self.get_tasks(x).is_complete()])
+        if task_id not in self.tasks:
+            logging.error("Cannot check parents for non-existant task: %s" % task_id)
+            raise RuntimeError("Graph Error: Attempt to check parents of nonexistant task!")
+        return self.__num_unfinished_parents[task_id] == 0
 
     def split_graph(self, splitter_task_id):
-        # Recursively split tasks downstream of 'head_task' until a closing merge is reached
-        child_tasks = self.get_children(splitter_task_id)
+        # Replace tasks downstream of a splitter with one copy per split until a closing merge is reached
+        # Only the first task of each split is created now. Downstream splits are created from a template
+        # when their parents are about to run so graph size stays proportional to the tasks being executed.
         splitter_task = self.tasks[splitter_task_id]
+
+        # Find tasks that are split and the tasks that merge them back together
+        split_tasks, merge_tasks = self.__get_split_subgraph(splitter_task_id)
+
+        splits = OrderedDict()
         for split_id in splitter_task.module.get_output():
-            # Create new graph partition for each new split
-            split = splitter_task.module.get_output(split_id=split_id)
             # Get visible samples for new graph partition
             # If no visible samples declared, split nodes inherit visible samples from splitter task
-            visible_samples = split["visible_samples"] if split["visible_samples"] is not None else splitter_task.get_visible_samples()
-            for child_task in child_tasks:
-                child_split = self.__split_subgraph(child_task, splitter_task_id, split_id, visible_samples)
-                self.add_dependency(child_split, splitter_task_id)
-
-        # Loop through deprecated tasks and give upstream dependencies for parent tasks that weren't in splitter's subtree
-        for task in self.__deprecated_tasks:
-            # Get parents of deprecated task
-            parents = self.get_parents(task)
-            for parent in parents:
-                # If a parent task hasn't been deprecated (i.e. not in the splitter subtree)
-                # Add that dependency for all a tasks's newly created daughter splits
-                if not self.tasks[parent].is_deprecated() and parent != splitter_task_id:
-                    for clone_task_id in self.tasks[task].get_clones():
-                        if parent not in self.get_parents(clone_task_id):
-                            self.add_dependency(clone_task_id, parent)
-
-            # Remove deprecated task from graph completely
-            #self.remove_task(task)
-
-            # Set deprecated task to complete so it doesn't get run
-            self.tasks[task].set_complete(is_complete=True)
-
-            # Make sure graph structure is still valid
-            self.__check_adjacency_list()
-            self.__check_cycles()
-
-    @property
-    def __deprecated_tasks(self):
-        return [task.get_ID() for task in list(self.tasks.values()) if task.is_deprecated()]
+            split = splitter_task.module.get_output(split_id=split_id)
+            splits[split_id] = split["visible_samples"] if split["visible_samples"] is not None else splitter_task.get_visible_samples()
+
+        template = SplitTemplate(splitter_task_id, split_tasks, splits)
+        self.__split_templates[splitter_task_id] = template
+        self.__template_tasks.update(split_tasks)
+
+        # Mark original tasks as deprecated so they don't get run
+        for task_id in split_tasks:
+            self.tasks[task_id].deprecate()
+
+        # Merging tasks wait on the last tasks of every split
+        for task_id in merge_tasks:
+            for split_id in splits:
+                for parent_task_id in list(self.adj_list[task_id]):
+                    if parent_task_id in split_tasks:
+                        self.__add_split_dependency(task_id, template.get_split_task_id(parent_task_id, split_id))
+
+        # Create the tasks that receive input directly from the splitter
+        for split_id in splits:
+            for child_task_id in self.child_list[splitter_task_id]:
+                if child_task_id in split_tasks:
+                    self.__create_split_task(template, child_task_id, split_id)
+
+        # Set deprecated tasks to complete so they don't get run
+        for task_id in split_tasks:
+            self.set_complete(task_id)
+
+        # Make sure graph structure is still valid
+        self.__check_adjacency_list(runtime=True)
+        self.__check_cycles(runtime=True)
+
+        # Invalidate critical paths
+        self.__priorities = None
+
+    def __get_split_subgraph(self, splitter_task_id):
+        # Return tasks between splitter and the merges that close the split, and the tasks that close it
+        split_tasks = set()
+        merge_tasks = OrderedDict()
+
+        # Splits created by upstream splitters need to exist before they can be split again
+        self.__create_split_children(splitter_task_id)
+
+        to_visit = [(child_task_id, 1) for child_task_id in self.child_list[splitter_task_id]]
+        while len(to_visit) > 0:
+            task_id, level = to_visit.pop()
+            task = self.tasks[task_id]
+
+            if task.is_merger_task():
+                # Decrement current nesting scope after merge
+                level -= 1
+
+            if task.is_splitter_task():
+                # Increment current nesting scope after split
+                level += 1
+
+            if level == 0:
+                # Current split has been merged (don't split downstream tasks)
+                merge_tasks[task_id] = True
+                continue
+
+            # Can happen if two tasks in split subtree have same child
+            if task_id in split_tasks:
+                continue
+
+            split_tasks.add(task_id)
+            self.__create_split_children(task_id)
+            to_visit.extend((child_task_id, level) for child_task_id in self.child_list[task_id])
+
+        return split_tasks, list(merge_tasks)
+
+    def __create_split_task(self, template, task_id, split_id):
+        # Add split of a template task to the graph and connect it to its parents
+        split_task = self.tasks[task_id].split(template.splitter_task_id, split_id, template.splits[split_id])
+        split_task_id = split_task.get_ID()
+        self.add_task(split_task)
+
+        # Parents that haven't been split yet are waited on until they're created
+        parents = self.adj_list[task_id] + [x for x in self.__split_parent_order.get(task_id, []) if x not in self.tasks]
+        for parent_task_id in parents:
+            if parent_task_id in template.split_tasks:
+                self.__add_split_dependency(split_task_id, template.get_split_task_id(parent_task_id, split_id))
+
+            # Keep dependencies on parent tasks that weren't in splitter's subtree
+            elif parent_task_id not in self.tasks or parent_task_id == template.splitter_task_id \
+                    or not self.tasks[parent_task_id].is_deprecated():
+                self.__add_split_dependency(split_task_id, parent_task_id)
+
+        # Connect tasks that were created earlier and are waiting on the new split task
+        for child_task_id in self.__pending_children.pop(split_task_id, []):
+            # Keep parents in the order they were added so task inputs don't depend on when splits are created
+            parent_order = self.__split_parent_order[child_task_id]
+            parents = self.adj_list[child_task_id]
+            i = len(parents)
+            while i > 0 and parent_order.get(parents[i-1], -1) > parent_order[split_task_id]:
+                i -= 1
+            parents.insert(i, split_task_id)
+            self.child_list[split_task_id].append(child_task_id)
+
+    def __create_split_children(self, task_id):
+        # Create splits of a split task's children that haven't been created yet
+        template, original_task_id = self.__get_split_template(task_id)
+        if template is None or self.tasks[task_id].is_deprecated():
+            return
+        split_id = self.tasks[task_id].get_split_id()
+        for child_task_id in self.child_list[original_task_id]:
+            if child_task_id in template.split_tasks and template.get_split_task_id(child_task_id, split_id) not in self.tasks:
+                self.__create_split_task(template, child_task_id, split_id)
+
+    def __get_split_template(self, task_id):
+        # Return the template a split task was created from and the id of the task it was split from
+        task = self.tasks[task_id]
+        if not task.is_split() or task.get_splitter() not in self.__split_templates:
+            return None, None
+        original_task_id = task_id[:-len(task.get_split_id())-1]
+        return self.__split_templates[task.get_splitter()], original_task_id
+
+    def __get_pending_split_children(self, task_id):
+        # Return template tasks whose split for a split task's partition hasn't been created yet
+        template, original_task_id = self.__get_split_template(task_id)
+        if template is None:
+            return []
+        split_id = self.tasks[task_id].get_split_id()
+        return [x for x in self.child_list[original_task_id]
+                if x in template.split_tasks and template.get_split_task_id(x, split_id) not in self.tasks]
+
+    def __get_priority_task_id(self, task_id):
+        # Return task whose priority a task has (None if priorities need to be recomputed first)
+        # Splits created from a template after priorities were computed use the template task's priority
+        if self.__priorities is None:
+            return None
+        while task_id not in self.__priorities:
+            template, original_task_id = self.__get_split_template(task_id)
+            if template is None:
+                return None
+            task_id = original_task_id
+        return task_id
+
+    def __add_split_dependency(self, child_task_id, parent_task_id):
+        # Add dependency on a task that may not have been created yet
+        parent_order = self.__split_parent_order.get(child_task_id)
+        if parent_task_id in self.tasks:
+            if parent_task_id not in self.adj_list[child_task_id]:
+                self.add_dependency(child_task_id, parent_task_id)
+                if parent_order is not None:
+                    parent_order[parent_task_id] = len(parent_order)
+            return
+
+        # Child waits on the parent from now on and the edge is added once the parent is created
+        if parent_order is None:
+            parent_order = self.__split_parent_order[child_task_id] = {}
+        if parent_task_id not in parent_order:
+            parent_order[parent_task_id] = len(parent_order)
+            self.__pending_children.setdefault(parent_task_id, []).append(child_task_id)
+            self.__num_unfinished_parents[child_task_id] += 1
 
     def __generate_graph(self):
 
@@ -143,6 +403,76 @@ class Graph(object):
 
         return tasks, adj_list
 
+    def __generate_child_list(self):
+        # Build index of children for each task from the adjacency list
+        child_list = OrderedDict()
+        for task_id in self.tasks:
+            child_list[task_id] = []
+        for task_id, parents in self.adj_list.items():
+            for parent_task_id in parents:
+                child_list[parent_task_id].append(task_id)
+        return child_list
+
+    def __compute_priorities(self):
+        # Compute critical path length of every task, visiting children before parents
+
+        # Tasks without an estimate are assumed to take the average of the known estimates
+        if len(self.__runtime_estimates) > 0:
+            default_runtime = sum(self.__runtime_estimates.values()) / len(self.__runtime_estimates)
+        else:
+            default_runtime = self.DEFAULT_RUNTIME_ESTIMATE
+
+        # Splits that haven't been created yet are represented by the template task they'll be split from
+        child_list = {task_id: self.child_list[task_id] + self.__get_pending_split_children(task_id) for task_id in self.tasks}
+
+        # Order tasks so that every task appears after its parents
+        num_parents = {task_id: 0 for task_id in self.tasks}
+        for child_tasks in child_list.values():
+            for child_task_id in child_tasks:
+                num_parents[child_task_id] += 1
+        ordered_tasks = [task_id for task_id, count in num_parents.items() if count == 0]
+        for task_id in ordered_tasks:
+            for child_task_id in child_list[task_id]:
+                num_parents[child_task_id] -= 1
+                if num_parents[child_task_id] == 0:
+                    ordered_tasks.append(child_task_id)
+
+        priorities = {}
+        for task_id in reversed(ordered_tasks):
+            task = self.tasks[task_id]
+
+            # Tasks that won't be run don't add to the critical path unless they stand in for splits
+            if (task.is_complete() or task.is_deprecated()) and task_id not in self.__template_tasks:
+                runtime = 0
+            else:
+                # Split tasks share the estimate of the task they were split from
+                runtime = self.__runtime_estimates.get(task_id.split(".")[0], default_runtime)
+
+            longest_child_path = max([priorities[x] for x in child_list[task_id]], default=0)
+            priorities[task_id] = runtime + longest_child_path
+
+        return priorities
+
+    def __init_ready_tracking(self):
+        # Count unfinished parents for every task and queue tasks that are ready to run
+        for task_id, task in self.tasks.items():
+            parents = self.adj_list[task_id]
+            self.__num_unfinished_parents[task_id] = len([x for x in parents if not self.tasks[x].is_complete()])
+            if not task.is_complete():
+                self.__unfinished_tasks[task_id] = task
+                self.__enqueue_ready_task(task_id)
+
+    def __release_child(self, task_id):
+        # Decrement count of unfinished parents and queue task once all parents are complete
+        self.__num_unfinished_parents[task_id] -= 1
+        self.__enqueue_ready_task(task_id)
+
+    def __enqueue_ready_task(self, task_id):
+        # Queue task if it is waiting on no parents and isn't already queued
+        if self.__num_unfinished_parents[task_id] == 0 and task_id not in self.__queued_tasks:
+            self.__ready_queue.append(task_id)
+            self.__queued_tasks.add(task_id)
+
     def __check_adjacency_list(self, runtime=False):
         errors = False
         for task, adj_tasks in self.adj_list.items():
@@ -168,88 +498,33 @@ class Graph(object):
             else:
                 raise RuntimeError("Runtime graph alteration resulted in invalid graph!")
 
-    def __split_subgraph(self, task_id, splitter_task_id, split_id, visible_samples, level=1, split_task_ids=[]):
-        # Recursively split subgraph that depends on 'task'
-
-        task = self.tasks[task_id]
-
-        if task.is_merger_task():
-            # Decrement current nesting scope after merge
-            level -= 1
-
-        if task.is_splitter_task():
-            # Increment current nesting scope after split
-            level += 1
-
-        if level == 0:
-            # Current split has been merged (don't split downstream tasks)
-            return task_id
-
-        # Split current task into new task and add split to graph
-        split_task = task.split(splitter_task_id, split_id, visible_samples)
-
-        # Don't try to add new split if it's already been added to graph
-        # Can happen if two tasks in split subtree have same child
-        if split_task.get_ID() in split_task_ids:
-            task.deprecate()
-            return split_task.get_ID()
-
-        # Add newly created task to existing graph and clone parental dependencies
-        self.add_task(split_task)
-
-        # Mark original task as deprecated so it can be discarded
-        task.deprecate()
-
-        # Add new task ID to list of ids in current split
-        split_task_ids.append(split_task.get_ID())
-
-        # Create dependencies between current task and splits created for each child task
-        child_tasks = self.get_children(task_id)
-        for child_task in child_tasks:
-            # Split each child subgraph
-            child_split = self.__split_subgraph(child_task, splitter_task_id, split_id, visible_samples, level, split_task_ids)
-            # Connect task to split child subgraph
-            self.add_dependency(child_split, split_task.get_ID())
-
-        # Return split task
-        return split_task.get_ID()
-
     def __check_cycles(self, runtime=False):
-        # Taken with modification from https://www.geeksforgeeks.org/detect-cycle-in-a-graph/
-        cycle = False
-        visited = []
-        recStack = []
-        for task_id in list(self.tasks.keys()):
-            if task_id not in visited:
-                if self.__is_cycle(task_id, visited, recStack):
-                    cycle = True
-        if cycle:
+        # Kahn's algorithm: repeatedly remove tasks with no remaining parents. Any task left over is part of a cycle.
+        num_parents = {}
+        no_parents = deque()
+        for task_id, parents in self.adj_list.items():
+            num_parents[task_id] = len(parents)
+            if len(parents) == 0:
+                no_parents.append(task_id)
+
+        num_visited = 0
+        while len(no_parents) > 0:
+            task_id = no_parents.popleft()
+            num_visited += 1
+            for child_task_id in self.child_list[task_id]:
+                num_parents[child_task_id] -= 1
+                if num_parents[child_task_id] == 0:
+                    no_parents.append(child_task_id)
+
+        if num_visited < len(self.tasks):
+            cycle_tasks = [task_id for task_id, count in num_parents.items() if count > 0]
+            logging.error("Incorrect pipeline graph: Cycle detected that includes one or more of the following tasks: %s!"
+                          % ", ".join(cycle_tasks))
             if not runtime:
                 raise IOError("Incorrect pipeline graph: Cycle detected!")
             else:
                 raise RuntimeError("Runtime graph alteration resulted in invalid graph: Cycle detected!")
 
-    def __is_cycle(self, task_id, visited, recStack):
-
-        # Mark current task as visited
-        visited.append(task_id)
-        # Add current task to current recursion stack
-        recStack.append(task_id)
-
-        # Check if any subgraph of current task contains a cycle
-        neighbors = self.get_children(task_id)
-        for neighbor_id in neighbors:
-            if neighbor_id not in visited:
-                if self.__is_cycle(neighbor_id, visited, recStack):
-                    return True
-            elif neighbor_id in recStack:
-                logging.error("Incorrect pipeline graph: Cycle detected that includes task '%s'!" % task_id)
-                return True
-
-        # Pop current task from recursion stack
-        recStack.remove(task_id)
-        return False
-
     def __str__(self):
         to_ret = ""
         for task_id, task in self.tasks.items():
@@ -257,5 +532,18 @@ class Graph(object):
         return to_ret
 
 
+class SplitTemplate(object):
+    # Compact description of the subgraph created by a splitter from which split tasks are created when needed
+
+    def __init__(self, splitter_task_id, split_tasks, splits):
+        self.splitter_task_id   = splitter_task_id
+
+        # Tasks that are replaced by one split task for each split
+        self.split_tasks        = split_tasks
 
+        # Samples visible to each split (indexed by split id)
+        self.splits             = splits
 
+    @staticmethod
+    def get_split_task_id(task_id, split_id):
+        return "%s.%s" % (task_id, split_id)
@@ -1,11 +1,20 @@
 import logging
 import os
+import time
+from collections import OrderedDict
 
 from System.Platform import StorageHelper, DockerHelper, Platform
 
 class ModuleExecutor(object):
 
-    def __init__(self, task_id, processor, workspace, docker_image=None):
+    # Seconds between checks for finished file transfers
+    TRANSFER_POLL_INTERVAL = 0.2
+
+    # Permissions given to input files so module commands can use them whichever user they run as
+    INPUT_FILE_MODE = "777"
+
+    def __init__(self, task_id, processor, workspace, docker_image=None, max_transfers=8, bulk_transfers=True,
+                 min_free_space=0):
         self.task_id        = task_id
         self.processor      = processor
         self.workspace      = workspace
@@ -13,6 +22,18 @@ class ModuleExecutor(object):
         self.docker_helper  = DockerHelper(self.processor)
         self.docker_image   = docker_image
 
+        # Maximum number of files transferred to or from the processor at the same time
+        self.max_transfers  = max(max_transfers, 1)
+
+        # Whether files going to the same place are moved together by a single command
+        self.bulk_transfers = bulk_transfers
+
+        # Named pipes being filled with input files the module reads as a stream (pipe path -> source path)
+        self.streams        = OrderedDict()
+
+        # Free disk space (GB) working directory needs for the task's input files
+        self.min_free_space = min_free_space
+
         # Create workspace directory structure
         self.__create_workspace()
 
@@ -21,21 +42,20 @@ class ModuleExecutor(object):
         # List of jobs that have been started in process of loading input
         job_names = []
 
-        # Pull docker image if necessary
+        # Pull docker image if necessary. Pull runs while input files are transferred.
         if self.docker_image is not None:
             docker_image_name = self.docker_image.get_image_name().split("/")[0]
             docker_image_name = docker_image_name.replace(":","_")
             job_name = "docker_pull_%s" % docker_image_name
-            self.docker_helper.pull(self.docker_image.get_image_name(), job_name=job_name)
+            self.docker_helper.pull(self.docker_image.get_image_name(), job_name=job_name, digest=self.docker_image.get_digest())
             job_names.append(job_name)
 
         # Load input files
         # Inputs: list containing remote files, local files, and docker images
-        src_seen = []
-        dest_seen = []
+        src_seen = set()
+        dest_seen = set()
+        transfers = []
         count = 1
-        batch_size = 5
-        loading_counter = 0
         for task_input in inputs:
 
             # Don't transfer local files
@@ -56,6 +76,11 @@ class ModuleExecutor(object):
                 job_name = "load_input_%s_%s_%s" % (self.task_id, task_input.get_type(), count)
                 logging.debug("Input path: %s, transfer path: %s" % (task_input.get_path(), src_path))
 
+                # Use copy left on processor by the task that created the file instead of downloading it
+                local_path = self.processor.pop_local_replica(src_path)
+                if local_path is not None:
+                    logging.debug("(%s) Using local copy of '%s' at '%s'" % (self.task_id, src_path, local_path))
+
                 # Generate complete transfer path
                 dest_path = os.path.join(dest_dir, task_input.filename)
 
@@ -65,7 +90,7 @@ class ModuleExecutor(object):
                     if task_input.sample_name is not None:
                         dest_filename = "{0}_{1}".format(task_input.sample_name, task_input.filename)
                     else:
-                        dest_filename = "{0}_{1}".format(Platform.generate_unique_id(), dest_filename)
+                        dest_filename = "{0}_{1}".format(Platform.generate_unique_id(), task_input.filename)
                     logging.debug("Changing filename from '{0}' to '{1}'.".format(task_input.filename, dest_filename))
                     dest_path = os.path.join(dest_dir, dest_filename)
                 else:
@@ -75,39 +100,41 @@ class ModuleExecutor(object):
                 # Show the final log file
                 logging.debug("Destination: {0}".format(dest_path))
 
-                # Move file to dest_path
-                self.storage_helper.mv(src_path=src_path,
-                                       dest_path=dest_path,
-                                       job_name=job_name)
-                loading_counter += 1
-                
+                # Expose file as a named pipe filled while the module reads it instead of downloading it first
+                if local_path is None and self.__is_streamable(task_input):
+                    fifo_path = os.path.join(dest_dir, task_input.filename if dest_filename is None else dest_filename)
+                    job_name = "stream_input_%s_%s_%s" % (self.task_id, task_input.get_type(), count)
+                    logging.debug("(%s) Streaming '%s' through named pipe '%s'" % (self.task_id, src_path, fifo_path))
+                    self.storage_helper.stream(src_path, fifo_path, job_name=job_name)
+                    job_names.append(job_name)
+                    self.streams[fifo_path] = src_path
+
+                # Queue file to be moved to dest_path
+                else:
+                    transfers.append(FileTransfer(job_name,
+                                                  [src_path if local_path is None else local_path],
+                                                  dest_path,
+                                                  task_input.get_size(),
+                                                  mode=self.INPUT_FILE_MODE))
+
                 # Add transfer path to list of remote paths that have been transferred to local workspace
-                src_seen.append(src_path)
+                src_seen.add(src_path)
                 count += 1
-                job_names.append(job_name)
-                
-                # If loading_counter is batch_size, clear out queue
-                if loading_counter >= batch_size:
-                    logging.debug("Batch size reached on task {0}".format(
-                        self.task_id))
-                    # Wait for all processes to finish
-                    while len(job_names):
-                        self.processor.wait_process(job_names.pop())
-                    loading_counter = 0
 
             # Update path after transferring to wrk directory and add to list of files in working directory
             task_input.update_path(new_dir=dest_dir, new_filename=dest_filename)
-            dest_seen.append(task_input.get_path())
+            dest_seen.add(task_input.get_path())
             logging.debug("Updated path: %s" % task_input.get_path())
 
+        # Transfer input files
+        if self.bulk_transfers:
+            transfers = self.__bundle_transfers(transfers, job_prefix="load_input")
+        self.__run_transfers(transfers)
+
         # Wait for all processes to finish
         for job_name in job_names:
             self.processor.wait_process(job_name)
 
-        # Recursively give every permission to all files we just added
-        logging.info("(%s) Final workspace perm. update for task '%s'..." % (self.processor.name, self.task_id))
-        self.__grant_workspace_perms(job_name="grant_final_wrkspace_perms")
-
     def run(self, cmd, job_name=None):
 
         # Check or create job name
@@ -117,10 +144,31 @@ class ModuleExecutor(object):
         # Get name of docker image where command should be run (if any)
         docker_image_name = None if self.docker_image is None else self.docker_image.get_image_name()
 
+        # Refill streamed inputs the command reads every time it runs, as a pipe can only be read once
+        # Otherwise a retried command would wait forever on a pipe nobody is filling anymore
+        stream_cmds = [StorageHelper.get_stream_cmd(src_path, fifo_path)
+                       for fifo_path, src_path in self.streams.items() if fifo_path in cmd]
+        if len(stream_cmds) > 0:
+            # Pipes are filled outside of the docker container
+            if docker_image_name is not None:
+                cmd = self.processor.get_docker_cmd(cmd, docker_image_name)
+                docker_image_name = None
+            cmd = "%s ; %s" % (" ; ".join(stream_cmds), cmd)
+
         # Begin running job and return stdout, stderr after job has finished running
         self.processor.run(job_name, cmd, docker_image=docker_image_name)
         return self.processor.wait_process(job_name)
 
+    def close_streams(self):
+        # Stop streaming input files once module commands are done reading them
+        # Raises error if an input file couldn't be streamed completely
+        if len(self.streams) == 0:
+            return
+
+        streams = list(self.streams.keys())
+        self.streams = OrderedDict()
+        self.storage_helper.close_streams(streams, job_name="close_streams_%s" % self.task_id)
+
     def save_output(self, outputs, final_output_types):
         # Return output files to workspace output dir
 
@@ -128,22 +176,25 @@ class ModuleExecutor(object):
         final_output_dir = self.workspace.get_output_dir()
         tmp_output_dir = self.workspace.get_tmp_output_dir()
         count = 1
-        job_names = []
+        transfers = []
 
         # List of output file paths. We create this list to ensure the files are not being overwritten
         output_filepaths = []
 
+        # Calculate sizes of all output files at once
+        if len(outputs) > 0:
+            job_name = "get_size_%s_outputs" % self.task_id
+            file_sizes = self.storage_helper.get_file_size([output_file.get_path() for output_file in outputs],
+                                                           job_name=job_name)
+            for output_file, file_size in zip(outputs, file_sizes):
+                output_file.set_size(file_size)
+
         for output_file in outputs:
             if output_file.get_type() in final_output_types:
                 dest_dir = final_output_dir
             else:
                 dest_dir = tmp_output_dir
 
-            # Calculate output file size
-            job_name = "get_size_%s_%s_%s" % (self.task_id, output_file.get_type(), count)
-            file_size = self.storage_helper.get_file_size(output_file.get_path(), job_name=job_name)
-            output_file.set_size(file_size)
-
             # Check if there already exists a file with the same name on the bucket
             destination_path = "{0}/{1}/".format(dest_dir.rstrip("/"), output_file.get_filename())
             if destination_path in output_filepaths:
@@ -161,22 +212,25 @@ class ModuleExecutor(object):
                 # Just add the new path to the list of output file paths
                 output_filepaths.append(destination_path)
 
-            # Transfer to correct output directory
+            # Queue transfer to correct output directory
             job_name = "save_output_%s_%s_%s" % (self.task_id, output_file.get_type(), count)
             curr_path = output_file.get_transferrable_path()
-            self.storage_helper.mv(curr_path, dest_dir, job_name=job_name)
+            transfers.append(FileTransfer(job_name, [curr_path], dest_dir, output_file.get_size()))
 
             # Update path of output file to reflect new location
-            job_names.append(job_name)
             output_file.update_path(new_dir=dest_dir)
+
+            # Remember where file is on processor in case the next task on processor needs it
+            self.processor.add_local_replica(output_file.get_transferrable_path(), curr_path)
             logging.debug("(%s) Transferring file '%s' from old path '%s' to new path '%s' ('%s')" % (
                 self.task_id, output_file.get_type(), curr_path, output_file.get_path(), output_file.get_transferrable_path()))
 
             count += 1
 
-        # Wait for transfers to complete
-        for job_name in job_names:
-            self.processor.wait_process(job_name)
+        # Transfer output files
+        if self.bulk_transfers:
+            transfers = self.__bundle_transfers(transfers, job_prefix="save_output")
+        self.__run_transfers(transfers)
 
         # Wait for output files to finish transferring
         self.processor.wait()
@@ -187,26 +241,169 @@ class ModuleExecutor(object):
         final_log_dir = self.workspace.get_final_log_dir()
         self.storage_helper.mv(log_files, final_log_dir, job_name="return_logs", log=False, wait=True)
 
+    def __run_transfers(self, transfers):
+        # Transfer files through a sliding window of concurrent transfers so a slow transfer doesn't hold up the rest
+        # Largest files are started first so they aren't left running on their own at the end
+        pending = sorted(transfers, key=lambda transfer: transfer.size)
+        running = []
+        start = time.time()
+        while len(pending) > 0 or len(running) > 0:
+
+            # Start transfers until window is full
+            while len(pending) > 0 and len(running) < self.max_transfers:
+                transfer = pending.pop()
+                self.__start_transfer(transfer)
+                running.append(transfer)
+
+            # Wait for transfers to finish
+            finished = [transfer for transfer in running if self.processor.is_process_finished(transfer.job_name)]
+            if len(finished) == 0:
+                time.sleep(self.TRANSFER_POLL_INTERVAL)
+                continue
+
+            for transfer in finished:
+                self.__finish_transfer(transfer)
+                running.remove(transfer)
+
+        # Report overall throughput of the transfers
+        if len(transfers) > 0:
+            runtime = time.time() - start
+            nr_files = sum([len(transfer.src_paths) for transfer in transfers])
+            total_size = sum([transfer.size for transfer in transfers])
+            logging.info("(%s) Transferred %d files (%.2f GB) in %.1f sec (%.1f MB/s)" % (
+                self.task_id, nr_files, total_size, runtime, total_size * 1024 / max(runtime, 0.001)))
+
+    @staticmethod
+    def __is_streamable(task_input):
+        # Only single files can be exposed as a named pipe
+        return task_input.is_flagged("stream") and task_input.containing_dir is None and not task_input.is_prefix()
+
+    def __start_transfer(self, transfer):
+        if len(transfer.src_paths) == 1:
+            self.storage_helper.mv(src_path=transfer.src_paths[0],
+                                   dest_path=transfer.dest_path,
+                                   job_name=transfer.job_name,
+                                   mode=transfer.mode)
+        else:
+            self.storage_helper.bulk_mv(src_paths=transfer.src_paths,
+                                        dest_dir=transfer.dest_path,
+                                        job_name=transfer.job_name,
+                                        mode=transfer.mode)
+        transfer.start()
+
+    def __finish_transfer(self, transfer):
+        # Wait for transfer to complete and report how it went
+        self.processor.wait_process(transfer.job_name)
+        transfer.finish()
+
+        if len(transfer.src_paths) == 1:
+            logging.debug("(%s) Transferred '%s' (%.2f GB) in %.1f sec (%.1f MB/s)" % (
+                self.task_id, transfer.src_paths[0], transfer.size, transfer.get_runtime(), transfer.get_throughput()))
+            return
+
+        logging.debug("(%s) Transferred %d files to '%s' (%.2f GB) in %.1f sec (%.1f MB/s)" % (
+            self.task_id, len(transfer.src_paths), transfer.dest_path, transfer.size,
+            transfer.get_runtime(), transfer.get_throughput()))
+
+        # Status of each file is read from the complete output as large transfers only return the end of it
+        out_buffer, err_buffer = self.processor.get_output_buffers(transfer.job_name)
+        for src_path, (result, description) in StorageHelper.get_bulk_mv_status(out_buffer.iter_lines()).items():
+            logging.debug("(%s) Transfer of '%s': %s %s" % (self.task_id, src_path, result, description))
+
+    def __bundle_transfers(self, transfers, job_prefix):
+        # Combine transfers from the same storage type to the same place so each group is moved by a single command
+        groups = OrderedDict()
+        for transfer in transfers:
+            key = (StorageHelper.get_file_protocol(transfer.src_paths[0]), transfer.dest_path, transfer.mode)
+            if key not in groups:
+                groups[key] = []
+            groups[key].append(transfer)
+
+        bundles = []
+        for (protocol, dest_path, mode), group in groups.items():
+            if len(group) == 1:
+                bundles.append(group[0])
+                continue
+
+            job_name = "%s_%s_bulk_%d" % (job_prefix, self.task_id, len(bundles) + 1)
+            bundles.append(FileTransfer(job_name,
+                                        [src_path for transfer in group for src_path in transfer.src_paths],
+                                        dest_path,
+                                        sum([transfer.size for transfer in group]),
+                                        mode=mode))
+        return bundles
+
     def __create_workspace(self):
         # Create all directories specified in task workspace
 
         logging.info("(%s) Creating workspace for task '%s'..." % (self.processor.name, self.task_id))
-        for dir_type, dir_obj in  self.workspace.get_workspace().items():
-            self.storage_helper.mkdir(dir_obj, job_name="mkdir_%s" % dir_type, wait=True)
+        local_dirs = []
+        job_names = []
+        for dir_type, dir_obj in self.workspace.get_workspace().items():
+            if StorageHelper.get_file_protocol(dir_obj) == "Local":
+                local_dirs.append(dir_obj)
+            else:
+                job_names.append(self.storage_helper.mkdir(dir_obj, job_name="mkdir_%s" % dir_type))
+
+        # Create local directories, give everyone all the permissions on them, and check free disk space with one command
+        # Only the new directories need permissions as nothing has been put in them yet
+        logging.info("(%s) Creating workspace directories and updating permissions..." % self.processor.name)
+        self.processor.run(job_name="bootstrap_workspace", cmd=self.__get_bootstrap_cmd(local_dirs))
+        self.processor.wait_process("bootstrap_workspace")
+
+        # Wait for all the above commands to complete
+        for job_name in job_names:
+            self.processor.wait_process(job_name)
 
         # Set processor wrk, log directories
         self.processor.set_wrk_dir(self.workspace.get_wrk_dir())
         self.processor.set_wrk_out_dir(self.workspace.get_wrk_out_dir())
         self.processor.set_log_dir(self.workspace.get_wrk_log_dir())
 
-        # Give everyone all the permissions on working directory
-        logging.info("(%s) Updating workspace permissions..." % self.processor.name)
-        self.__grant_workspace_perms(job_name="grant_initial_wrkspace_perms")
-
-        # Wait for all the above commands to complete
         logging.info("(%s) Successfully created workspace for task '%s'!" % (self.processor.name, self.task_id))
 
-    def __grant_workspace_perms(self, job_name):
-        cmd = "sudo chmod -R 777 %s" % self.workspace.get_wrk_dir()
-        self.processor.run(job_name=job_name, cmd=cmd)
-        self.processor.wait_process(job_name)
+    def __get_bootstrap_cmd(self, dir_paths):
+        # Command that fails with an explanation if the working directory doesn't have the free space the task needs
+        wrk_dir = self.workspace.get_wrk_dir()
+        min_free_bytes = int(self.min_free_space * 1024**3)
+        dirs = " ".join(dir_paths)
+        return "sudo mkdir -p {0} && sudo chmod 777 {0} && " \
+               "free=$(df -P -B1 {1} | awk 'NR==2 {{print $4}}') && " \
+               "if [ $free -lt {2} ] ; then " \
+               "echo \"Only $free bytes free in {1} but input files need {2} bytes!\" >&2 ; exit 1 ; fi".format(dirs,
+                                                                                                        wrk_dir,
+                                                                                                        min_free_bytes)
+
+
+class FileTransfer(object):
+    # Transfer of one or more files to the same place by a single command
+
+    def __init__(self, job_name, src_paths, dest_path, size=None, mode=None):
+        self.job_name   = job_name
+        self.src_paths  = src_paths
+        self.dest_path  = dest_path
+
+        # Size of files being transferred (GB)
+        self.size       = size or 0
+
+        # Permissions given to files once they're transferred (None = leave as they are)
+        self.mode       = mode
+
+        self.start_time = None
+        self.end_time   = None
+
+    def start(self):
+        self.start_time = time.time()
+
+    def finish(self):
+        self.end_time = time.time()
+
+    def get_runtime(self):
+        # Return seconds taken to transfer files
+        if self.start_time is None or self.end_time is None:
+            return 0
+        return self.end_time - self.start_time
+
+    def get_throughput(self):
+        # Return transfer rate (MB/sec)
+        return self.size * 1024 / max(self.get_runtime(), 0.001)
@@ -1,20 +1,32 @@
 import logging
-import time
+import queue
 
 from System.Graph import TaskWorker
 
 class Scheduler(object):
 
-    def __init__(self, task_graph, datastore, platform):
+    # Maximum number of seconds to block waiting for a task worker event before re-checking the graph
+    EVENT_TIMEOUT = 60
+
+    def __init__(self, task_graph, datastore, platform, journal=None, call_cache=None):
 
         # Initialize pipeline definition variables
         self.task_graph     = task_graph
         self.datastore      = datastore
         self.platform       = platform
 
+        # Journal where completed tasks are recorded so the pipeline can be resumed
+        self.journal        = journal
+
+        # Outputs of previous runs that tasks can reuse instead of running
+        self.call_cache     = call_cache
+
         # Initialize set of task workers
         self.task_workers = {}
 
+        # Queue where task workers post (task_id, status) events whenever their status changes
+        self.events = queue.Queue()
+
     def get_task_workers(self):
         return self.task_workers
 
@@ -25,32 +37,72 @@ class Scheduler(object):
             self.__finalize()
 
     def __run_tasks(self):
+        # Start any tasks that can already be run
+        self.__launch_ready_tasks()
+
         # Execute tasks until are are completed or until error encountered
         while not self.task_graph.is_complete():
 
-            # Check all tasks to see if they need anything updated
-            unfinished_tasks = self.task_graph.get_unfinished_tasks()
-            for task in unfinished_tasks:
+            # Block until a task worker reports a change of status
+            task_id = self.__wait_for_event(TaskWorker.COMPLETE)
+
+            # Timed out without an event so re-check the whole graph
+            if task_id is None:
+                self.__finalize_complete_task_workers()
+
+            # Finalize the task worker that just completed
+            elif self.task_workers[task_id].get_status() == TaskWorker.COMPLETE:
+                self.__finalize_task_worker(self.task_workers[task_id])
+
+            # Start running tasks that became ready to run
+            self.__launch_ready_tasks()
+
+    def __launch_ready_tasks(self):
+        # Start running tasks that are ready to run but aren't currently
+        ready_tasks = self.task_graph.pop_ready_tasks()
+
+        # Launch tasks on the longest path to the end of the pipeline first
+        priorities = {task.get_ID(): self.task_graph.get_priority(task.get_ID()) for task in ready_tasks}
+        ready_tasks.sort(key=lambda x: priorities[x.get_ID()], reverse=True)
+
+        for task in ready_tasks:
+
+            # Task id
+            task_id = task.get_ID()
 
-                # Task id
-                task_id = task.get_ID()
+            # Start running tasks that aren't already running
+            if task_id not in self.task_workers:
+                logging.info("Launching task: '%s' (priority: %s)" % (task_id, priorities[task_id]))
 
-                # Check if task worker has been created for task
-                task_worker = None if task_id not in self.task_workers else self.task_workers[task_id]
+                # Child that will take over the task's processor to use the files left on it
+                affinity_task_id = None
+                if self.platform.locality_handoff:
+                    affinity_task_id = self.task_graph.get_affinity_child(task_id)
 
-                # Finalize completed tasks
-                if task_worker is not None and task_worker.get_status() == TaskWorker.COMPLETE:
-                    self.__finalize_task_worker(task_worker)
-                    continue
+                self.task_workers[task_id] = TaskWorker(task, self.datastore, self.platform,
+                                                        event_queue=self.events,
+                                                        priority=priorities[task_id],
+                                                        affinity_task_id=affinity_task_id,
+                                                        call_cache=self.call_cache)
+                self.task_workers[task_id].start()
 
-                # Start running tasks that are ready to run but aren't currently
-                if task_worker is None and self.task_graph.parents_complete(task_id) and not task.is_deprecated():
-                    logging.info("Launching task: '%s'" % task_id)
-                    self.task_workers[task_id] = TaskWorker(task, self.datastore, self.platform)
-                    self.task_workers[task_id].start()
+    def __finalize_complete_task_workers(self):
+        # Finalize any task workers that have completed but haven't been finalized
+        for task_id, task_worker in list(self.task_workers.items()):
+            if task_worker.get_status() == TaskWorker.COMPLETE:
+                self.__finalize_task_worker(task_worker)
 
-            # Sleeping for 5 seconds before checking again
-            time.sleep(5)
+    def __wait_for_event(self, status):
+        # Return the id of the next task to report the given status, or None if no such event arrived in time
+        while True:
+            try:
+                task_id, new_status = self.events.get(timeout=self.EVENT_TIMEOUT)
+            except queue.Empty:
+                return None
+
+            # Ignore intermediate status changes
+            if new_status == status:
+                return task_id
 
     def __finalize_task_worker(self, task_worker):
 
@@ -76,7 +128,11 @@ class Scheduler(object):
                 self.task_graph.split_graph(task.get_ID())
 
             # Set task to complete if task worker completed successfully
-            task.set_complete(True)
+            self.task_graph.set_complete(task.get_ID())
+
+            # Record completed task so it doesn't need to be re-run if the pipeline is resumed
+            if self.journal is not None:
+                self.journal.record_task(task, task_worker.get_runtime(), task_worker.get_cost(), task_worker.get_start_time())
 
     def __finalize(self):
 
@@ -87,15 +143,10 @@ class Scheduler(object):
         self.__cancel_unfinished_tasks()
 
         # Wait for all jobs to finish
-        done = False
-        while not done:
+        while True:
             # Wait for all task workers to finish up cancelling
             done = True
             for task_id, task_worker in self.task_workers.items():
-                if not task_worker.get_status() is TaskWorker.FINALIZED:
-                    # Indicate that not all tasks have been finalized
-                    done = False
-
                 # Finalize tasks that have finished running/cancelling
                 if task_worker.get_status() is TaskWorker.COMPLETE:
                     try:
@@ -108,8 +159,15 @@ class Scheduler(object):
                             if str(e) != "":
                                 logging.error("Received the following message:\n%s" % e)
 
-            # Wait for a bit before checking again
-            time.sleep(5)
+                if not task_worker.get_status() is TaskWorker.FINALIZED:
+                    # Indicate that not all tasks have been finalized
+                    done = False
+
+            if done:
+                break
+
+            # Wait for another task worker to finish running/cancelling before checking again
+            self.__wait_for_event(TaskWorker.COMPLETE)
 
     def __cancel_unfinished_tasks(self):
         # Cancel any still-running jobs
@@ -25,10 +25,12 @@ class Task(object):
         # Get the config inputs
         self.__module_args          = kwargs.pop("args", [])
 
-        # Initialize modules
-        self.module                 = self.__load_module(self.__module_name,
-                                                         is_docker=self.__docker_image is not None,
-                                                         submodule=self.__submodule_name)
+        # Get module class and id
+        self.__module_class         = self.__load_module(self.__module_name, submodule=self.__submodule_name)
+        self.__module_id            = self.__get_module_id(self.__module_name, submodule=self.__submodule_name)
+
+        # Module is initialized the first time it's needed
+        self.__module               = None
 
         # Whether task has been completed
         self.complete   = False
@@ -59,7 +61,8 @@ class Task(object):
         # visible_samples is list of samples visible to new split
 
         # Create copy of current task and give new id
-        split_task = copy.deepcopy(self)
+        # Config metadata (module args, final output keys) is never modified so it's shared with the split task
+        split_task = copy.copy(self)
         new_id = "%s.%s" % (self.__task_id, split_id)
         split_task.__task_id = new_id
 
@@ -80,25 +83,35 @@ class Task(object):
         # Specify that new split task is the result of a split
         split_task.__is_split = True
 
-        # Give new module id to module
-        split_task.module.set_ID(new_id)
+        # Split task gets its own module with the new id when it's first needed
+        # Tasks are only split before they run so there's no module state that needs to be copied
+        split_task.__module     = None
+        split_task.__module_id  = new_id
 
-        # Remove deprecated flag possibly inherited from parent
+        # Remove deprecated and complete flags possibly inherited from parent
         split_task.__deprecated = False
+        split_task.complete     = False
 
         return split_task
 
     def get_ID(self):
         return self.__task_id
 
+    @property
+    def module(self):
+        # Initialize module on first use so tasks are cheap to create when splitting the graph
+        if self.__module is None:
+            self.__module = self.__module_class(self.__module_id, self.__docker_image is not None)
+        return self.__module
+
     def get_module(self):
         return self.module
 
     def is_splitter_task(self):
-        return isinstance(self.module, Splitter)
+        return issubclass(self.__module_class, Splitter)
 
     def is_merger_task(self):
-        return isinstance(self.module, Merger)
+        return issubclass(self.__module_class, Merger)
 
     def get_input_args(self):
         return self.module.get_arguments()
@@ -147,7 +160,7 @@ class Task(object):
     def get_clones(self):
         return self.__clones
 
-    def __load_module(self, module_name, is_docker, submodule=None):
+    def __load_module(self, module_name, submodule=None):
 
         # Try importing the module
         try:
@@ -186,16 +199,15 @@ class Task(object):
             logging.error("Available submodules in module '%s':\n\t%s" % (module_name, available_modules))
             raise IOError("Invalid submodule '%s' specified for module '%s' in graph config!" % (submodule,module_name))
 
-        # Get the class
-        _class = _module.__dict__[submodule]
+        # Return the module class
+        return _module.__dict__[submodule]
 
+    def __get_module_id(self, module_name, submodule=None):
         # Generate the module ID
         module_id = "%s_%s" % (self.__task_id, module_name)
-        if submodule != module_name:
+        if submodule is not None and submodule != module_name:
             module_id = "%s_%s" % (module_id, submodule)
-
-        # Return instance of module class
-        return _class(module_id, is_docker)
+        return module_id
 
     def get_task_string(self, input_from=None):
         # Get the module names
@@ -242,6 +254,6 @@ class Task(object):
     def can_accept_multi_input(self):
         if self.is_merger_task():
             return True
-        elif isinstance(self.module, PseudoMerger):
+        elif issubclass(self.__module_class, PseudoMerger):
             return True
         return False
@@ -1,5 +1,4 @@
 import threading
-import time
 import math
 import logging
 
@@ -18,7 +17,7 @@ class TaskWorker(Thread):
 
     STATUSES        = ["IDLE", "LOADING", "RUNNING", "FINALIZING", "COMPLETE", "CANCELLING", "FINALIZED"]
 
-    def __init__(self, task, datastore, platform):
+    def __init__(self, task, datastore, platform, event_queue=None, priority=0, affinity_task_id=None, call_cache=None):
         # Class for executing task
 
         # Initialize new thread
@@ -35,13 +34,34 @@ class TaskWorker(Thread):
         # Platform upon which task will be executed
         self.platform = platform
 
+        # Priority of task when competing for platform resources (higher runs first)
+        self.priority = priority
+
+        # Task that processor is handed to after task finishes so it can use the output files left on it
+        self.affinity_task_id = affinity_task_id
+
+        # Outputs of previous runs that can be reused instead of running the task
+        self.call_cache = call_cache
+
+        # Hash identifying the task call in the call cache
+        self.call_key = None
+
         # Status attributes
         self.status_lock = threading.Lock()
         self.status = TaskWorker.IDLE
 
+        # Queue where (task_id, status) events are posted to notify the scheduler of status changes
+        self.event_queue = event_queue
+
         # Processor for executing task
         self.proc       = None
 
+        # Processor start time, runtime, and cost when task acquired the processor (processors can be reused across tasks)
+        self.proc_start_usage   = (None, 0, 0)
+
+        # Processor runtime and cost when task gave processor back to the platform for reuse
+        self.proc_end_usage     = None
+
         # Garbage collector for destroying instance on cancellation
         self.garbage_collector = None
 
@@ -65,6 +85,10 @@ class TaskWorker(Thread):
                                                                              self.STATUSES[self.status]))
             self.status = new_status
 
+        # Notify listeners that status has changed
+        if self.event_queue is not None:
+            self.event_queue.put((self.task.get_ID(), new_status))
+
     def get_status(self):
         # Returns instance status with threading.lock() to prevent race conditions
         with self.status_lock:
@@ -76,18 +100,24 @@ class TaskWorker(Thread):
     def get_runtime(self):
         if self.proc is None:
             return 0
+        elif self.proc_end_usage is not None:
+            return self.proc_end_usage[0] - self.proc_start_usage[1]
         else:
-            return self.proc.get_runtime()
+            return self.proc.get_runtime() - self.proc_start_usage[1]
 
     def get_cost(self):
         if self.proc is None:
             return 0
+        elif self.proc_end_usage is not None:
+            return self.proc_end_usage[1] - self.proc_start_usage[2]
         else:
-            return self.proc.compute_cost()
+            return self.proc.compute_cost() - self.proc_start_usage[2]
 
     def get_start_time(self):
         if self.proc is None:
             return None
+        elif self.proc_start_usage[0] is not None:
+            return self.proc_start_usage[0]
         else:
             return self.proc.get_start_time()
 
@@ -112,12 +142,17 @@ class TaskWorker(Thread):
             disk_space      = self.__compute_disk_requirements(input_files, docker_image)
             logging.debug("(%s) CPU: %s, Mem: %s, Disk space: %s" % (self.task.get_ID(), cpus, mem, disk_space))
 
-            # Wait for platform to have enough resources to run task
-            while not self.platform.can_make_processor(cpus, mem, disk_space) and not self.is_cancelled():
-                time.sleep(5)
-
-            # Quit if pipeline is cancelled
-            self.__check_cancelled()
+            # Reuse output of an identical call from a previous run instead of running task again
+            if self.call_cache is not None:
+                self.call_key = self.call_cache.get_call_key(self.task, docker_image)
+                cached_output = self.call_cache.get_output(self.call_key)
+                if cached_output is not None:
+                    logging.info("(%s) Reusing output of identical call from a previous run!" % self.task.get_ID())
+                    self.module.restore_output(cached_output)
+                    self.set_status(self.FINALIZING)
+                    with self.status_lock:
+                        self.__err = False
+                    return
 
             # Define unique workspace for task input/output
             task_workspace = self.datastore.get_task_workspace(task_id=self.task.get_ID())
@@ -126,36 +161,51 @@ class TaskWorker(Thread):
             # Specify that module output files should be placed in task's working directory
             self.module.set_output_dir(task_workspace.get_wrk_out_dir())
 
-            # Execute command if one exists
-            self.set_status(self.LOADING)
-
             # Check if there is any command that needs to be run
             has_command = self.module.get_command() is not None
 
+            # Tasks without a command only need a small processor
+            if not has_command:
+                cpus, mem = 1, 1
+
+            # Wait for platform to reserve enough resources to run task
+            if not self.platform.reserve_resources(self.task.get_ID(), cpus, mem, disk_space, priority=self.priority):
+                logging.debug("(%s) Resource request cancelled!" % self.task.get_ID())
+
+            # Quit if pipeline is cancelled
+            self.__check_cancelled()
+
+            # Execute command if one exists
+            self.set_status(self.LOADING)
+
             # Create the specific processor for the task
-            if has_command:
-                # Get processor capable of running job
-                self.proc = self.platform.get_processor(self.task.get_ID(), cpus, mem, disk_space)
-                logging.debug("(%s) Successfully acquired processor!" % self.task.get_ID())
-            else:
-                # Get small processor
-                self.proc = self.platform.get_processor(self.task.get_ID(), 1, 1, disk_space)
-                logging.debug("(%s) Successfully acquired processor!" % self.task.get_ID())
+            self.proc = self.platform.get_processor(self.task.get_ID(), cpus, mem, disk_space)
+            logging.debug("(%s) Successfully acquired processor!" % self.task.get_ID())
 
             # Check to see if pipeline has been cancelled
             self.__check_cancelled()
 
-            # Create the processor
-            self.proc.create()
+            # Create the processor unless it was reused from another task
+            if self.proc.is_recycled():
+                # Charge time the processor spent waiting in the pool to this task
+                self.proc_start_usage = self.proc.get_recycled_usage()
+            else:
+                self.proc.create()
 
             # Check to see if pipeline has been cancelled
             self.__check_cancelled()
 
+            # Input files need room on the processor once they're loaded
+            load_size = self.__compute_load_size(input_files, docker_image) if has_command else 0
+
             # Create module executor
             self.module_executor = ModuleExecutor(task_id=self.task.get_ID(),
                                                   processor=self.proc,
                                                   workspace=task_workspace,
-                                                  docker_image=docker_image)
+                                                  docker_image=docker_image,
+                                                  max_transfers=self.platform.max_transfers,
+                                                  bulk_transfers=self.platform.bulk_transfers,
+                                                  min_free_space=load_size)
 
             # Check to see if pipeline has been cancelled
             self.__check_cancelled()
@@ -183,9 +233,6 @@ class TaskWorker(Thread):
                     logging.info("Task '{0}' has a list of commands, so we will run them sequentially.".format(
                         self.task.get_ID()))
 
-                    # Initialize the output and error placeholders
-                    out, err = None, None
-
                     # Process each command
                     for cmd_id, cmd in enumerate(self.cmd):
 
@@ -193,13 +240,13 @@ class TaskWorker(Thread):
                         job_name = "{0}_{1}".format(self.task.get_ID(), cmd_id)
 
                         # Run the actual command
-                        out, err = self.module_executor.run(cmd, job_name=job_name)
+                        self.module_executor.run(cmd, job_name=job_name)
 
                         # Check to see if pipeline has been cancelled
                         self.__check_cancelled()
 
                     # Post-process only last command output if necessary
-                    self.module.process_cmd_output(out, err)
+                    self.__process_cmd_output(job_name)
 
                     if not self.module.is_resumable:
                         self.proc.add_checkpoint(False) # mark a checkpoint after the command(s) have been run
@@ -207,17 +254,20 @@ class TaskWorker(Thread):
                 else:
 
                     # Run the actual command
-                    out, err = self.module_executor.run(self.cmd)
+                    self.module_executor.run(self.cmd)
 
                     # Check to see if pipeline has been cancelled
                     self.__check_cancelled()
 
                     # Post-process command output if necessary
-                    self.module.process_cmd_output(out, err)
+                    self.__process_cmd_output(self.task.get_ID())
 
                     if not self.module.is_resumable:
                         self.proc.add_checkpoint(False) # mark a checkpoint after the command has been run
 
+                # Stop streaming inputs and make sure the command read complete files
+                self.module_executor.close_streams()
+
             # Set the status to finalized
             self.set_status(self.FINALIZING)
 
@@ -227,6 +277,10 @@ class TaskWorker(Thread):
             if len(output_files) > 0:
                 self.module_executor.save_output(output_files, final_output_types)
 
+            # Save output so identical calls in later runs can reuse it
+            if self.call_key is not None and not self.__cancelled:
+                self.call_cache.add_output(self.call_key, self.task.get_ID(), self.module.get_output())
+
             # Indicate that task finished without any errors
             if not self.__cancelled:
                 with self.status_lock:
@@ -261,6 +315,9 @@ class TaskWorker(Thread):
         self.set_status(self.CANCELLING)
         self.__cancelled = True
 
+        # Stop waiting on platform resources
+        self.platform.cancel_resource_request(self.task.get_ID())
+
         if self.proc is not None:
             # Prevent further commands from being run on processor
             self.proc.stop()
@@ -277,10 +334,20 @@ class TaskWorker(Thread):
 
     def __clean_up(self):
 
-        # Do nothing if errors occurred before processor was even created
+        # Give back any resources reserved before processor was created
         if self.proc is None:
+            self.platform.release_resources(self.task.get_ID())
             return
 
+        # Stop filling named pipes of inputs the failed command never finished reading
+        try:
+            if self.module_executor is not None and not self.__cancelled:
+                self.module_executor.close_streams()
+        except BaseException as e:
+            logging.error("Unable to stop streaming inputs for task '%s'!" % self.task.get_ID())
+            if str(e) != "":
+                logging.error("Received following error:\n%s" % e)
+
         # Try to return task log
         try:
             # Unlock processor if it's been locked so logs can be returned
@@ -291,6 +358,23 @@ class TaskWorker(Thread):
             if str(e) != "":
                 logging.error("Received following error:\n%s" % e)
 
+        # Give processor back to the platform so it can be reused by another task
+        try:
+            if self.is_success() and not self.__cancelled:
+                proc_end_usage = (self.proc.get_runtime(), self.proc.compute_cost())
+
+                # Prefer handing processor to the child that needs the files left on it
+                handed_off = self.affinity_task_id is not None \
+                             and self.platform.hand_off_processor(self.proc, self.affinity_task_id)
+
+                if handed_off or self.platform.recycle_processor(self.proc):
+                    self.proc_end_usage = proc_end_usage
+                    return
+        except BaseException as e:
+            logging.error("Unable to recycle processor '%s' for task '%s'" % (self.proc.get_name(), self.task.get_ID()))
+            if str(e) != "":
+                logging.error("Received following error:\n%s" % e)
+
         # Try to destroy platform if it's not off
         try:
 
@@ -305,6 +389,33 @@ class TaskWorker(Thread):
             if str(e) != "":
                 logging.error("Received following error:\n%s" % e)
 
+    def __process_cmd_output(self, job_name):
+        # Pass output of module command to the module
+        # Output is read back from the processor only if the module uses it, one line at a time if the module supports it
+        if not self.module.uses_cmd_output() and not self.module.uses_cmd_output_lines():
+            return
+
+        out_buffer, err_buffer = self.proc.get_output_buffers(job_name)
+        if self.module.uses_cmd_output_lines():
+            for line in out_buffer.iter_lines():
+                self.module.process_cmd_output_line(line)
+        if self.module.uses_cmd_output():
+            self.module.process_cmd_output(out_buffer.getvalue(), err_buffer.getvalue())
+
+    def __compute_load_size(self, input_files, docker_image):
+        # Compute size of files that will take up space on the processor once inputs are loaded
+        load_size = 0 if docker_image is None else docker_image.get_size()
+        for input_file in input_files:
+            # Skip files that aren't copied or are already on the processor
+            if not input_file.is_remote() or input_file.is_flagged("reference"):
+                continue
+            if self.__is_streamed(input_file):
+                continue
+            if self.proc.has_local_replica(input_file.get_transferrable_path()):
+                continue
+            load_size += input_file.get_size()
+        return load_size
+
     def __compute_disk_requirements(self, input_files, docker_image, input_multiplier=None):
         # Compute size of disk needed to store input/output files
         input_size = 0
@@ -315,6 +426,11 @@ class TaskWorker(Thread):
 
         # Add sizes of each input file
         for input_file in input_files:
+            # Files on the reference disk are read where they are
+            # Streamed files are read from a named pipe so they don't take up space themselves
+            if input_file.is_flagged("reference") or self.__is_streamed(input_file):
+                continue
+
             # Overestimate for gzipped files
             if input_file.get_path().endswith(".gz"):
                 input_size += input_file.get_size()*5
@@ -339,6 +455,12 @@ class TaskWorker(Thread):
         disk_size = min(disk_size, max_disk_size)
         return disk_size
 
+    @staticmethod
+    def __is_streamed(input_file):
+        # Only single remote files are read from a named pipe (see ModuleExecutor)
+        return input_file.is_flagged("stream") and input_file.is_remote() \
+               and input_file.containing_dir is None and not input_file.is_prefix()
+
     def __check_cancelled(self):
         if self.__cancelled:
             raise RuntimeError("(%s) Task failed due to cancellation!")
@@ -0,0 +1,297 @@
+import os
+import json
+import zlib
+import base64
+import logging
+import threading
+import subprocess as sp
+
+from System.Platform import OutputBuffer
+
+class AgentChannelError(Exception):
+    pass
+
+class AgentChannel(object):
+    # Single persistent connection to a command agent running on a processor
+    # Commands sent over the channel run concurrently on the processor without opening a new connection each
+
+    # Agent program started on the processor
+    AGENT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "RemoteAgent.py")
+
+    # Number of characters of the connection's own error output kept to explain why it closed
+    MAX_ERR_LENGTH = 4096
+
+    def __init__(self, name):
+
+        # Name of processor the channel connects to
+        self.name = name
+
+        # Process holding the connection
+        self.__conn = None
+
+        # Commands that haven't finished yet (command id -> AgentProcess)
+        self.__pending = {}
+        self.__next_id = 0
+
+        # Lock for sending requests and tracking pending commands
+        self.__lock = threading.Lock()
+
+        # Set once agent reports it's accepting commands
+        self.__ready = threading.Event()
+
+        # Whether channel can accept commands
+        self.__connected = False
+
+        # Tail of the connection's error output
+        self.__conn_err = ""
+
+    @staticmethod
+    def get_agent_cmd():
+        # Return command that starts the agent. Agent is sent inline so nothing needs to be installed on the processor.
+        with open(AgentChannel.AGENT_SCRIPT, "rb") as agent_fh:
+            agent = base64.b64encode(zlib.compress(agent_fh.read())).decode("utf8")
+        return "python3 -u -c \"import base64,zlib;exec(zlib.decompress(base64.b64decode('%s')))\"" % agent
+
+    def connect(self, connect_cmd, timeout=60):
+        # Open connection by running a command that starts the agent on the processor
+        # Returns False if the agent didn't start accepting commands in time
+        self.close()
+
+        logging.debug("(%s) Starting command agent..." % self.name)
+        self.__ready.clear()
+        self.__conn_err = ""
+        self.__conn = sp.Popen(connect_cmd, shell=True, stdin=sp.PIPE, stdout=sp.PIPE, stderr=sp.PIPE, bufsize=0)
+
+        # Read messages and errors from connection in background
+        for target, pipe in [(self.__read_messages, self.__conn.stdout), (self.__read_errors, self.__conn.stderr)]:
+            reader = threading.Thread(target=target, args=(self.__conn, pipe))
+            reader.daemon = True
+            reader.start()
+
+        if not self.__ready.wait(timeout) or self.__conn.poll() is not None:
+            logging.debug("(%s) Command agent didn't start! Received the following error:\n%s" % (self.name, self.__conn_err))
+            self.close()
+            return False
+
+        with self.__lock:
+            self.__connected = True
+        logging.debug("(%s) Command agent is ready!" % self.name)
+        return True
+
+    def is_connected(self):
+        with self.__lock:
+            return self.__connected
+
+    def run(self, args, **kwargs):
+        # Start running a command through the agent and return process used to wait on it
+        with self.__lock:
+            if not self.__connected:
+                raise AgentChannelError("Agent channel to '%s' isn't connected!" % self.name)
+
+            cmd_id = self.__next_id
+            self.__next_id += 1
+            proc = AgentProcess(self, cmd_id, **kwargs)
+            self.__pending[cmd_id] = proc
+
+            try:
+                self.__send({"id": cmd_id, "cmd": args})
+            except (OSError, ValueError):
+                self.__pending.pop(cmd_id)
+                self.__connected = False
+                raise AgentChannelError("Unable to send command to agent on '%s'!" % self.name)
+
+        return proc
+
+    def kill(self, cmd_id):
+        # Ask agent to terminate a running command
+        with self.__lock:
+            if not self.__connected:
+                return
+            try:
+                self.__send({"kill": cmd_id})
+            except (OSError, ValueError):
+                pass
+
+    def close(self):
+        # Close connection. Agent terminates any command still running when its input is closed.
+        with self.__lock:
+            self.__connected = False
+            conn = self.__conn
+
+        if conn is None:
+            return
+
+        try:
+            conn.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            conn.wait(timeout=10)
+        except sp.TimeoutExpired:
+            conn.kill()
+            conn.wait()
+
+    def __send(self, msg):
+        # Caller must hold lock
+        self.__conn.stdin.write(("%s\n" % json.dumps(msg)).encode("utf8"))
+        self.__conn.stdin.flush()
+
+    def __read_messages(self, conn, pipe):
+        # Hand messages from agent to the commands they belong to
+        for line in iter(pipe.readline, b""):
+            try:
+                msg = json.loads(line.decode("utf8"))
+            except ValueError:
+                logging.debug("(%s) Ignoring unexpected agent output: %s" % (self.name, line))
+                continue
+
+            if msg.get("ready"):
+                self.__ready.set()
+                continue
+
+            with self.__lock:
+                proc = self.__pending.get(msg["id"])
+                if proc is not None and "returncode" in msg:
+                    self.__pending.pop(msg["id"])
+            if proc is None:
+                continue
+
+            if "out" in msg:
+                proc.add_output(out=msg["out"])
+            if "err" in msg:
+                proc.add_output(err=msg["err"])
+            if "returncode" in msg:
+                proc.finish(msg["returncode"])
+
+        # Connection was closed so commands still running will never report back
+        conn.wait()
+        with self.__lock:
+            if self.__conn is conn:
+                self.__connected = False
+            pending = list(self.__pending.values())
+            self.__pending = {}
+        self.__ready.set()
+
+        # Fail commands the same way a dropped SSH connection does so they are handled like any other SSH failure
+        err = "%s\nAgent connection closed by %s!\n" % (self.__conn_err, self.name)
+        for proc in pending:
+            proc.add_output(err=err)
+            proc.finish(255)
+
+    def __read_errors(self, conn, pipe):
+        # Keep tail of the connection's error output
+        for line in iter(pipe.readline, b""):
+            self.__conn_err = (self.__conn_err + line.decode("utf8", "replace"))[-self.MAX_ERR_LENGTH:]
+
+
+class AgentProcess(object):
+    # Command running through an agent channel
+    # Provides the same interface as a Process so processors can wait on and retry it the same way
+
+    def __init__(self, channel, cmd_id, **kwargs):
+        self.channel        = channel
+        self.cmd_id         = cmd_id
+        self.command        = kwargs.pop("cmd",     True)
+        self.num_retries    = kwargs.pop("num_retries", 0)
+        self.docker_image   = kwargs.pop("docker_image", None)
+        # Quiet failure means logger will not register command failure as error
+        self.quiet          = kwargs.pop("quiet_failure", False)
+        self.log_success    = kwargs.pop("log_success", True)
+        self.complete       = False
+        self.stopped        = False
+
+        # Set rerunning status
+        self.to_rerun       = False
+
+        # Exit code once command finishes
+        self.returncode     = None
+
+        # Output received so far
+        self.out_buffer     = OutputBuffer()
+        self.err_buffer     = OutputBuffer()
+        self.__finished     = threading.Event()
+
+    def add_output(self, out=None, err=None):
+        if out is not None:
+            self.out_buffer.write(out)
+        if err is not None:
+            self.err_buffer.write(err)
+
+    def finish(self, returncode):
+        self.returncode = returncode
+        self.__finished.set()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if not self.__finished.wait(timeout):
+            raise sp.TimeoutExpired(self.command, timeout)
+        return self.returncode
+
+    def collect_output(self):
+        # Wait for command to finish and return buffers holding its stdout and stderr
+        self.wait()
+        return self.out_buffer, self.err_buffer
+
+    def get_output_buffers(self):
+        return self.out_buffer, self.err_buffer
+
+    def close_output(self):
+        # Free output once nothing will read it anymore
+        self.out_buffer.close()
+        self.err_buffer.close()
+
+    def terminate(self):
+        self.channel.kill(self.cmd_id)
+
+    def is_complete(self):
+        return self.complete
+
+    def set_complete(self):
+        self.complete = True
+
+    def has_failed(self):
+        ret_code = self.poll()
+        return ret_code is not None and ret_code != 0
+
+    def get_command(self):
+        return self.command
+
+    def get_num_retries(self):
+        return self.num_retries
+
+    def get_docker_image(self):
+        return self.docker_image
+
+    def get_output(self):
+        return self.out, self.err
+
+    # Output is read from the buffers holding it so it isn't kept twice
+    # Output too large to keep in memory is only returned in part
+    @property
+    def out(self):
+        return self.out_buffer.get_text()
+
+    @property
+    def err(self):
+        return self.err_buffer.get_text()
+
+    def is_quiet(self):
+        return self.quiet
+
+    def stop(self):
+        self.stopped = True
+        self.terminate()
+
+    def is_stopped(self):
+        return self.stopped
+
+    def do_log_success(self):
+        return self.log_success
+
+    def set_to_rerun(self):
+        self.to_rerun = True
+
+    def needs_rerun(self):
+        return self.to_rerun
@@ -1,3 +1,4 @@
+import json
 import logging
 
 class DockerHelper(object):
@@ -6,28 +7,36 @@ class DockerHelper(object):
     def __init__(self, proc):
         self.proc = proc
 
-    def pull(self, image_name, job_name=None, log=True, **kwargs):
+    def pull(self, image_name, job_name=None, log=True, digest=None, **kwargs):
         # Pull docker image on local processor
         cmd = "sudo docker pull %s" % image_name
 
+        # Use copy already on processor (e.g. baked into its disk image) if it's the same version of the image
+        if digest is not None:
+            cmd = "[ \"$(sudo docker image inspect %s --format='{{.Id}}' 2>/dev/null)\" = \"%s\" ] || %s" % \
+                  (image_name, digest, cmd)
+
         job_name = "pull_%s" % image_name if job_name is None else job_name
 
         # Optionally add logging
-        cmd = "%s !LOG3!" % cmd if log else cmd
+        cmd = "( %s ) !LOG3!" % cmd if log else cmd
 
         # Run command and return job name
         self.proc.run(job_name, cmd, **kwargs)
         return job_name
 
     def image_exists(self, image_name, job_name=None, **kwargs):
-        # Return true if file exists, false otherwise
+        # Return true if image is on the processor or its manifest can be found in the registry, false otherwise
+        # Image isn't pulled
+        cmd = "sudo docker image inspect %s >/dev/null 2>&1 || %s >/dev/null" % \
+              (image_name, self.__get_manifest_cmd(image_name))
 
         # Run command and return job name
         job_name = "check_exists_%s" % image_name if job_name is None else job_name
+        self.proc.run(job_name, cmd, quiet_failure=False, **kwargs)
 
         # Wait for cmd to finish and get output
         try:
-            self.pull(image_name, job_name, log=False, quiet_failure=False, **kwargs)
             self.proc.wait_process(job_name)
             return True
         except RuntimeError as e:
@@ -40,23 +49,66 @@ class DockerHelper(object):
 
     def get_image_size(self, image_name, job_name=None, **kwargs):
         # Return file size in gigabytes
-        cmd = "sudo docker image inspect %s --format='{{.Size}}'" % image_name
-
-        # Run command and return job name
+        # Images that aren't on the processor are sized by the layers that would be downloaded
         job_name = "get_size_%s" % image_name if job_name is None else job_name
-        self.proc.run(job_name, cmd, **kwargs)
 
-        # Wait for cmd to finish and get output
         try:
-            # Try to return file size in gigabytes
-            out, err = self.proc.wait_process(job_name)
-            # Iterate over all files if multiple files (can happen if wildcard)
-            bytes = [int(x.split()[0]) for x in out.split("\n") if x != ""]
-            # Add them up and divide by billion bytes
-            return sum(bytes)/(1024**3.0)
+            local_size, manifest = self.__inspect_image(image_name, "{{.Size}}", job_name, **kwargs)
+            if local_size is not None:
+                return int(local_size)/(1024**3.0)
+            return sum([layer["size"] for layer in manifest["layers"]])/(1024**3.0)
 
         except BaseException as e:
             logging.error("Unable to check docker image size: %s" % image_name)
             if str(e) != "":
                 logging.error("Received the following msg:\n%s" % e)
             raise
+
+    def get_image_digest(self, image_name, job_name=None, **kwargs):
+        # Return content digest of image so images re-pushed under the same tag can be told apart
+        # Digest of the image config in the registry is the id the image gets once it's pulled
+        job_name = "get_digest_%s" % image_name if job_name is None else job_name
+
+        try:
+            local_digest, manifest = self.__inspect_image(image_name, "{{.Id}}", job_name, **kwargs)
+            if local_digest is not None:
+                return local_digest
+            return manifest["config"]["digest"]
+
+        except BaseException as e:
+            logging.error("Unable to check docker image digest: %s" % image_name)
+            if str(e) != "":
+                logging.error("Received the following msg:\n%s" % e)
+            raise
+
+    def __inspect_image(self, image_name, field, job_name, **kwargs):
+        # Return field of image on the processor, or the image's registry manifest if it isn't on the processor
+        cmd = "sudo docker image inspect %s --format='local %s' 2>/dev/null || %s" % \
+              (image_name, field, self.__get_manifest_cmd(image_name, verbose=True))
+        self.proc.run(job_name, cmd, **kwargs)
+
+        out, err = self.proc.wait_process(job_name)
+        if out.startswith("local "):
+            return out[len("local "):].strip(), None
+        return None, self.__select_manifest(image_name, out)
+
+    @staticmethod
+    def __get_manifest_cmd(image_name, verbose=False):
+        # Older docker clients only have manifest commands when experimental features are enabled
+        return "sudo DOCKER_CLI_EXPERIMENTAL=enabled docker manifest inspect %s%s" % ("-v " if verbose else "", image_name)
+
+    @staticmethod
+    def __select_manifest(image_name, out):
+        # Return manifest of the linux/amd64 image from verbose manifest output
+        # Multi-platform images list one manifest per platform
+        manifests = json.loads(out)
+        if isinstance(manifests, dict):
+            manifests = [manifests]
+
+        for manifest in manifests:
+            platform = manifest.get("Descriptor", {}).get("platform", {})
+            if platform.get("os", "linux") == "linux" and platform.get("architecture", "amd64") == "amd64":
+                return manifest.get("SchemaV2Manifest", manifest.get("OCIManifest"))
+
+        logging.error("No linux/amd64 manifest found for docker image: %s" % image_name)
+        raise RuntimeError("Docker image '%s' has no linux/amd64 manifest!" % image_name)
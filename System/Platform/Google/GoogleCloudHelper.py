@@ -383,7 +383,8 @@ class GoogleCloudHelper(object):
         return nr_cpus, mem, instance_type
 
     @staticmethod
-    def get_instance_price(nr_cpus, mem, disk_space, instance_type, zone, is_preemptible=False, is_boot_disk_ssd=False, nr_local_ssd=0):
+    def get_instance_price(nr_cpus, mem, disk_space, instance_type, zone, is_preemptible=False, is_boot_disk_ssd=False, nr_local_ssd=0,
+                           std_disk_space=0):
 
         prices = GoogleCloudHelper.get_prices()
         region = GoogleCloudHelper.get_region(zone)
@@ -412,6 +413,9 @@ class GoogleCloudHelper(object):
         else:
             price += prices["CP-COMPUTEENGINE-STORAGE-PD-CAPACITY"][region] * disk_space / 730.0
 
+        # Get price of additional standard disks created with the instance (e.g. reference disk)
+        price += prices["CP-COMPUTEENGINE-STORAGE-PD-CAPACITY"][region] * std_disk_space / 730.0
+
         # Get price of local SSDs (if present)
         if nr_local_ssd:
             if is_preemptible:
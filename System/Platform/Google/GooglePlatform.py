@@ -32,6 +32,15 @@ class GooglePlatform(Platform):
         # Boolean for whether worker instance create by platform will be preemptible
         self.is_preemptible = self.config["task_processor"]["is_preemptible"]
 
+        # Image of a disk holding copies of the resource kit files that's attached read-only to every instance
+        self.reference_disk_image   = self.config["reference_disk_image"]
+
+        # Directory where the reference disk is mounted on instances
+        self.reference_dir          = self.standardize_dir(self.config["reference_dir"])
+
+        # Size (GB) of the copy of the reference disk each instance gets. Set once the disk image is validated.
+        self.reference_disk_size    = 0
+
         # Use authentication key file to gain access to google cloud project using Oauth2 authentication
         GoogleCloudHelper.authenticate(self.key_file)
 
@@ -57,6 +66,11 @@ class GooglePlatform(Platform):
         disk_image_info = GoogleCloudHelper.get_disk_image_info(disk_image)
         self.MIN_DISK_SPACE = int(disk_image_info["diskSizeGb"])
 
+        # Check that the reference disk can be created on instances
+        if self.reference_disk_image is not None:
+            reference_disk_info = GoogleCloudHelper.get_disk_image_info(self.reference_disk_image)
+            self.reference_disk_size = int(reference_disk_info["diskSizeGb"])
+
         # Check to see if the reporting Pub/Sub topic exists
         if not GoogleCloudHelper.pubsub_topic_exists(self.report_topic):
             logging.error("Reporting topic '%s' was not found!" % self.report_topic)
@@ -95,6 +109,33 @@ class GooglePlatform(Platform):
                             disk_space,
                             **instance_config)
 
+    def init_host_processor(self, name, nr_cpus, mem, disk_space):
+        # Googlefy instance name
+        name = self.__format_instance_name(name)
+        # Shared instances aren't preemptible so a preemption can't take down several tasks at once
+        instance_config = self.__get_instance_config()
+        return Instance(name,
+                        nr_cpus,
+                        mem,
+                        disk_space,
+                        **instance_config)
+
+    def can_reuse_processor(self, proc):
+        # Only reuse instances of the kind the platform would create for a new task
+        if proc.is_preemptible != self.is_preemptible:
+            return False
+
+        # Instance must be in the zone (or region, if zones are randomized) where new instances are created
+        if self.randomize_zone:
+            return proc.region == GoogleCloudHelper.get_region(self.zone)
+        return proc.zone == self.zone
+
+    def get_reference_path(self, path):
+        # Reference disk holds a copy of each file at <reference_dir>/<bucket>/<path within bucket>
+        if self.reference_disk_image is None or not path.startswith("gs://"):
+            return None
+        return os.path.join(self.reference_dir, path[len("gs://"):])
+
     def publish_report(self, report=None):
 
         # Exit as nothing to output
@@ -165,6 +206,9 @@ class GooglePlatform(Platform):
         # Add platform-specific options
         params["zone"]                  = self.zone
         params["service_acct"]          = self.service_acct
+        params["reference_disk_image"]  = self.reference_disk_image
+        params["reference_dir"]         = self.reference_dir
+        params["reference_disk_size"]   = self.reference_disk_size
 
         # Randomize the zone within the region if specified
         if self.randomize_zone:
@@ -1,15 +1,21 @@
+import os
 import logging
 import subprocess as sp
 import time
+import tempfile
+import threading
 import math
 import random
 import getpass
 
-from System.Platform import Process, Processor
+from System.Platform import Process, Processor, AgentChannel, AgentChannelError
 from System.Platform.Google import GoogleCloudHelper, GoogleResourceNotFound
 
 class Instance(Processor):
 
+    # Name the reference disk is attached under so it can be found on the instance
+    REFERENCE_DEVICE = "cc-reference"
+
     def __init__(self, name, nr_cpus, mem, disk_space, **kwargs):
         # Call super constructor
         super(Instance, self).__init__(name, nr_cpus, mem, disk_space, **kwargs)
@@ -22,6 +28,17 @@ class Instance(Processor):
         # Get optional arguments
         self.is_boot_disk_ssd   = kwargs.pop("is_boot_disk_ssd",    False)
         self.nr_local_ssd       = kwargs.pop("nr_local_ssd",        0)
+        self.use_agent          = kwargs.pop("use_agent",           True)
+        self.ssh_multiplexing   = kwargs.pop("ssh_multiplexing",    True)
+        self.ssh_max_channels   = kwargs.pop("ssh_max_channels",    8)
+
+        # Image of read-only disk holding resource files and where it's mounted on the instance
+        self.reference_disk_image   = kwargs.pop("reference_disk_image",    None)
+        self.reference_dir          = kwargs.pop("reference_dir",           "/mnt/reference/")
+        self.reference_disk_size    = kwargs.pop("reference_disk_size",     0)
+
+        # Pull-through registry that docker images are pulled from instead of Docker Hub
+        self.docker_registry_mirror = kwargs.pop("docker_registry_mirror",  None)
 
         # Initialize the region of the instance
         self.region             = GoogleCloudHelper.get_region(self.zone)
@@ -52,6 +69,17 @@ class Instance(Processor):
         # Initialize extenal IP
         self.external_IP = None
 
+        # Persistent connection commands are run through once the instance is ready
+        self.agent = AgentChannel(self.name)
+
+        # Socket of the master SSH connection shared by all SSH commands sent to the instance
+        self.ssh_control_path = os.path.join(tempfile.gettempdir(), "cc-ssh-%s" % self.name)
+
+        # SSH commands currently running over the shared connection
+        # Connection is only shared by a limited number of commands so the SSH server doesn't refuse new sessions
+        self.ssh_channel_procs = set()
+        self.ssh_channel_lock = threading.Lock()
+
     def update_status(self):
 
         # Initialize the number of retries
@@ -105,7 +133,7 @@ class Instance(Processor):
                     time.sleep(5)
                     retries += 1
 
-    def adapt_cmd(self, cmd):
+    def adapt_cmd(self, cmd, shared_connection=True):
         # Adapt command for running on instance through gcloud ssh
         cmd = cmd.replace("'", "'\"'\"'")
 
@@ -117,9 +145,41 @@ class Instance(Processor):
 
         cmd = "ssh -i ~/.ssh/google_compute_engine " \
               "-o CheckHostIP=no -o StrictHostKeyChecking=no " \
-              "{0}@{1} -- '{2}'".format(getpass.getuser(), self.external_IP, cmd)
+              "{0}{1}@{2} -- '{3}'".format(self.__get_ssh_multiplexing_opts(shared_connection),
+                                           getpass.getuser(), self.external_IP, cmd)
         return cmd
 
+    def start_process(self, args, **kwargs):
+        # Run command through the agent so it doesn't need its own SSH connection
+        if self.agent.is_connected():
+            try:
+                return self.agent.run(args, **kwargs)
+            except AgentChannelError as e:
+                logging.debug("(%s) %s Running command through SSH instead." % (self.name, e))
+
+        # Run command over the shared SSH connection unless all its channels are taken
+        # Callers start batches of commands before waiting on them so commands can't block waiting for a channel
+        with self.ssh_channel_lock:
+            shared = self.ssh_max_channels <= 0 or len(self.ssh_channel_procs) < self.ssh_max_channels
+            proc = Process(self.adapt_cmd(args, shared_connection=shared), **kwargs)
+            if shared:
+                self.ssh_channel_procs.add(proc)
+        return proc
+
+    def close_connections(self):
+        # Close agent and shared SSH connection before the instance goes away
+        self.agent.close()
+
+        if self.ssh_multiplexing and os.path.exists(self.ssh_control_path):
+            logging.debug("(%s) Closing shared SSH connection." % self.name)
+            cmd = "ssh -o ControlPath={0} -O exit {1}".format(self.ssh_control_path, self.name)
+            proc = sp.Popen(cmd, stderr=sp.PIPE, stdout=sp.PIPE, shell=True)
+            proc.communicate()
+
+        # Commands still holding a channel won't be waited on once the connection is gone
+        with self.ssh_channel_lock:
+            self.ssh_channel_procs = set()
+
     def create(self):
 
         if self.is_locked():
@@ -142,7 +202,8 @@ class Instance(Processor):
                                                           self.zone,
                                                           self.is_preemptible,
                                                           self.is_boot_disk_ssd,
-                                                          self.nr_local_ssd)
+                                                          self.nr_local_ssd,
+                                                          self.reference_disk_size if self.reference_disk_image else 0)
         logging.debug("(%s) Instance type is %s. Price per hour: %s cents" % (self.name, self.instance_type, self.price))
 
         # Generate gcloud create cmd
@@ -181,6 +242,7 @@ class Instance(Processor):
 
         # Set status to indicate that instance cannot run commands and is destroying
         logging.info("(%s) Process 'destroy' started!" % self.name)
+        self.close_connections()
         cmd = self.__get_gcloud_destroy_cmd()
 
         # Run command, wait for destroy to complete, and set status to 'OFF'
@@ -207,18 +269,14 @@ class Instance(Processor):
             return proc_obj.get_output()
 
         # Wait for process to finish
-        out, err = proc_obj.communicate()
+        proc_obj.collect_output()
 
-        # Convert to string formats
-        out = out.decode("utf8")
-        err = err.decode("utf8")
+        # Give back the process's channel on the shared SSH connection
+        self.__release_ssh_channel(proc_obj)
 
         # Set process to complete
         proc_obj.set_complete()
 
-        # Store process output for later use
-        proc_obj.set_output(out=out, err=err)
-
         # Case: Process completed with errors
         if proc_obj.has_failed():
             # Determine whether to retry or raise errors
@@ -239,7 +297,8 @@ class Instance(Processor):
         if proc_obj.do_log_success():
             logging.info("(%s) Process '%s' complete!" % (self.name, proc_name))
 
-        return out, err
+        # Output too large to keep in memory is only returned in part. Full output is available from get_output_buffers().
+        return proc_obj.get_output()
 
     def handle_failure(self, proc_name, proc_obj):
 
@@ -292,6 +351,7 @@ class Instance(Processor):
         if can_retry and proc_name in ["create", "destroy"]:
             time.sleep(3)
             logging.warning("(%s) Process '%s' failed but we still got %s retries left. Re-running command!" % (self.name, proc_name, proc_obj.get_num_retries()))
+            proc_obj.close_output()
             self.processes[proc_name] = Process(proc_obj.get_command(),
                                                 cmd=proc_obj.get_command(),
                                                 stdout=sp.PIPE,
@@ -348,9 +408,19 @@ class Instance(Processor):
             # Check if ssh server is accessible. If not wait another cycle
             if self.check_ssh():
 
-                # Increase number of SSH connections
+                # Increase number of SSH connections the instance accepts
+                # Needed whenever commands open their own connection (e.g. agent can't be started or was lost)
                 self.__configure_SSH()
 
+                # Run commands through a single agent connection instead of a new SSH connection each
+                self.start_agent()
+
+                # Make resource files on the reference disk available to commands
+                self.__mount_reference_disk()
+
+                # Pull docker images through the registry mirror
+                self.__configure_docker_mirror()
+
                 # We do not need to recreate it
                 needs_recreate = False
 
@@ -365,6 +435,18 @@ class Instance(Processor):
         self.ssh_ready = True
         logging.debug("(%s) Instance can be accessed through SSH!" % self.name)
 
+    def start_agent(self):
+        # Start agent that runs commands over a single persistent SSH connection
+        # Returns False if commands need to be run through separate SSH connections
+        if not self.use_agent:
+            return False
+
+        if self.agent.connect(self.adapt_cmd(AgentChannel.get_agent_cmd())):
+            return True
+
+        logging.warning("(%s) Unable to start command agent. Commands will be run through separate SSH connections!" % self.name)
+        return False
+
     def raise_error(self, proc_name, proc_obj):
         # Log failure to debug logger if quiet failure
         stdout_msg, stderr_msg = proc_obj.get_output()
@@ -423,6 +505,16 @@ class Instance(Processor):
         # Otherwise, return only if there is ssh in the received header
         return "ssh" in out.lower()
 
+    def __get_ssh_multiplexing_opts(self, shared_connection=True):
+        # Options making SSH commands share one connection to the instance so only the first pays for the handshake
+        if not self.ssh_multiplexing or not shared_connection:
+            return ""
+        return "-o ControlMaster=auto -o ControlPath={0} -o ControlPersist=600 ".format(self.ssh_control_path)
+
+    def __release_ssh_channel(self, proc_obj):
+        with self.ssh_channel_lock:
+            self.ssh_channel_procs.discard(proc_obj)
+
     def __configure_SSH(self, max_connections=500, log=False):
 
         # Don't try to reincrease the SSH connection
@@ -451,6 +543,31 @@ class Instance(Processor):
         # Set instance as connections already increased
         self.ssh_connections_increased = True
 
+    def __mount_reference_disk(self):
+        # Mount reference disk read-only. Skip if it's still mounted from before the instance was last started.
+        if self.reference_disk_image is None:
+            return
+
+        logging.debug("(%s) Mounting reference disk at '%s'." % (self.name, self.reference_dir))
+        device = "/dev/disk/by-id/google-%s" % self.REFERENCE_DEVICE
+        cmd = "sudo mkdir -p {0} && (mountpoint -q {0} || sudo mount -o ro,noload {1} {0})".format(self.reference_dir,
+                                                                                                    device)
+        self.run("mountReference", cmd)
+        self.wait_process("mountReference")
+
+    def __configure_docker_mirror(self):
+        # Add registry mirror to the docker daemon config, keeping any other settings, and restart docker to use it
+        if self.docker_registry_mirror is None:
+            return
+
+        logging.debug("(%s) Pulling docker images through registry mirror '%s'." % (self.name, self.docker_registry_mirror))
+        cmd = "sudo python3 -c \"import json, os; p = '/etc/docker/daemon.json'; " \
+              "c = json.load(open(p)) if os.path.exists(p) else {}; " \
+              "c['registry-mirrors'] = ['%s']; json.dump(c, open(p, 'w'))\" " \
+              "&& sudo systemctl restart docker" % self.docker_registry_mirror
+        self.run("configureDockerMirror", cmd)
+        self.wait_process("configureDockerMirror")
+
     def __get_gcloud_create_cmd(self):
         # Create base command
         args = list()
@@ -485,6 +602,12 @@ class Instance(Processor):
         # Add local ssds if necessary
         args.extend(["--local-ssd interface=scsi" for _ in range(self.nr_local_ssd)])
 
+        # Add read-only copy of the reference disk that's deleted along with the instance
+        if self.reference_disk_image is not None:
+            args.append("--create-disk")
+            args.append("image=%s,mode=ro,auto-delete=yes,device-name=%s" % (self.reference_disk_image,
+                                                                            self.REFERENCE_DEVICE))
+
         # Specify google cloud access scopes
         args.append("--scopes")
         args.append("cloud-platform")
@@ -59,6 +59,7 @@ class PreemptibleInstance(Instance):
     def stop(self):
 
         logging.info("(%s) Process 'stop' started!" % self.name)
+        self.close_connections()
         cmd = self.__get_gcloud_stop_cmd()
 
         # Run command to stop the instances
@@ -351,6 +352,7 @@ class PreemptibleInstance(Instance):
         elif can_retry and proc_name in ["create", "destroy"]:
             time.sleep(3)
             logging.warning("(%s) Process '%s' failed but we still got %s retries left. Re-running command!" % (self.name, proc_name, proc_obj.get_num_retries()))
+            proc_obj.close_output()
             self.processes[proc_name] = Process(proc_obj.get_command(),
                                                 cmd=proc_obj.get_command(),
                                                 stdout=sp.PIPE,
@@ -0,0 +1,137 @@
+import os
+import shutil
+import logging
+
+from System.Platform import Platform
+from System.Platform.Local import LocalProcessor
+
+class LocalPlatform(Platform):
+
+    CONFIG_SPEC = "System/Platform/Local/LocalPlatform.validate"
+
+    def __init__(self, name, platform_config_file, final_output_dir):
+        # Call super constructor from Platform
+        super(LocalPlatform, self).__init__(name, platform_config_file, final_output_dir)
+
+        # Commands are run from wherever the pipeline was launched so directories need to be absolute
+        self.wrk_dir            = self.standardize_dir(os.path.abspath(self.wrk_dir))
+        self.final_output_dir   = self.standardize_dir(os.path.abspath(self.final_output_dir))
+
+        # How task commands are limited to the CPUs and memory they requested
+        self.isolation          = self.config["isolation"]
+
+        # Whether commands are run with sudo like they are on cloud instances
+        self.use_sudo           = self.config["use_sudo"]
+
+        # Platform can't use more resources than the machine has
+        self.__limit_to_host_resources()
+
+        # Tasks already share the machine's disk and processors cost nothing to create
+        # so there's no reason to hand off, pool, or pack processors
+        self.locality_handoff   = False
+        self.pool_idle_ttl      = 0
+        self.packing_host_cpus  = 0
+
+    def validate(self):
+        # Check that final output dir is on the local machine
+        if ":" in self.final_output_dir:
+            logging.error("Invalid final output directory: %s. Local platform output directory must be a local path!"
+                          % self.final_output_dir)
+            raise IOError("Invalid final output directory!")
+
+        # Check that tasks can be limited to the resources they requested
+        if self.isolation == "systemd" and shutil.which("systemd-run") is None:
+            logging.error("Local platform cannot isolate tasks with systemd because 'systemd-run' wasn't found! "
+                          "Set 'isolation' to 'none' to run tasks without resource limits.")
+            raise IOError("Unable to isolate tasks on local platform!")
+
+        # Create workspace and final output directories
+        for dir_path in [self.wrk_dir, self.final_output_dir]:
+            if not os.path.exists(dir_path):
+                logging.info("Directory '%s' does not exist. Creating it now!" % dir_path)
+                os.makedirs(dir_path)
+
+    def init_helper_processor(self, name, nr_cpus, mem, disk_space):
+        # Helper only runs short commands on the machine so it doesn't need resources set aside
+        # Logs of its commands are written to the workspace instead of the directory the pipeline was launched from
+        return LocalProcessor(name,
+                              0,
+                              0,
+                              0,
+                              log_dir=self.wrk_dir,
+                              **self.__get_processor_config(isolation="none"))
+
+    def init_task_processor(self, name, nr_cpus, mem, disk_space):
+        # Return a processor object with given resource requirements
+        return LocalProcessor(name,
+                              nr_cpus,
+                              mem,
+                              disk_space,
+                              **self.__get_processor_config())
+
+    def publish_report(self, report=None):
+
+        # Exit as nothing to output
+        if report is None:
+            return
+
+        # Write report to the final output directory
+        report_path = os.path.join(self.final_output_dir, "%s_final_report.json" % self.name)
+        with open(report_path, "w") as report_file:
+            report_file.write(str(report))
+
+    def clean_up(self):
+
+        logging.info("Cleaning up local platform.")
+
+        # Initiate destroy process on all the processors that haven't been destroyed
+        for proc_name, proc_obj in self.processors.items():
+            try:
+                if proc_name not in self.dealloc_procs:
+                    proc_obj.destroy(wait=False)
+            except RuntimeError:
+                logging.warning("(%s) Could not destroy processor!" % proc_name)
+
+        # Now wait for all destroy processes to finish
+        for proc_name, proc_obj in self.processors.items():
+            try:
+                if proc_name not in self.dealloc_procs:
+                    proc_obj.wait_process("destroy")
+            except RuntimeError:
+                logging.warning("(%s) Unable to destroy processor!" % proc_name)
+
+        logging.info("Clean up complete!")
+
+    ####### PRIVATE UTILITY METHODS
+
+    def __get_processor_config(self, isolation=None):
+        # Returns complete config for a local processor
+        return {"wrk_dir":      self.wrk_dir,
+                "base_wrk_dir": self.wrk_dir,
+                "cmd_retries":  self.config["cmd_retries"],
+                "isolation":    self.isolation if isolation is None else isolation,
+                "use_sudo":     self.use_sudo}
+
+    def __limit_to_host_resources(self):
+        # Cap platform and processor limits at the CPUs, memory (GB), and free disk space (GB) of the machine
+        host_nr_cpus    = os.cpu_count()
+        host_mem        = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 1024**3
+        host_disk_space = shutil.disk_usage(self.__get_existing_dir(self.wrk_dir)).free // 1024**3
+
+        self.TOTAL_NR_CPUS      = max(min(self.TOTAL_NR_CPUS, host_nr_cpus), self.MIN_NR_CPUS)
+        self.TOTAL_MEM          = max(min(self.TOTAL_MEM, host_mem), self.MIN_MEM)
+        self.TOTAL_DISK_SPACE   = max(min(self.TOTAL_DISK_SPACE, host_disk_space), self.MIN_DISK_SPACE)
+
+        self.MAX_NR_CPUS        = min(self.MAX_NR_CPUS, self.TOTAL_NR_CPUS)
+        self.MAX_MEM            = min(self.MAX_MEM, self.TOTAL_MEM)
+        self.MAX_DISK_SPACE     = min(self.MAX_DISK_SPACE, self.TOTAL_DISK_SPACE)
+
+        logging.info("Local platform can use %s CPUs, %sGB memory, and %sGB disk space."
+                     % (self.TOTAL_NR_CPUS, self.TOTAL_MEM, self.TOTAL_DISK_SPACE))
+
+    @staticmethod
+    def __get_existing_dir(dir_path):
+        # Return closest directory that exists on the path to a directory
+        while not os.path.exists(dir_path):
+            dir_path = os.path.dirname(dir_path.rstrip("/"))
+        return dir_path
@@ -0,0 +1,148 @@
+import re
+import logging
+import subprocess as sp
+
+from System.Platform import Process, Processor
+
+class LocalProcessor(Processor):
+    # Processor that runs commands as subprocesses on the machine running the pipeline
+
+    def __init__(self, name, nr_cpus, mem, disk_space, **kwargs):
+        # Call super constructor
+        super(LocalProcessor, self).__init__(name, nr_cpus, mem, disk_space, **kwargs)
+
+        # Workspace shared by every processor on the machine. Task workspaces are created inside it.
+        self.base_wrk_dir   = kwargs.pop("base_wrk_dir", self.wrk_dir)
+
+        # How commands are limited to the processor's CPUs and memory ('systemd' or 'none')
+        self.isolation      = kwargs.pop("isolation", "none")
+
+        # Whether commands are run with sudo like they are on cloud instances
+        self.use_sudo       = kwargs.pop("use_sudo", False)
+
+    def create(self):
+
+        if self.is_locked():
+            logging.error("(%s) Failed to create processor. Processor locked!" % self.name)
+            raise RuntimeError("Cannot create processor while locked!")
+
+        # Nothing needs to be provisioned to run commands on the local machine
+        logging.info("(%s) Process 'create' started!" % self.name)
+        self.set_start_time()
+        self.set_status(Processor.AVAILABLE)
+
+    def destroy(self, wait=True):
+
+        logging.info("(%s) Process 'destroy' started!" % self.name)
+
+        # Stop commands that are still running
+        for proc_name, proc_obj in self.processes.items():
+            if proc_name != "destroy" and not proc_obj.is_complete() and proc_obj.poll() is None:
+                logging.debug("(%s) Killing process: %s" % (self.name, proc_name))
+                proc_obj.stop()
+
+        # Remove the task's workspace. The base workspace is shared by all processors so it's left alone.
+        cmd = "true"
+        if self.wrk_dir.rstrip("/") != self.base_wrk_dir.rstrip("/") and self.wrk_dir.startswith(self.base_wrk_dir):
+            cmd = self.__remove_sudo("sudo rm -rf %s" % self.wrk_dir)
+
+        self.processes["destroy"] = Process(cmd,
+                                            cmd=cmd,
+                                            stdout=sp.PIPE,
+                                            stderr=sp.PIPE,
+                                            shell=True,
+                                            num_retries=0)
+
+        # Wait for workspace to be removed if requested
+        if wait:
+            self.wait_process("destroy")
+
+        self.set_status(Processor.OFF)
+
+    def adapt_cmd(self, cmd):
+        # Adapt command for running on the local machine
+        cmd = self.__remove_sudo(cmd)
+
+        # Run command in its own cgroup limited to the processor's CPUs and memory
+        if self.isolation == "systemd":
+            cmd = cmd.replace("'", "'\"'\"'")
+            cmd = "systemd-run --user --scope --quiet " \
+                  "-p CPUQuota={0}% -p MemoryMax={1}G " \
+                  "/bin/bash -c '{2}'".format(self.nr_cpus * 100, self.mem, cmd)
+        return cmd
+
+    def get_docker_cmd(self, cmd, docker_image):
+        # Limit container to the processor's CPUs and memory
+        return "sudo docker run --rm --user root --cpus=%s --memory=%sg -v %s:%s %s /bin/bash -c '%s'" % \
+               (self.nr_cpus, self.mem, self.wrk_dir, self.wrk_dir, docker_image, cmd)
+
+    def wait_process(self, proc_name):
+        # Get process from process list
+        proc_obj = self.processes[proc_name]
+
+        # Return immediately if process has already been set to complete
+        if proc_obj.is_complete():
+            return proc_obj.get_output()
+
+        # Wait for process to finish
+        proc_obj.collect_output()
+
+        # Set process to complete
+        proc_obj.set_complete()
+
+        # Case: Process completed with errors
+        if proc_obj.has_failed():
+            # Determine whether to retry or raise errors
+            self.handle_failure(proc_name, proc_obj)
+            # If no errors thrown, try waiting on the process again
+            return self.wait_process(proc_name)
+
+        if proc_name == "destroy":
+            # Set the stop time
+            self.set_stop_time()
+
+        # Case: Process completed
+        if proc_obj.do_log_success():
+            logging.info("(%s) Process '%s' complete!" % (self.name, proc_name))
+
+        # Output too large to keep in memory is only returned in part. Full output is available from get_output_buffers().
+        return proc_obj.get_output()
+
+    def handle_failure(self, proc_name, proc_obj):
+
+        # Raise error if processor is being shut down or command is out of retries
+        if self.is_locked() or proc_name == "destroy" or proc_obj.get_num_retries() <= 0:
+            self.raise_error(proc_name, proc_obj)
+
+        logging.warning("(%s) Process '%s' failed but we still got %s retries left. Re-running command!" % (
+            self.name, proc_name, proc_obj.get_num_retries()))
+        self.run(job_name=proc_name,
+                 cmd=proc_obj.get_command(),
+                 num_retries=proc_obj.get_num_retries() - 1,
+                 docker_image=proc_obj.get_docker_image(),
+                 quiet_failure=proc_obj.is_quiet())
+
+    def raise_error(self, proc_name, proc_obj):
+        # Log failure to debug logger if quiet failure
+        stdout_msg, stderr_msg = proc_obj.get_output()
+        if proc_obj.is_quiet():
+            logging.debug("(%s) Process '%s' failed!" % (self.name, proc_name))
+            if stdout_msg != "" or stderr_msg != "":
+                logging.debug("(%s) The following error was received:\n%s\n%s" % (self.name, stdout_msg, stderr_msg))
+
+        # Warn that process has failed due to cancellation
+        elif proc_obj.is_stopped():
+            logging.warning("(%s) Process '%s' failed due to cancellation!" % (self.name, proc_name))
+
+        # Log failure to error logger otherwise
+        else:
+            logging.error("(%s) Process '%s' failed!" % (self.name, proc_name))
+            if stdout_msg != "" or stderr_msg != "":
+                logging.error("(%s) The following error was received:\n%s\n%s" % (self.name, stdout_msg, stderr_msg))
+        raise RuntimeError("Local processor %s has failed!" % self.name)
+
+    def __remove_sudo(self, cmd):
+        # Commands are written for cloud instances where they're run with sudo
+        if self.use_sudo:
+            return cmd
+        return re.sub(r"\bsudo\s+", "", cmd)
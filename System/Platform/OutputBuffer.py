@@ -0,0 +1,102 @@
+import io
+import tempfile
+
+class OutputBuffer(object):
+    # Output of a command collected while it runs
+    # Output is kept in memory until it grows too large, after which it's written to a temporary file
+    # so the memory used for each command stays the same no matter how much it prints
+
+    # Number of characters kept in memory before output is moved to a file
+    MAX_MEM_SIZE = 16 * 1024**2
+
+    # Number of characters from the end of the output that are always kept in memory
+    TAIL_SIZE = 64 * 1024
+
+    def __init__(self, max_mem_size=None, tail_size=None):
+        self.max_mem_size   = self.MAX_MEM_SIZE if max_mem_size is None else max_mem_size
+        self.tail_size      = self.TAIL_SIZE if tail_size is None else tail_size
+
+        # Output kept in memory
+        self.__chunks   = []
+        self.__mem_size = 0
+
+        # End of the output
+        self.__tail     = ""
+
+        # Total number of characters received
+        self.__size     = 0
+
+        # File holding the output once it's too large to keep in memory
+        self.__file     = None
+
+    def write(self, data):
+        if not data:
+            return
+
+        self.__size += len(data)
+        self.__tail = (self.__tail + data)[-self.tail_size:]
+
+        # Move output to a file once it gets too large
+        if self.__file is None and self.__mem_size + len(data) > self.max_mem_size:
+            self.__file = tempfile.TemporaryFile(mode="w+", encoding="utf8", newline="")
+            self.__file.write("".join(self.__chunks))
+            self.__chunks = []
+            self.__mem_size = 0
+
+        if self.__file is not None:
+            self.__file.write(data)
+        else:
+            self.__chunks.append(data)
+            self.__mem_size += len(data)
+
+    def is_spilled(self):
+        # Return true if output was too large to keep in memory
+        return self.__file is not None
+
+    def get_size(self):
+        return self.__size
+
+    def get_text(self):
+        # Return output if it was small enough to keep in memory, otherwise only the end of it
+        if self.__file is None:
+            return self.__join_chunks()
+        return "[Output too large to keep in memory. Showing last %d of %d characters.]\n%s" % \
+               (len(self.__tail), self.__size, self.__tail)
+
+    def getvalue(self):
+        # Return complete output. Reads output back from file if it was too large to keep in memory.
+        if self.__file is None:
+            return self.__join_chunks()
+        self.__file.flush()
+        self.__file.seek(0)
+        value = self.__file.read()
+        self.__file.seek(0, io.SEEK_END)
+        return value
+
+    def iter_lines(self):
+        # Iterate over complete output one line at a time without loading all of it at once
+        if self.__file is None:
+            for line in io.StringIO(self.__join_chunks(), newline=""):
+                yield line
+            return
+
+        self.__file.flush()
+        self.__file.seek(0)
+        for line in self.__file:
+            yield line
+        self.__file.seek(0, io.SEEK_END)
+
+    def close(self):
+        # Free output held in memory and remove file holding the output
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.__chunks   = []
+        self.__mem_size = 0
+        self.__tail     = ""
+
+    def __join_chunks(self):
+        # Keep output held in memory as a single string so reading it again doesn't make another copy
+        if len(self.__chunks) > 1:
+            self.__chunks = ["".join(self.__chunks)]
+        return self.__chunks[0] if len(self.__chunks) > 0 else ""
@@ -2,8 +2,11 @@ import logging
 import abc
 import uuid
 import threading
+import heapq
+from collections import OrderedDict
 
 from Config import ConfigParser
+from System.Platform import SlotProcessor
 
 class TaskPlatformResourceLimitError(Exception):
     pass
@@ -64,6 +67,64 @@ class Platform(object, metaclass=abc.ABCMeta):
 
         self.dealloc_procs = []
 
+        # Heap of resource requests waiting to be admitted, ordered by priority then arrival
+        self.resource_requests = []
+        self.__num_requests = 0
+
+        # Waiting resource requests indexed by task id
+        self.pending_requests = {}
+
+        # Resources reserved for each task (task_id -> (nr_cpus, mem, disk_space))
+        self.reservations = {}
+
+        # Task that reserved the resources used by each processor
+        self.proc_reservations = {}
+
+        # Whether a finished task's processor is kept for its child so the child can use the files left on it
+        self.locality_handoff = self.config.get("locality_handoff", False)
+
+        # Processors waiting for the child of the task that last ran on them (task_id -> PooledProcessor)
+        self.affinity_processors = {}
+
+        # Number of seconds finished processors are kept warm for reuse by other tasks (0 disables reuse)
+        self.pool_idle_ttl = self.config.get("processor_pool_ttl", 0)
+
+        # Warm processors waiting to be reused by another task, oldest first (proc_name -> PooledProcessor)
+        self.processor_pool = OrderedDict()
+
+        # Warm processors handed to tasks that haven't picked them up yet (task_id -> processor)
+        self.claimed_processors = {}
+
+        # Runtime and cost of processors while they sat idle in the pool
+        self.pool_idle_runtime = 0
+        self.pool_idle_cost = 0
+
+        # Maximum number of files transferred to or from a processor at the same time
+        self.max_transfers = self.config.get("max_concurrent_transfers", 8)
+
+        # Whether files going to the same place are moved together by a single command
+        self.bulk_transfers = self.config.get("bulk_transfers", True)
+
+        # Size of large processors shared by several small tasks (0 CPUs disables packing)
+        self.packing_host_cpus          = self.config.get("packing_host_cpus", 0)
+        self.packing_host_mem           = self.config.get("packing_host_mem", 0)
+        self.packing_host_disk_space    = self.config.get("packing_host_disk_space", 0)
+
+        # Largest task (in CPUs) that will be packed onto a shared processor
+        self.packing_max_task_cpus      = self.config.get("packing_max_task_cpus", 2)
+
+        # Check to make sure shared processors fit on the platform
+        self.__check_packing_resources()
+
+        # Shared processors that have room for more tasks
+        self.packing_hosts = []
+
+        # Shared processor hosting each packed task (task_id -> PackingHost)
+        self.packed_tasks = {}
+
+        # Task running on each slot of a shared processor (slot_name -> task_id)
+        self.slot_processors = {}
+
     def get_processor(self, task_id, nr_cpus, mem, disk_space):
         # Initialize new processor and register with platform
 
@@ -73,30 +134,44 @@ class Platform(object, metaclass=abc.ABCMeta):
             raise TaskPlatformLockError("Cannot get processor while platform is locked!")
         logging.debug("(%s) Platform ain't locked!" % task_id)
 
-        # Check to see if processor is asking for too many resources
-        logging.debug("(%s) Checking to see if processor is too big for platform..." % task_id)
-        self.__check_processor(task_id, nr_cpus, mem, disk_space)
-        logging.debug("(%s) Processor ain't too big!" % task_id)
-
-        # Ensure unique name for processor
-        name        = "proc-%s-%s-%s" % (self.name[:20], task_id[:25], self.generate_unique_id())
-        logging.info("Creating processor '%s' for task '%s'..." % (name, task_id))
+        # Wait for platform resources if task hasn't already reserved them
+        if not self.reserve_resources(task_id, nr_cpus, mem, disk_space):
+            logging.error("Platform failed to initialize processor with id '%s'! Resource request was cancelled!" % task_id)
+            raise RuntimeError("Cannot get processor after resource request was cancelled!")
 
-        # Initialize new processor with enough CPU/mem/disk space to complete task
-        logging.debug("(%s) Checking to see if processor is too big for platform..." % task_id)
-        processor   = self.init_task_processor(name, nr_cpus, mem, disk_space)
-        proc_name   = processor.get_name()
-        logging.debug("(%s) Platform successfully initialized processor for task!" % task_id)
+        # Hand over warm processor if one was claimed for task while reserving resources
+        with self.platform_lock:
+            processor   = self.claimed_processors.pop(task_id, None)
+            host        = self.packed_tasks.get(task_id, None)
+        if processor is not None:
+            logging.info("Reusing processor '%s' for task '%s'..." % (processor.get_name(), task_id))
+            return processor
+
+        # Run small tasks on a slot of a shared processor
+        if host is not None:
+            return self.__get_slot_processor(task_id, host, nr_cpus, mem, disk_space)
+
+        try:
+            # Ensure unique name for processor
+            name        = "proc-%s-%s-%s" % (self.name[:20], task_id[:25], self.generate_unique_id())
+            logging.info("Creating processor '%s' for task '%s'..." % (name, task_id))
+
+            # Initialize new processor with enough CPU/mem/disk space to complete task
+            processor   = self.init_task_processor(name, nr_cpus, mem, disk_space)
+            proc_name   = processor.get_name()
+            logging.debug("(%s) Platform successfully initialized processor for task!" % task_id)
+
+        except BaseException:
+            # Give back resources reserved for processor
+            self.release_resources(task_id)
+            raise
 
         # Add to list of processors if not already there
         with self.platform_lock:
-            logging.debug("(%s) We are starting to put that processor in the spot..." % task_id)
             if proc_name not in self.processors:
-                self.processors[proc_name]    = processor
-                self.cpu += processor.get_nr_cpus()
-                self.mem += processor.get_mem()
-                self.disk_space += processor.get_disk_space()
-                logging.debug("(%s) We put that processor in the spot!" % proc_name)
+                # Resources were already accounted for when they were reserved
+                self.processors[proc_name]          = processor
+                self.proc_reservations[proc_name]   = task_id
             else:
                 logging.error("Platform cannot create task processor with duplicate id: '%s'!" % proc_name)
                 raise RuntimeError("Platform attempted to create duplicate task processor!")
@@ -130,24 +205,204 @@ class Platform(object, metaclass=abc.ABCMeta):
         return self.processors["helper"]
 
     def can_make_processor(self, req_cpus, req_mem, req_disk_space):
-        logging.info("\n{0}".format(self.__get_curr_usage_string()))
         with self.platform_lock:
-            cpu_overload    = self.cpu + req_cpus > self.TOTAL_NR_CPUS
-            mem_overload    = self.mem + req_mem > self.TOTAL_MEM
-            disk_overload   = self.disk_space + req_disk_space > self.TOTAL_DISK_SPACE
-        return (not cpu_overload) and (not mem_overload) and (not disk_overload) and (not self.__locked)
+            return self.__has_resources(req_cpus, req_mem, req_disk_space) and not self.__locked
+
+    def reserve_resources(self, task_id, nr_cpus, mem, disk_space, priority=0):
+        # Block until platform resources have been reserved for a task
+        # Requests are admitted in order of priority (first come, first served for equal priority)
+        # and no request is admitted ahead of an earlier request that is still waiting on resources
+        # Returns False if the request was cancelled before resources could be reserved
+        request = self.request_resources(task_id, nr_cpus, mem, disk_space, priority=priority)
+
+        # Pack small tasks onto a shared processor
+        if request is None:
+            return self.__reserve_slot(task_id, nr_cpus, mem, disk_space, priority)
+
+        # Wait until request is granted, cancelled, or platform is locked
+        request.wait()
+
+        if request.is_granted():
+            return True
+        elif request.is_cancelled():
+            return False
+        logging.error("Platform failed to reserve resources for task '%s'! Platform is currently locked!" % task_id)
+        raise TaskPlatformLockError("Cannot reserve resources while platform is locked!")
+
+    def request_resources(self, task_id, nr_cpus, mem, disk_space, priority=0):
+        # Add request for platform resources to the admission queue without waiting for it to be admitted
+        # Returns None if the task should be packed onto a shared processor instead
+
+        # Check to see if processor is asking for too many resources
+        self.__check_processor(task_id, nr_cpus, mem, disk_space)
+
+        request = ResourceRequest(task_id, nr_cpus, mem, disk_space)
+        with self.platform_lock:
+            # Resources have already been reserved for task
+            if task_id in self.reservations:
+                request.grant()
+                return request
+
+            # Use processor left behind by the task's parent if it has enough resources
+            if self.__claim_affinity_processor(request):
+                return request
+
+        if self.__is_packable(nr_cpus, mem, disk_space):
+            return None
+
+        with self.platform_lock:
+            if self.__locked:
+                logging.error("Platform failed to reserve resources for task '%s'! Platform is currently locked!" % task_id)
+                raise TaskPlatformLockError("Cannot reserve resources while platform is locked!")
+
+            # Reuse a warm processor instead of reserving new resources
+            if self.__claim_pooled_processor(request):
+                return request
+
+            # Add request to admission queue
+            heapq.heappush(self.resource_requests, (-priority, self.__num_requests, request))
+            self.__num_requests += 1
+            self.pending_requests[task_id] = request
+            logging.debug("(%s) Waiting on platform resources (CPU: %s, Mem: %s, Disk space: %s)..." % (task_id, nr_cpus, mem, disk_space))
+
+            # Admit any requests that can be satisfied
+            self.__admit_requests()
+
+        return request
+
+    def cancel_resource_request(self, task_id):
+        # Stop waiting on platform resources and wake up the waiting task
+        with self.platform_lock:
+            request = self.pending_requests.pop(task_id, None)
+            if request is not None:
+                request.cancel()
+                # Requests queued behind the cancelled request may now be admitted
+                self.__admit_requests()
+
+    def release_resources(self, task_id):
+        # Give back resources reserved for a task and admit any waiting requests
+        if task_id in self.packed_tasks:
+            self.__release_slot(task_id)
+            return
+
+        with self.platform_lock:
+            # Destroy warm processor if task never picked it up
+            proc = self.claimed_processors.pop(task_id, None)
+            if proc is not None:
+                self.proc_reservations.pop(proc.get_name(), None)
+                self.__discard_processor(proc)
+
+            # Destroy processor left for task by its parent if task never claimed it
+            pooled_proc = self.affinity_processors.pop(task_id, None)
+            if pooled_proc is not None:
+                self.__drop_pooled_processor(pooled_proc)
+            self.__release_reservation(task_id)
+            self.__admit_requests()
+
+    def hand_off_processor(self, proc, task_id):
+        # Keep a finished processor for a task that will use the files left on it
+        # Returns False if the processor can't be handed off and should be recycled or destroyed by the caller
+        with self.platform_lock:
+            if not self.locality_handoff or self.__locked or proc.get_name() not in self.proc_reservations:
+                return False
+
+            # Clear task state left on processor but keep its files
+            proc.recycle()
+
+            prev_task_id = self.proc_reservations[proc.get_name()]
+            self.affinity_processors[task_id] = PooledProcessor(proc, prev_task_id, self.reservations[prev_task_id])
+            logging.debug("Processor '%s' kept for task '%s'!" % (proc.get_name(), task_id))
+        return True
+
+    def recycle_processor(self, proc):
+        # Keep a finished processor warm so it can be reused by another task instead of being destroyed
+        # Returns False if the processor can't be reused and should be destroyed by the caller
+        with self.platform_lock:
+            if self.pool_idle_ttl <= 0 or self.__locked or proc.get_name() not in self.proc_reservations:
+                return False
+            if not self.can_reuse_processor(proc):
+                return False
+
+        # Wipe the last task's workspace so the next task starts with a clean disk
+        try:
+            proc.run("wipe_workspace", "sudo rm -rf %s*" % self.standardize_dir(self.wrk_dir))
+            proc.wait_process("wipe_workspace")
+        except BaseException as e:
+            logging.warning("Unable to wipe processor '%s' for reuse!" % proc.get_name())
+            if str(e) != "":
+                logging.warning("Received following error:\n%s" % e)
+            return False
+
+        # Clear task state left on processor
+        proc.recycle()
+        proc.clear_local_replicas()
+
+        with self.platform_lock:
+            if self.__locked:
+                return False
+
+            task_id = self.proc_reservations[proc.get_name()]
+            pooled_proc = PooledProcessor(proc, task_id, self.reservations[task_id])
+
+            # Hand processor directly to a waiting task that can use it
+            for _, _, request in sorted(self.resource_requests):
+                if request.task_id in self.pending_requests and pooled_proc.fits(request):
+                    self.__hand_over_processor(pooled_proc, request)
+                    return True
+
+            # Keep processor warm until it's needed or its idle time runs out
+            pooled_proc.start_timer(self.pool_idle_ttl, self.__expire_pooled_processor)
+            self.processor_pool[proc.get_name()] = pooled_proc
+            logging.debug("Processor '%s' added to pool of warm processors!" % proc.get_name())
+
+            # Requests waiting on other resources may now be admitted by evicting pooled processors
+            self.__admit_requests()
+        return True
+
+    def can_reuse_processor(self, proc):
+        # Platform-specific check for whether a processor can be handed to another task
+        return True
+
+    def get_pool_usage(self):
+        # Return runtime and cost accumulated by processors while idle in the pool
+        with self.platform_lock:
+            runtime = self.pool_idle_runtime
+            cost    = self.pool_idle_cost
+            for pooled_proc in self.processor_pool.values():
+                idle_runtime, idle_cost = pooled_proc.get_idle_usage()
+                runtime += idle_runtime
+                cost    += idle_cost
+        return runtime, cost
 
     def deallocate_resources(self, proc):
         # Free-up resources being used by a processor
+
+        # Output of commands run by the processor won't be read anymore
+        proc.release_output()
+
+        # Give back room on shared processor
+        with self.platform_lock:
+            task_id = self.slot_processors.pop(proc.get_name(), None)
+        if task_id is not None:
+            self.__release_slot(task_id)
+            return
+
         if not proc.get_name() in self.processors:
             logging.error("Cannot de-allocate resources for processor '%s%! No processor with that ID found on platform!")
             raise RuntimeError("Attempt to deallocate processor that doesn't exist on platform!")
         with self.platform_lock:
-            self.cpu -= proc.get_nr_cpus()
-            self.mem -= proc.get_mem()
-            self.disk_space -= proc.get_disk_space()
+            task_id = self.proc_reservations.pop(proc.get_name(), None)
+            if task_id is None:
+                # Processor resources weren't reserved through admission queue
+                self.cpu -= proc.get_nr_cpus()
+                self.mem -= proc.get_mem()
+                self.disk_space -= proc.get_disk_space()
             self.dealloc_procs.append(proc.get_name())
 
+        # Release resources reserved for processor
+        if task_id is not None:
+            self.release_resources(task_id)
+
     def get_max_nr_cpus(self):
         return self.MAX_NR_CPUS
 
@@ -160,6 +415,10 @@ class Platform(object, metaclass=abc.ABCMeta):
     def get_min_disk_space(self):
         return self.MIN_DISK_SPACE
 
+    def get_reference_path(self, path):
+        # Return path where processors can read a copy of a remote file without transferring it (None if there isn't one)
+        return None
+
     def get_final_output_dir(self):
         return self.final_output_dir
 
@@ -170,10 +429,299 @@ class Platform(object, metaclass=abc.ABCMeta):
         with self.platform_lock:
             self.__locked = True
 
+            # Wake up any tasks waiting on resources
+            for request in self.pending_requests.values():
+                request.wake()
+            self.pending_requests = {}
+            self.resource_requests = []
+
+            # Stop expiring warm processors; platform clean up destroys them with the rest
+            for pooled_proc in self.processor_pool.values():
+                pooled_proc.stop_timer()
+
     def unlock(self):
         with self.platform_lock:
             self.__locked = False
 
+    def init_host_processor(self, name, nr_cpus, mem, disk_space):
+        # Return a processor that will be shared by several small tasks
+        return self.init_task_processor(name, nr_cpus, mem, disk_space)
+
+    def __admit_requests(self):
+        # Reserve resources for waiting requests in admission order until a request doesn't fit. Caller must hold platform lock.
+        while len(self.resource_requests) > 0:
+            request = self.resource_requests[0][2]
+
+            # Discard requests that have been cancelled or were handed a warm processor
+            if request.is_cancelled() or request.is_granted():
+                heapq.heappop(self.resource_requests)
+                continue
+
+            # Reuse a warm processor instead of reserving new resources
+            if self.__claim_pooled_processor(request):
+                heapq.heappop(self.resource_requests)
+                continue
+
+            # Wait for more resources to be released so larger requests aren't starved by smaller ones
+            if not self.__has_resources(request.nr_cpus, request.mem, request.disk_space):
+
+                # Make room by destroying the processor that has been idle the longest
+                if len(self.processor_pool) > 0:
+                    self.__evict_pooled_processor(next(iter(self.processor_pool)))
+                    continue
+                break
+
+            # Reserve resources for request
+            heapq.heappop(self.resource_requests)
+            self.pending_requests.pop(request.task_id, None)
+            self.cpu += request.nr_cpus
+            self.mem += request.mem
+            self.disk_space += request.disk_space
+            self.reservations[request.task_id] = (request.nr_cpus, request.mem, request.disk_space)
+            request.grant()
+            logging.debug("(%s) Platform resources reserved!\n%s" % (request.task_id, self.__get_curr_usage_string()))
+
+    def __release_reservation(self, task_id):
+        # Give back resources reserved for a task. Caller must hold platform lock.
+        if task_id not in self.reservations:
+            return
+        nr_cpus, mem, disk_space = self.reservations.pop(task_id)
+        self.cpu -= nr_cpus
+        self.mem -= mem
+        self.disk_space -= disk_space
+
+    def __claim_affinity_processor(self, request):
+        # Hand the processor left behind by a task's parent to the task. Caller must hold platform lock.
+        pooled_proc = self.affinity_processors.pop(request.task_id, None)
+        if pooled_proc is None:
+            return False
+
+        if not self.__locked and pooled_proc.can_host(request):
+            self.__hand_over_processor(pooled_proc, request)
+            return True
+
+        # Processor doesn't have enough resources for task
+        logging.debug("(%s) Processor '%s' left by parent task is too small!" % (request.task_id, pooled_proc.get_processor().get_name()))
+        self.__drop_pooled_processor(pooled_proc)
+        return False
+
+    def __claim_pooled_processor(self, request):
+        # Hand a compatible warm processor to a request. Caller must hold platform lock.
+        for proc_name, pooled_proc in self.processor_pool.items():
+            if pooled_proc.fits(request):
+                self.processor_pool.pop(proc_name)
+                pooled_proc.stop_timer()
+                self.__hand_over_processor(pooled_proc, request)
+                return True
+        return False
+
+    def __hand_over_processor(self, pooled_proc, request):
+        # Transfer processor and its reserved resources to the requesting task. Caller must hold platform lock.
+        proc = pooled_proc.get_processor()
+        self.reservations.pop(pooled_proc.task_id, None)
+        self.reservations[request.task_id] = pooled_proc.reservation
+        self.proc_reservations[proc.get_name()] = request.task_id
+        self.claimed_processors[request.task_id] = proc
+        self.pending_requests.pop(request.task_id, None)
+        request.grant()
+        logging.debug("(%s) Claimed warm processor '%s'!" % (request.task_id, proc.get_name()))
+
+    def __expire_pooled_processor(self, proc_name):
+        # Destroy a processor that has been idle in the pool for too long
+        with self.platform_lock:
+            if proc_name not in self.processor_pool or self.__locked:
+                return
+            logging.debug("Processor '%s' idle for too long! Removing from pool..." % proc_name)
+            self.__evict_pooled_processor(proc_name)
+            self.__admit_requests()
+
+    def __evict_pooled_processor(self, proc_name):
+        # Remove processor from pool, give back its resources, and destroy it in the background. Caller must hold platform lock.
+        pooled_proc = self.processor_pool.pop(proc_name)
+        pooled_proc.stop_timer()
+        self.__drop_pooled_processor(pooled_proc)
+
+    def __drop_pooled_processor(self, pooled_proc):
+        # Give back resources held by an idle processor and destroy it. Caller must hold platform lock.
+
+        # Charge idle time to the pool
+        idle_runtime, idle_cost = pooled_proc.get_idle_usage()
+        self.pool_idle_runtime  += idle_runtime
+        self.pool_idle_cost     += idle_cost
+
+        self.proc_reservations.pop(pooled_proc.get_processor().get_name(), None)
+        self.__release_reservation(pooled_proc.task_id)
+        self.__discard_processor(pooled_proc.get_processor())
+
+    def __discard_processor(self, proc):
+        # Start destroying a warm processor no task will use and wait for it to finish in the background. Caller must hold platform lock.
+        logging.debug("Destroying pooled processor '%s'..." % proc.get_name())
+        self.dealloc_procs.append(proc.get_name())
+        proc.destroy(wait=False)
+        destroyer = threading.Thread(target=self.__wait_for_destroy, args=(proc,))
+        destroyer.daemon = True
+        destroyer.start()
+
+    @staticmethod
+    def __wait_for_destroy(proc):
+        try:
+            proc.wait_process("destroy")
+        except BaseException as e:
+            logging.error("Unable to destroy pooled processor '%s'!" % proc.get_name())
+            if str(e) != "":
+                logging.error("Received following error:\n%s" % e)
+        proc.release_output()
+
+    def __is_packable(self, nr_cpus, mem, disk_space):
+        # Check whether a task is small enough to share a processor with other tasks
+        if self.packing_host_cpus <= 0:
+            return False
+        return nr_cpus <= self.packing_max_task_cpus \
+               and mem <= self.packing_host_mem \
+               and disk_space <= self.packing_host_disk_space
+
+    def __reserve_slot(self, task_id, nr_cpus, mem, disk_space, priority):
+        # Reserve room for a small task on a shared processor, reserving platform resources for a new one if none has room
+        with self.platform_lock:
+            if self.__locked:
+                logging.error("Platform failed to reserve resources for task '%s'! Platform is currently locked!" % task_id)
+                raise TaskPlatformLockError("Cannot reserve resources while platform is locked!")
+
+            # Room has already been reserved for task
+            if task_id in self.packed_tasks:
+                return True
+
+            # Use a shared processor that still has room
+            for host in self.packing_hosts:
+                if host.add_slot(task_id, nr_cpus, mem, disk_space):
+                    self.packed_tasks[task_id] = host
+                    logging.debug("(%s) Task packed onto shared processor '%s'!" % (task_id, host.host_id))
+                    return True
+
+            # Otherwise start a new shared processor to be created by this task
+            host = PackingHost("host-%s" % self.generate_unique_id(),
+                               creator=task_id,
+                               nr_cpus=self.packing_host_cpus,
+                               mem=self.packing_host_mem,
+                               disk_space=self.packing_host_disk_space)
+            host.add_slot(task_id, nr_cpus, mem, disk_space)
+            self.packing_hosts.append(host)
+            self.packed_tasks[task_id] = host
+
+        # Reserve platform resources for the whole shared processor
+        try:
+            granted = self.reserve_resources(host.host_id, host.nr_cpus, host.mem, host.disk_space, priority=priority)
+        except BaseException:
+            self.__fail_packing_host(host)
+            raise
+
+        if not granted:
+            self.__fail_packing_host(host)
+        return granted
+
+    def __get_slot_processor(self, task_id, host, nr_cpus, mem, disk_space):
+        # Return a slot for a task on a shared processor, creating the shared processor if the task is responsible for it
+        if host.creator == task_id:
+            try:
+                name = "host-%s-%s" % (self.name[:20], self.generate_unique_id())
+                logging.info("Creating shared processor '%s' for small tasks..." % name)
+                processor = self.init_host_processor(name, host.nr_cpus, host.mem, host.disk_space)
+
+                # Register processor with the resources reserved for it
+                with self.platform_lock:
+                    self.processors[processor.get_name()]           = processor
+                    self.proc_reservations[processor.get_name()]    = host.host_id
+
+                processor.create()
+                host.set_processor(processor)
+
+            except BaseException:
+                self.__fail_packing_host(host)
+                raise
+
+        # Wait for shared processor to be created
+        elif not host.wait_ready():
+            logging.error("Platform failed to initialize processor for task '%s'! Shared processor could not be created!" % task_id)
+            raise RuntimeError("Cannot get processor on shared processor that failed to start!")
+
+        # Create slot with the task's share of the processor
+        name = "slot-%s-%s" % (task_id[:25], self.generate_unique_id())
+        slot = SlotProcessor(name, host.get_processor(), nr_cpus, mem, disk_space)
+        with self.platform_lock:
+            self.slot_processors[name] = task_id
+        logging.info("Running task '%s' on shared processor '%s'..." % (task_id, host.get_processor().get_name()))
+        return slot
+
+    def __release_slot(self, task_id):
+        # Give back room on a shared processor and remove the processor once no tasks are left on it
+        with self.platform_lock:
+            host = self.packed_tasks.pop(task_id, None)
+            if host is None:
+                return
+
+            # Wake up tasks waiting on a shared processor their creator gave up on
+            if host.creator == task_id and host.get_processor() is None:
+                host.fail()
+                if host in self.packing_hosts:
+                    self.packing_hosts.remove(host)
+
+            # Keep shared processor while it still hosts tasks
+            host.remove_slot(task_id)
+            if not host.is_empty():
+                return
+
+            if host in self.packing_hosts:
+                self.packing_hosts.remove(host)
+            processor = host.get_processor()
+
+        # Shared processor was never created so only its reserved resources need to be given back
+        if processor is None:
+            self.release_resources(host.host_id)
+            return
+
+        # Destroy shared processor
+        try:
+            logging.debug("Destroying shared processor '%s'..." % processor.get_name())
+            processor.destroy(wait=False)
+            processor.wait_process("destroy")
+        except BaseException as e:
+            logging.error("Unable to destroy shared processor '%s'!" % processor.get_name())
+            if str(e) != "":
+                logging.error("Received following error:\n%s" % e)
+        self.deallocate_resources(processor)
+
+    def __fail_packing_host(self, host):
+        # Stop packing tasks onto a shared processor that couldn't be created
+        with self.platform_lock:
+            host.fail()
+            if host in self.packing_hosts:
+                self.packing_hosts.remove(host)
+
+    def __check_packing_resources(self):
+        if self.packing_host_cpus <= 0:
+            return
+
+        err = False
+        if self.packing_host_cpus > self.MAX_NR_CPUS or self.packing_host_mem > self.MAX_MEM \
+                or self.packing_host_disk_space > self.MAX_DISK_SPACE:
+            logging.error("Platform config error! Shared processors (%s CPUs, %sGB mem, %sGB disk space) cannot exceed "
+                          "max task processor!" % (self.packing_host_cpus, self.packing_host_mem, self.packing_host_disk_space))
+            err = True
+        elif self.packing_max_task_cpus >= self.packing_host_cpus:
+            logging.error("Platform config error! Max packed task cpus (%s) must be less than shared processor cpus (%s)!" %
+                          (self.packing_max_task_cpus, self.packing_host_cpus))
+            err = True
+
+        if err:
+            raise TaskPlatformResourceLimitError("Shared processor size must fit on a single task processor!")
+
+    def __has_resources(self, req_cpus, req_mem, req_disk_space):
+        # Check whether platform has enough free resources for a request. Caller must hold platform lock.
+        cpu_overload    = self.cpu + req_cpus > self.TOTAL_NR_CPUS
+        mem_overload    = self.mem + req_mem > self.TOTAL_MEM
+        disk_overload   = self.disk_space + req_disk_space > self.TOTAL_DISK_SPACE
+        return (not cpu_overload) and (not mem_overload) and (not disk_overload)
+
     def __check_processor(self, task_id, nr_cpus, mem, disk_space):
         # Check that nr_cpus, mem, disk space are under max
         err = False
@@ -213,7 +761,7 @@ class Platform(object, metaclass=abc.ABCMeta):
 
     def __get_curr_usage_string(self):
         ret = "*********************\n"
-        ret = "Platform Usage\n"
+        ret += "Platform Usage\n"
         ret += "*********************\n"
         ret += "\tCPU: {0}\n".format(self.cpu)
         ret += "\tMem: {0}\n".format(self.mem)
@@ -252,3 +800,134 @@ class Platform(object, metaclass=abc.ABCMeta):
     def standardize_dir(dir_path):
         # Makes directory names uniform to include a single '/' at the end
         return dir_path.rstrip("/") + "/"
+
+
+class ResourceRequest(object):
+    # Request from a task for platform resources waiting in the platform admission queue
+    def __init__(self, task_id, nr_cpus, mem, disk_space):
+        self.task_id    = task_id
+        self.nr_cpus    = nr_cpus
+        self.mem        = mem
+        self.disk_space = disk_space
+
+        # Event set when waiting task should wake up
+        self.__event        = threading.Event()
+        self.__granted      = False
+        self.__cancelled    = False
+
+    def grant(self):
+        self.__granted = True
+        self.__event.set()
+
+    def cancel(self):
+        self.__cancelled = True
+        self.__event.set()
+
+    def wake(self):
+        self.__event.set()
+
+    def wait(self):
+        self.__event.wait()
+
+    def is_granted(self):
+        return self.__granted
+
+    def is_cancelled(self):
+        return self.__cancelled
+
+
+class PackingHost(object):
+    # Large processor shared by several small tasks
+    def __init__(self, host_id, creator, nr_cpus, mem, disk_space):
+        self.host_id    = host_id
+
+        # Task responsible for reserving resources for and creating the processor
+        self.creator    = creator
+
+        # Total resources shared by tasks on the processor
+        self.nr_cpus    = nr_cpus
+        self.mem        = mem
+        self.disk_space = disk_space
+
+        # Resources used by each task on the processor (task_id -> (nr_cpus, mem, disk_space))
+        self.slots      = {}
+
+        self.processor  = None
+
+        # Event set once processor has been created or has failed to be created
+        self.__ready    = threading.Event()
+        self.__failed   = False
+
+    def add_slot(self, task_id, nr_cpus, mem, disk_space):
+        # Reserve room for a task if processor has enough resources left
+        if self.__failed:
+            return False
+        used_cpus   = sum([slot[0] for slot in self.slots.values()])
+        used_mem    = sum([slot[1] for slot in self.slots.values()])
+        used_disk   = sum([slot[2] for slot in self.slots.values()])
+        if used_cpus + nr_cpus > self.nr_cpus or used_mem + mem > self.mem or used_disk + disk_space > self.disk_space:
+            return False
+        self.slots[task_id] = (nr_cpus, mem, disk_space)
+        return True
+
+    def remove_slot(self, task_id):
+        self.slots.pop(task_id, None)
+
+    def is_empty(self):
+        return len(self.slots) == 0
+
+    def set_processor(self, processor):
+        self.processor = processor
+        self.__ready.set()
+
+    def fail(self):
+        self.__failed = True
+        self.__ready.set()
+
+    def wait_ready(self):
+        # Block until processor is created. Returns False if it failed to be created
+        self.__ready.wait()
+        return not self.__failed
+
+    def get_processor(self):
+        return self.processor
+
+
+class PooledProcessor(object):
+    # Warm processor left behind by a finished task waiting to be reused by another task
+    def __init__(self, processor, task_id, reservation):
+        self.processor      = processor
+
+        # Task whose reserved resources are held by the processor
+        self.task_id        = task_id
+        self.reservation    = reservation
+
+        # Timer for destroying processor once it has been idle for too long
+        self.__timer        = None
+
+    def fits(self, request):
+        # Processor must have been reserved with the same CPU/mem and at least as much disk space as requested
+        nr_cpus, mem, disk_space = self.reservation
+        return nr_cpus == request.nr_cpus and mem == request.mem and disk_space >= request.disk_space
+
+    def can_host(self, request):
+        # Processor must have been reserved with at least as many resources as requested
+        nr_cpus, mem, disk_space = self.reservation
+        return nr_cpus >= request.nr_cpus and mem >= request.mem and disk_space >= request.disk_space
+
+    def start_timer(self, ttl, callback):
+        self.__timer = threading.Timer(ttl, callback, args=(self.processor.get_name(),))
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def stop_timer(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+
+    def get_processor(self):
+        return self.processor
+
+    def get_idle_usage(self):
+        # Return runtime and cost of processor since it was added to the pool
+        _, runtime, cost = self.processor.get_recycled_usage()
+        return self.processor.get_runtime() - runtime, self.processor.compute_cost() - cost
@@ -1,5 +1,9 @@
+import codecs
+import threading
 import subprocess as sp
 
+from System.Platform import OutputBuffer
+
 class Process(sp.Popen):
 
     def __init__(self, args, **kwargs):
@@ -12,22 +16,50 @@ class Process(sp.Popen):
         super(Process, self).__init__(args,     **kwargs)
         self.complete       = False
         self.stopped        = False
-        self.out            = ""
-        self.err            = ""
 
         # Set rerunning status
         self.to_rerun       = False
 
+        # Collect output as it's produced so large output doesn't have to be held in memory
+        self.out_buffer     = OutputBuffer()
+        self.err_buffer     = OutputBuffer()
+        self.readers        = []
+        for pipe, buffer in [(self.stdout, self.out_buffer), (self.stderr, self.err_buffer)]:
+            if pipe is not None:
+                reader = threading.Thread(target=self.__read_output, args=(pipe, buffer))
+                reader.daemon = True
+                reader.start()
+                self.readers.append(reader)
+
+    @staticmethod
+    def __read_output(pipe, buffer):
+        decoder = codecs.getincrementaldecoder("utf8")("replace")
+        for chunk in iter(lambda: pipe.read1(65536), b""):
+            buffer.write(decoder.decode(chunk))
+        buffer.write(decoder.decode(b"", final=True))
+        pipe.close()
+
+    def collect_output(self):
+        # Wait for process to finish and return buffers holding its stdout and stderr
+        for reader in self.readers:
+            reader.join()
+        self.wait()
+        return self.out_buffer, self.err_buffer
+
+    def get_output_buffers(self):
+        return self.out_buffer, self.err_buffer
+
+    def close_output(self):
+        # Free output once nothing will read it anymore
+        self.out_buffer.close()
+        self.err_buffer.close()
+
     def is_complete(self):
         return self.complete
 
     def set_complete(self):
         self.complete = True
 
-    def set_output(self, out, err):
-        self.out = out
-        self.err = err
-
     def has_failed(self):
         ret_code = self.poll()
         return ret_code is not None and ret_code != 0
@@ -44,6 +76,16 @@ class Process(sp.Popen):
     def get_output(self):
         return self.out, self.err
 
+    # Output is read from the buffers holding it so it isn't kept twice
+    # Output too large to keep in memory is only returned in part
+    @property
+    def out(self):
+        return self.out_buffer.get_text()
+
+    @property
+    def err(self):
+        return self.err_buffer.get_text()
+
     def is_quiet(self):
         return self.quiet
 
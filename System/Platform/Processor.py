@@ -51,6 +51,15 @@ class Processor(object, metaclass=abc.ABCMeta):
         self.stopped = False
         self.checkpoints = []
 
+        # Whether processor has been handed back to the platform to be reused by another task
+        self.recycled = False
+
+        # Start time, runtime and cost of processor when it was last recycled
+        self.recycled_usage = (None, 0, 0)
+
+        # Local copies of files uploaded from processor (remote path -> local path)
+        self.local_replicas = {}
+
     def create(self):
         self.set_status(Processor.AVAILABLE)
 
@@ -68,34 +77,14 @@ class Processor(object, metaclass=abc.ABCMeta):
             num_retries = self.default_num_cmd_retries
 
         # Checking if logging is required
-        if "!LOG" in cmd:
-
-            # Generate name of log file
-            log_file = "%s.log" % job_name
-            if self.log_dir is not None:
-                log_file = os.path.join(self.log_dir, log_file)
-
-            # Generating all the logging pipes
-            log_cmd_null    = " >>/dev/null 2>&1 "
-            log_cmd_stdout  = " >>%s " % log_file
-            log_cmd_stderr  = " 2>>%s " % log_file
-            log_cmd_all     = " >>%s 2>&1 " % log_file
-
-            # Replacing the placeholders with the logging pipes
-            cmd = cmd.replace("!LOG0!", log_cmd_null)
-            cmd = cmd.replace("!LOG1!", log_cmd_stdout)
-            cmd = cmd.replace("!LOG2!", log_cmd_stderr)
-            cmd = cmd.replace("!LOG3!", log_cmd_all)
+        cmd = self.add_log_redirects(job_name, cmd)
 
         # Save original command
         original_cmd = cmd
 
         # Run in docker image if specified
         if docker_image is not None:
-            cmd = "sudo docker run --rm --user root -v %s:%s %s /bin/bash -c '%s'" % (self.wrk_dir, self.wrk_dir, docker_image, cmd)
-
-        # Make any modifications to the command to allow it to be run on a specific platform
-        cmd = self.adapt_cmd(cmd)
+            cmd = self.get_docker_cmd(cmd, docker_image)
 
         # Run command using subprocess popen and add Popen object to self.processes
         logging.info("(%s) Process '%s' started!" % (self.name, job_name))
@@ -116,8 +105,57 @@ class Processor(object, metaclass=abc.ABCMeta):
         kwargs["quiet_failure"] = quiet_failure
         kwargs["close_fds"] = True
 
+        # Free output of an earlier process with the same name (e.g. failed attempt being retried)
+        self.release_output([job_name])
+
         # Add process to list of processes
-        self.processes[job_name] = Process(cmd, **kwargs)
+        self.processes[job_name] = self.start_process(cmd, **kwargs)
+
+    def start_process(self, args, **kwargs):
+        # Make any modifications to the command to allow it to be run on a specific platform and start it
+        return Process(self.adapt_cmd(args), **kwargs)
+
+    def add_log_redirects(self, job_name, cmd):
+        # Replace logging placeholders in a command with redirects to the job's log file
+        if "!LOG" not in cmd:
+            return cmd
+
+        # Generate name of log file
+        log_file = "%s.log" % job_name
+        if self.log_dir is not None:
+            log_file = os.path.join(self.log_dir, log_file)
+
+        # Generating all the logging pipes
+        log_cmd_null    = " >>/dev/null 2>&1 "
+        log_cmd_stdout  = " >>%s " % log_file
+        log_cmd_stderr  = " 2>>%s " % log_file
+        log_cmd_all     = " >>%s 2>&1 " % log_file
+
+        # Replacing the placeholders with the logging pipes
+        cmd = cmd.replace("!LOG0!", log_cmd_null)
+        cmd = cmd.replace("!LOG1!", log_cmd_stdout)
+        cmd = cmd.replace("!LOG2!", log_cmd_stderr)
+        cmd = cmd.replace("!LOG3!", log_cmd_all)
+        return cmd
+
+    def get_docker_cmd(self, cmd, docker_image):
+        # Wrap a command so that it runs inside a docker container with the working directory mounted
+        return "sudo docker run --rm --user root -v %s:%s %s /bin/bash -c '%s'" % (self.wrk_dir, self.wrk_dir, docker_image, cmd)
+
+    def get_output_buffers(self, proc_name):
+        # Return buffers holding complete stdout and stderr of a finished process
+        return self.processes[proc_name].get_output_buffers()
+
+    def is_process_finished(self, proc_name):
+        # Return True if process has finished running without waiting for it
+        return self.processes[proc_name].poll() is not None
+
+    def release_output(self, proc_names=None):
+        # Free output held by processes once nothing will read it anymore (all processes if none are given)
+        proc_names = list(self.processes.keys()) if proc_names is None else proc_names
+        for proc_name in proc_names:
+            if proc_name in self.processes:
+                self.processes[proc_name].close_output()
 
     def wait(self):
         # Returns when all currently running processes have completed
@@ -144,6 +182,19 @@ class Processor(object, metaclass=abc.ABCMeta):
         #        logging.debug("Killing process: %s" % proc_name)
         #        proc_obj.stop()
 
+    def recycle(self):
+        # Clear state left behind by the last task so processor can be reused by another task
+        task_proc_names = [proc_name for proc_name in self.processes
+                           if proc_name not in ["create", "start", "configureSSH", "restartSSH"]]
+        self.release_output(task_proc_names)
+        for proc_name in task_proc_names:
+            self.processes.pop(proc_name)
+        self.checkpoints = []
+
+        # Record usage up to this point so it isn't charged to the next task
+        self.recycled_usage = (time.time(), self.get_runtime(), self.compute_cost())
+        self.recycled = True
+
     ############ Getters and Setters
     def set_status(self, new_status):
         # Updates instance status with threading.lock() to prevent race conditions
@@ -224,6 +275,25 @@ class Processor(object, metaclass=abc.ABCMeta):
     def get_start_time(self):
         return self.start_time
 
+    def add_local_replica(self, remote_path, local_path):
+        self.local_replicas[remote_path] = local_path
+
+    def has_local_replica(self, remote_path):
+        return remote_path in self.local_replicas
+
+    def pop_local_replica(self, remote_path):
+        # Return path of local copy of a remote file (None if there isn't one) so it can be moved
+        return self.local_replicas.pop(remote_path, None)
+
+    def clear_local_replicas(self):
+        self.local_replicas = {}
+
+    def is_recycled(self):
+        return self.recycled
+
+    def get_recycled_usage(self):
+        return self.recycled_usage
+
     def get_nr_cpus(self):
         return self.nr_cpus
 
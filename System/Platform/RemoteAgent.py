@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# Command agent run on a processor over a single persistent connection
+# Reads one JSON request per line from stdin and writes one JSON message per line to stdout
+#   {"id": 1, "cmd": "..."}     Run a command
+#   {"kill": 1}                 Terminate a running command
+# Messages sent back:
+#   {"ready": true}                     Agent is accepting commands
+#   {"id": 1, "out": "..."}             Chunk of a command's stdout
+#   {"id": 1, "err": "..."}             Chunk of a command's stderr
+#   {"id": 1, "returncode": 0}          Command finished
+# Running commands are terminated when stdin is closed, the same way they are when an SSH session is closed
+# Only uses the standard library because it's run as-is on processors
+
+import os
+import sys
+import json
+import codecs
+import signal
+import threading
+import subprocess
+
+write_lock  = threading.Lock()
+procs_lock  = threading.Lock()
+procs       = {}
+
+def send(msg):
+    with write_lock:
+        sys.stdout.write("%s\n" % json.dumps(msg))
+        sys.stdout.flush()
+
+def stream_output(cmd_id, pipe, key):
+    # Send output back in chunks as it's produced
+    decoder = codecs.getincrementaldecoder("utf8")("replace")
+    while True:
+        chunk = pipe.read1(65536)
+        if not chunk:
+            break
+        data = decoder.decode(chunk)
+        if data:
+            send({"id": cmd_id, key: data})
+    data = decoder.decode(b"", final=True)
+    if data:
+        send({"id": cmd_id, key: data})
+
+def execute(cmd_id, cmd):
+    try:
+        proc = subprocess.Popen(["/bin/bash", "-c", cmd],
+                                stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                start_new_session=True)
+    except BaseException as e:
+        send({"id": cmd_id, "err": "Agent could not start command: %s\n" % e})
+        send({"id": cmd_id, "returncode": 127})
+        return
+
+    with procs_lock:
+        procs[cmd_id] = proc
+
+    streams = [threading.Thread(target=stream_output, args=(cmd_id, proc.stdout, "out")),
+               threading.Thread(target=stream_output, args=(cmd_id, proc.stderr, "err"))]
+    for stream in streams:
+        stream.start()
+    for stream in streams:
+        stream.join()
+    returncode = proc.wait()
+
+    with procs_lock:
+        procs.pop(cmd_id, None)
+
+    send({"id": cmd_id, "returncode": returncode})
+
+def kill(cmd_id, sig=signal.SIGTERM):
+    # Terminate command along with any processes it started
+    with procs_lock:
+        proc = procs.get(cmd_id)
+    if proc is None:
+        return
+    try:
+        os.killpg(proc.pid, sig)
+    except OSError:
+        pass
+
+def main():
+    send({"ready": True})
+
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        if line.strip() == "":
+            continue
+
+        request = json.loads(line)
+        if "kill" in request:
+            kill(request["kill"])
+        else:
+            worker = threading.Thread(target=execute, args=(request["id"], request["cmd"]))
+            worker.daemon = True
+            worker.start()
+
+    # Connection is gone so stop everything that's still running
+    with procs_lock:
+        cmd_ids = list(procs.keys())
+    for cmd_id in cmd_ids:
+        kill(cmd_id, signal.SIGHUP)
+
+if __name__ == "__main__":
+    main()
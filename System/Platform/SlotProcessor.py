@@ -0,0 +1,104 @@
+import logging
+
+from System.Platform import Processor
+
+class SlotProcessor(Processor):
+    # Share of a larger host processor used to run one task alongside other small tasks
+
+    def __init__(self, name, host, nr_cpus, mem, disk_space):
+
+        # Charge task for its share of the host CPUs
+        price = host.price * nr_cpus / float(host.get_nr_cpus())
+
+        super(SlotProcessor, self).__init__(name, nr_cpus, mem, disk_space,
+                                            price=price,
+                                            cmd_retries=host.default_num_cmd_retries)
+
+        # Processor where slot commands are actually run
+        self.host = host
+
+        # Working directory before a task workspace is assigned to the slot
+        self.host_wrk_dir = self.wrk_dir
+
+    def create(self):
+        # Host is already running so slot is available immediately
+        self.set_start_time()
+        super(SlotProcessor, self).create()
+
+    def destroy(self, wait=True):
+        # Remove task workspace from host so disk space can be used by other tasks
+        cmd = "true"
+        if self.wrk_dir != self.host_wrk_dir:
+            cmd = "sudo rm -rf %s" % self.wrk_dir
+
+        self.processes["destroy"] = self.__get_host_job_name("destroy")
+        self.host.run(self.processes["destroy"], cmd, quiet_failure=True)
+
+        # Wait for workspace to be removed if requested
+        if wait:
+            self.wait_process("destroy")
+
+    def run(self, job_name, cmd, num_retries=None, docker_image=None, quiet_failure=False):
+
+        # Throw error if attempting to run command on stopped slot
+        if self.is_locked():
+            logging.error("(%s) Attempt to run process'%s' on locked processor!" % (self.name, job_name))
+            raise RuntimeError("Attempt to run command on locked processor!")
+
+        if num_retries is None:
+            num_retries = self.default_num_cmd_retries
+
+        # Send logs to the slot's log directory
+        cmd = self.add_log_redirects(job_name, cmd)
+
+        # Run in docker image limited to the slot's share of the host
+        if docker_image is not None:
+            cmd = self.get_docker_cmd(cmd, docker_image)
+
+        # Prefix job with slot name so jobs from different slots don't collide on the host
+        host_job_name = self.__get_host_job_name(job_name)
+        logging.debug("(%s) Running process '%s' on host '%s'..." % (self.name, job_name, self.host.get_name()))
+        self.host.run(host_job_name, cmd, num_retries=num_retries, quiet_failure=quiet_failure)
+        self.processes[job_name] = host_job_name
+
+    def get_docker_cmd(self, cmd, docker_image):
+        # Limit container to the CPU/mem reserved for the slot
+        return "sudo docker run --rm --user root --cpus=%s --memory=%sg -v %s:%s %s /bin/bash -c '%s'" % \
+               (self.nr_cpus, self.mem, self.wrk_dir, self.wrk_dir, docker_image, cmd)
+
+    def wait_process(self, proc_name):
+        if proc_name != "destroy":
+            return self.host.wait_process(self.processes[proc_name])
+
+        # Leftover workspace only wastes disk space on the host so don't fail to give back the slot
+        out, err = "", ""
+        try:
+            out, err = self.host.wait_process(self.processes[proc_name])
+        except BaseException as e:
+            logging.warning("(%s) Unable to remove slot workspace from host '%s'!" % (self.name, self.host.get_name()))
+            if str(e) != "":
+                logging.warning("Received following error:\n%s" % e)
+
+        # Slot stops once its workspace has been removed
+        self.set_stop_time()
+        self.set_status(Processor.OFF)
+        return out, err
+
+    def get_output_buffers(self, proc_name):
+        return self.host.get_output_buffers(self.processes[proc_name])
+
+    def release_output(self, proc_names=None):
+        proc_names = list(self.processes.keys()) if proc_names is None else proc_names
+        self.host.release_output([self.processes[proc_name] for proc_name in proc_names if proc_name in self.processes])
+
+    def is_process_finished(self, proc_name):
+        return self.host.is_process_finished(self.processes[proc_name])
+
+    def adapt_cmd(self, cmd):
+        return self.host.adapt_cmd(cmd)
+
+    def get_host(self):
+        return self.host
+
+    def __get_host_job_name(self, job_name):
+        return "%s_%s" % (self.name, job_name)
@@ -1,4 +1,8 @@
+import os
+import csv
+import hashlib
 import logging
+from collections import OrderedDict
 
 from System.Platform import Platform
 
@@ -11,11 +15,14 @@ class StorageHelper(object):
     def __init__(self, proc):
         self.proc = proc
 
-    def mv(self, src_path, dest_path, job_name=None, log=True, wait=False, **kwargs):
+    def mv(self, src_path, dest_path, job_name=None, log=True, wait=False, mode=None, **kwargs):
         # Transfer file or dir from src_path to dest_path
         # Log the transfer unless otherwise specified
+        # Transferred files are given permissions 'mode' (e.g. '777') if they're copied onto the processor
         cmd_generator = StorageHelper.__get_storage_cmd_generator(src_path, dest_path)
         cmd = cmd_generator.mv(src_path, dest_path)
+        if mode is not None:
+            cmd = StorageHelper.__add_chmod_cmd(cmd, [src_path], dest_path, mode)
 
         job_name = "mv_%s" % Platform.generate_unique_id() if job_name is None else job_name
 
@@ -28,6 +35,84 @@ class StorageHelper(object):
             self.proc.wait_process(job_name)
         return job_name
 
+    def bulk_mv(self, src_paths, dest_dir, job_name=None, log=True, wait=False, mode=None, **kwargs):
+        # Transfer files or dirs from the same storage type to dest_dir with a single command
+        # Sources are written to a manifest and the command prints the status of each transfer (see get_bulk_mv_status)
+        # Transferred files are given permissions 'mode' (e.g. '777') if they're copied onto the processor
+        cmd_generator = StorageHelper.__get_storage_cmd_generator(src_paths[0], dest_dir)
+
+        job_name = "bulk_mv_%s" % Platform.generate_unique_id() if job_name is None else job_name
+
+        # Manifest is kept with the job's logs
+        manifest_dir = self.proc.log_dir if self.proc.log_dir is not None else self.proc.wrk_dir
+        manifest = os.path.join(manifest_dir, "%s.manifest" % job_name)
+        cmd = cmd_generator.bulk_mv(src_paths, dest_dir, manifest)
+        if mode is not None:
+            cmd = StorageHelper.__add_chmod_cmd(cmd, src_paths, dest_dir, mode)
+
+        # Optionally add logging. Stdout is kept for the transfer status.
+        cmd = "( %s ) !LOG2!" % cmd if log else cmd
+
+        # Run command and return job name
+        self.proc.run(job_name, cmd, **kwargs)
+        if wait:
+            self.proc.wait_process(job_name)
+        return job_name
+
+    @staticmethod
+    def get_bulk_mv_status(out_lines):
+        # Return status of each file in a bulk transfer from the lines of the command's output (src_path -> (result, description))
+        # Lines should come from the complete output (e.g. OutputBuffer.iter_lines()) as the status header is at the start of it
+        # Result is 'OK' or 'skip' if file was transferred and 'error' otherwise
+        status = OrderedDict()
+        lines = (line for line in out_lines if line.strip() != "")
+        for row in csv.DictReader(lines):
+            if row.get("Source") is None or row["Source"] == "Source":
+                continue
+            status[row["Source"]] = (row.get("Result", ""), row.get("Description", ""))
+        return status
+
+    def stream(self, src_path, dest_path, job_name=None, wait=False, **kwargs):
+        # Create named pipe at dest_path that is filled from src_path in the background as it's read
+        # Command returns right away. Use close_streams() once nothing will read the pipe anymore.
+        cmd = StorageHelper.get_stream_cmd(src_path, dest_path)
+
+        job_name = "stream_%s" % Platform.generate_unique_id() if job_name is None else job_name
+
+        # Run command and return job name
+        self.proc.run(job_name, cmd, **kwargs)
+        if wait:
+            self.proc.wait_process(job_name)
+        return job_name
+
+    @staticmethod
+    def get_stream_cmd(src_path, dest_path):
+        # Return command (re)creating named pipe at dest_path and filling it from src_path in the background
+        # A pipe can only be read once so any process still waiting to fill an earlier pipe at dest_path is killed
+        cmd_generator = StorageHelper.__get_storage_cmd_generator(src_path)
+        return "if [ -e {0}.pid ] && [ ! -e {0}.rc ] ; then kill -- -$(cat {0}.pid) 2>/dev/null ; fi ; " \
+               "rm -f {0} {0}.rc ; mkfifo -m 777 {0} && " \
+               "{{ nohup setsid sh -c '{1} > {0} ; echo $? > {0}.rc' >/dev/null 2>&1 </dev/null & " \
+               "echo $! > {0}.pid ; }}".format(dest_path, cmd_generator.cat(src_path))
+
+    def close_streams(self, dest_paths, job_name=None, **kwargs):
+        # Stop filling named pipes created by stream() and raise error if any of them couldn't be filled
+        # Pipes still being filled weren't read to the end so the processes filling them are killed
+        cmds = ["rc=0"]
+        for dest_path in dest_paths:
+            cmds.append("if [ ! -e {0}.rc ] ; then kill -- -$(cat {0}.pid) 2>/dev/null ; "
+                        "elif [ \"$(cat {0}.rc)\" != \"0\" ] ; then echo \"Unable to stream file to {0}!\" >&2 ; rc=1 ; fi".format(dest_path))
+            cmds.append("rm -f {0}.pid {0}.rc".format(dest_path))
+        cmds.append("exit $rc")
+        cmd = " ; ".join(cmds)
+
+        job_name = "close_streams_%s" % Platform.generate_unique_id() if job_name is None else job_name
+
+        # Run command and wait for it to finish
+        self.proc.run(job_name, cmd, **kwargs)
+        self.proc.wait_process(job_name)
+        return job_name
+
     def mkdir(self, dir_path, job_name=None, log=False, wait=False, **kwargs):
         # Makes a directory if it doesn't already exists
         cmd_generator = StorageHelper.__get_storage_cmd_generator(dir_path)
@@ -67,8 +152,16 @@ class StorageHelper(object):
 
     def get_file_size(self, path, job_name=None, **kwargs):
         # Return file size in gigabytes
-        cmd_generator = StorageHelper.__get_storage_cmd_generator(path)
-        cmd = cmd_generator.get_file_size(path)
+        # If given a list of paths, return list with size of each path from a single command
+        paths = path if isinstance(path, list) else [path]
+
+        # Print a marker before the size of each path so output can be matched to paths
+        cmds = []
+        for i, curr_path in enumerate(paths):
+            cmd_generator = StorageHelper.__get_storage_cmd_generator(curr_path)
+            cmds.append("echo '#%d'" % i)
+            cmds.append(cmd_generator.get_file_size(curr_path))
+        cmd = " && ".join(cmds)
 
         # Run command and return job name
         job_name = "get_size_%s" % Platform.generate_unique_id() if job_name is None else job_name
@@ -78,13 +171,57 @@ class StorageHelper(object):
         try:
             # Try to return file size in gigabytes
             out, err = self.proc.wait_process(job_name)
-            # Iterate over all files if multiple files (can happen if wildcard)
-            bytes = [int(x.split()[0]) for x in out.split("\n") if x != ""]
-            # Add them up and divide by billion bytes
-            return sum(bytes)/(1024**3.0)
+            # Iterate over all files of each path if multiple files (can happen if wildcard)
+            bytes = [0] * len(paths)
+            path_index = 0
+            for line in out.split("\n"):
+                if line.startswith("#"):
+                    path_index = int(line[1:])
+                elif line != "":
+                    bytes[path_index] += int(line.split()[0])
+            # Divide by billion bytes
+            sizes = [path_bytes/(1024**3.0) for path_bytes in bytes]
+            return sizes if isinstance(path, list) else sizes[0]
 
         except BaseException as e:
-            logging.error("Unable to get file size: %s" % path)
+            logging.error("Unable to get file size: %s" % (", ".join(paths)))
+            if str(e) != "":
+                logging.error("Received the following msg:\n%s" % e)
+            raise
+
+    def get_file_checksum(self, path, job_name=None, **kwargs):
+        # Return checksum identifying contents of file
+        # If given a list of paths, return list with checksum of each path from a single command
+        paths = path if isinstance(path, list) else [path]
+
+        # Print a marker before the checksums of each path so output can be matched to paths
+        cmds = []
+        for i, curr_path in enumerate(paths):
+            cmd_generator = StorageHelper.__get_storage_cmd_generator(curr_path)
+            cmds.append("echo '#%d'" % i)
+            cmds.append(cmd_generator.get_file_checksum(curr_path))
+        cmd = " && ".join(cmds)
+
+        # Run command and return job name
+        job_name = "get_checksum_%s" % Platform.generate_unique_id() if job_name is None else job_name
+        self.proc.run(job_name, cmd, **kwargs)
+
+        # Wait for cmd to finish and get output
+        try:
+            out, err = self.proc.wait_process(job_name)
+            # Combine checksums of all files of each path if multiple files (can happen if wildcard or directory)
+            lines = [[] for _ in paths]
+            path_index = 0
+            for line in out.split("\n"):
+                if line.startswith("#"):
+                    path_index = int(line[1:])
+                elif line.strip() != "":
+                    lines[path_index].append(line.strip())
+            checksums = [hashlib.md5("\n".join(path_lines).encode("utf8")).hexdigest() for path_lines in lines]
+            return checksums if isinstance(path, list) else checksums[0]
+
+        except BaseException as e:
+            logging.error("Unable to get file checksum: %s" % (", ".join(paths)))
             if str(e) != "":
                 logging.error("Received the following msg:\n%s" % e)
             raise
@@ -106,14 +243,27 @@ class StorageHelper(object):
             self.proc.wait_process(job_name)
         return job_name
 
+    @staticmethod
+    def __add_chmod_cmd(cmd, src_paths, dest_path, mode):
+        # Change permissions of the files a transfer command puts on the processor once the transfer succeeds
+        # Files only need permissions when they're copied onto the processor
+        if StorageHelper.get_file_protocol(dest_path) != "Local":
+            return cmd
+
+        # Sources are copied into dest_path if it's an existing directory, otherwise the single source becomes dest_path
+        # Paths are left unquoted so wildcards in source names match the files that were transferred
+        dir_paths = " ".join([os.path.join(dest_path, StorageHelper.get_base_filename(src_path)) for src_path in src_paths])
+        return "if [ -d {0} ] ; then dest_paths=\"{1}\" ; else dest_paths={0} ; fi ; " \
+               "( {2} ) && sudo chmod -R {3} $dest_paths".format(dest_path, dir_paths, cmd, mode)
+
     @staticmethod
     def __get_storage_cmd_generator(src_path, dest_path=None):
         # Determine the class of file handler to use base on input file protocol types
 
         # Get file storage protocol for src, dest files
-        protocols = [StorageHelper.__get_file_protocol(src_path)]
+        protocols = [StorageHelper.get_file_protocol(src_path)]
         if dest_path is not None:
-            protocols.append(StorageHelper.__get_file_protocol(dest_path))
+            protocols.append(StorageHelper.get_file_protocol(dest_path))
 
         # Remove 'Local' protocol
         while "Local" in protocols:
@@ -139,7 +289,7 @@ class StorageHelper(object):
         raise InvalidStorageTypeError("Cannot handle input file storage type!")
 
     @staticmethod
-    def __get_file_protocol(path):
+    def get_file_protocol(path):
         if ":" not in path:
             return "Local"
         return path.split(":")[0]
@@ -162,6 +312,17 @@ class LocalStorageCmdGenerator(StorageCmdGenerator):
         # Move a file from one directory to another
         return "sudo mv %s %s" % (src_path, dest_dir)
 
+    @staticmethod
+    def bulk_mv(src_paths, dest_dir, manifest):
+        # Move files listed in a manifest to a directory one at a time and print the result of each move
+        # Files already moved by an earlier run of the command are skipped
+        return "printf '%s\\n' {0} > {1} ; rc=0 ; echo 'Source,Destination,Result,Description' ; " \
+               "while read -r src ; do " \
+               "if sudo mv $src {2} ; then echo \"$src,{2},OK,\" ; " \
+               "elif [ -e {2}/$(basename $src) ] ; then echo \"$src,{2},skip,Already moved\" ; " \
+               "else echo \"$src,{2},error,Unable to move file\" ; rc=1 ; fi ; " \
+               "done < {1} ; exit $rc".format(" ".join(src_paths), manifest, dest_dir)
+
     @staticmethod
     def mkdir(dir_path):
         # Makes a directory if it doesn't already exists
@@ -172,10 +333,20 @@ class LocalStorageCmdGenerator(StorageCmdGenerator):
         # Return cmd for getting file size in bytes
         return "sudo du -sh --apparent-size --bytes %s" % path
 
+    @staticmethod
+    def get_file_checksum(path):
+        # Return cmd for getting size and modification time of each file instead of reading whole files
+        return "sudo find -L %s -type f -printf '%%p %%s %%T@\\n' | sort" % path
+
     @staticmethod
     def ls(path):
         return "sudo ls %s" % path
 
+    @staticmethod
+    def cat(path):
+        # Write file contents to stdout
+        return "cat %s" % path
+
     @staticmethod
     def rm(path):
         # Dear god do not give sudo privileges to this command
@@ -192,6 +363,16 @@ class GoogleStorageCmdGenerator(StorageCmdGenerator):
         options_fast = '-m -o "GSUtil:sliced_object_download_max_components=200"'
         return "sudo gsutil %s cp -r %s %s" % (options_fast, src_path, dest_dir)
 
+    @staticmethod
+    def bulk_mv(src_paths, dest_dir, manifest):
+        # Copy files listed in a manifest with one parallel gsutil call
+        # Gsutil logs the result of each copy and skips files the log already marks as copied if the command is rerun
+        options_fast = '-m -o "GSUtil:sliced_object_download_max_components=200"'
+        status_log = "%s.status" % manifest
+        return "printf '%s\\n' {0} > {1} ; " \
+               "sudo gsutil {2} cp -r -c -L {3} -I {4} < {1} ; rc=$? ; " \
+               "cat {3} ; exit $rc".format(" ".join(src_paths), manifest, options_fast, status_log, dest_dir)
+
     @staticmethod
     def mkdir(dir_path):
         # Makes a directory if it doesn't already exists
@@ -202,10 +383,20 @@ class GoogleStorageCmdGenerator(StorageCmdGenerator):
         # Return cmd for getting file size in bytes
         return "gsutil du -s %s" % path
 
+    @staticmethod
+    def get_file_checksum(path):
+        # Return cmd for getting crc32c checksum of each object
+        return "gsutil ls -L -r %s | grep -E '^gs://|Hash \\(crc32c\\)'" % path
+
     @staticmethod
     def ls(path):
         return "gsutil ls %s" % path
 
+    @staticmethod
+    def cat(path):
+        # Write file contents to stdout
+        return "gsutil cat %s" % path
+
     @staticmethod
     def rm(path):
         return "gsutil rm -r %s" % path
@@ -1,5 +1,8 @@
+from .OutputBuffer import OutputBuffer
 from .Process import Process
+from .AgentChannel import AgentChannel, AgentChannelError, AgentProcess
 from .Processor import Processor
+from .SlotProcessor import SlotProcessor
 from .Platform import Platform
 from .StorageHelper import StorageHelper
 from .DockerHelper import DockerHelper
@@ -0,0 +1,35 @@
+import logging
+
+from System.Platform import Platform
+
+class SimulatedPlatform(Platform):
+    # Platform that only keeps track of reserved resources so task admission can be simulated without creating processors
+
+    def __init__(self, name, platform_config_file, config_spec):
+
+        # Parse platform config with the spec of the platform being simulated
+        self.CONFIG_SPEC = config_spec
+
+        super(SimulatedPlatform, self).__init__(name, platform_config_file, final_output_dir="/")
+
+        # Processors aren't reused or shared between tasks in a simulation
+        self.locality_handoff   = False
+        self.pool_idle_ttl      = 0
+        self.packing_host_cpus  = 0
+
+    def init_task_processor(self, name, nr_cpus, mem, disk_space):
+        logging.error("Simulated platform cannot create processor '%s'!" % name)
+        raise RuntimeError("Cannot create processors on a simulated platform!")
+
+    def init_helper_processor(self, name, nr_cpus, mem, disk_space):
+        logging.error("Simulated platform cannot create processor '%s'!" % name)
+        raise RuntimeError("Cannot create processors on a simulated platform!")
+
+    def publish_report(self, report):
+        pass
+
+    def validate(self):
+        pass
+
+    def clean_up(self):
+        pass
@@ -0,0 +1,242 @@
+import math
+import json
+import heapq
+import random
+import logging
+import importlib
+from collections import OrderedDict
+
+from Config import ConfigParser
+from System.Graph import Graph
+from System.GAPipeline import GAPReport
+from System.Simulation import SimulatedPlatform
+
+class Simulator(object):
+    # Discrete-event simulation of a pipeline run used to predict its makespan, peak resource use, and cost
+    # Tasks are launched in critical path order and admitted by the platform the same way as in a real run
+    # but their processors only exist on a virtual clock
+
+    def __init__(self, graph_config, platform_config, platform_module, simulation_config, runtime_report=None):
+
+        # Paths to config files
+        self.__graph_config         = graph_config
+        self.__platform_config      = platform_config
+
+        # Platform config is validated against the spec of the platform being simulated
+        plat_module                 = importlib.import_module(platform_module)
+        self.__platform_config_spec = plat_module.__dict__[platform_module].CONFIG_SPEC
+
+        # Parse and validate simulation config
+        simulation_config_spec  = "System/Simulation/Simulator.validate"
+        config_parser           = ConfigParser(simulation_config, simulation_config_spec)
+        self.config             = config_parser.get_config()
+
+        # Random number generator used to sample task durations and preemptions
+        self.random = random.Random(self.config["seed"])
+
+        # Mean runtime (sec) of each task declared in the graph config
+        # Runtimes declared in the simulation config override runtimes from a previous run
+        self.runtimes = {}
+        if runtime_report is not None:
+            self.runtimes.update(GAPReport.get_task_runtimes(runtime_report))
+        for task_id, task_config in self.config["tasks"].items():
+            if task_config["runtime"] is not None:
+                self.runtimes[task_id] = task_config["runtime"]
+
+    def run(self):
+        # Simulate the pipeline the requested number of times
+        results = []
+        for i in range(self.config["num_runs"]):
+            logging.debug("Simulating run %d of %d..." % (i + 1, self.config["num_runs"]))
+            results.append(self.__simulate())
+        return SimulationReport(results)
+
+    def __simulate(self):
+
+        graph = Graph(self.__graph_config)
+        graph.set_runtime_estimates(self.runtimes)
+        platform = SimulatedPlatform("simulation", self.__platform_config, self.__platform_config_spec)
+
+        result = OrderedDict()
+        result["makespan"]          = 0
+        result["cost"]              = 0
+        result["peak_nr_cpus"]      = 0
+        result["peak_mem"]          = 0
+        result["peak_disk_space"]   = 0
+        result["num_tasks"]         = 0
+        result["num_preemptions"]   = 0
+
+        # Tasks waiting on platform resources in the order they were launched
+        waiting = OrderedDict()
+
+        # Heap of running tasks ordered by the time they finish
+        running = []
+
+        clock = 0
+        while not graph.is_complete():
+
+            # Launch tasks on the longest path to the end of the pipeline first
+            ready_tasks = graph.pop_ready_tasks()
+            priorities = {task.get_ID(): graph.get_priority(task.get_ID()) for task in ready_tasks}
+            ready_tasks.sort(key=lambda x: priorities[x.get_ID()], reverse=True)
+            for task in ready_tasks:
+                nr_cpus, mem, disk_space = self.__get_task_resources(task, platform)
+                request = platform.request_resources(task.get_ID(), nr_cpus, mem, disk_space, priority=priorities[task.get_ID()])
+                waiting[task.get_ID()] = (task, request)
+
+            # Start running tasks that have been admitted by the platform
+            for task_id, (task, request) in list(waiting.items()):
+                if not request.is_granted():
+                    continue
+                waiting.pop(task_id)
+                duration, cost, num_preemptions = self.__run_task(task, request.nr_cpus, request.mem)
+                heapq.heappush(running, (clock + duration, result["num_tasks"], task))
+                result["cost"]              += cost
+                result["num_tasks"]         += 1
+                result["num_preemptions"]   += num_preemptions
+
+            result["peak_nr_cpus"]      = max(result["peak_nr_cpus"], platform.cpu)
+            result["peak_mem"]          = max(result["peak_mem"], platform.mem)
+            result["peak_disk_space"]   = max(result["peak_disk_space"], platform.disk_space)
+
+            if len(running) == 0:
+                logging.error("Simulation stalled with %d tasks waiting on platform resources!" % len(waiting))
+                raise RuntimeError("Simulation stalled!")
+
+            # Advance clock to the next task that finishes
+            clock, _, task = heapq.heappop(running)
+            platform.release_resources(task.get_ID())
+
+            # Split subgraph if task is a splitter
+            if task.is_splitter_task():
+                self.__make_splits(task)
+                graph.split_graph(task.get_ID())
+
+            graph.set_complete(task.get_ID())
+
+        result["makespan"] = clock
+        return result
+
+    def __run_task(self, task, nr_cpus, mem):
+        # Return time (sec) a task holds its processor, the processor cost, and the number of times it was preempted
+        task_config = self.__get_task_config(task)
+
+        runtime     = self.runtimes.get(task.get_ID().split(".")[0], self.config["default_runtime"])
+        runtime_cv  = self.config["runtime_cv"] if task_config.get("runtime_cv") is None else task_config["runtime_cv"]
+
+        # Inputs are loaded before and outputs saved after the task command runs
+        transfer_time = (task_config.get("input_size", 0) + task_config.get("output_size", 0)) / self.config["transfer_rate"]
+
+        # Processors are preemptible when preemptions are expected
+        is_preemptible = self.config["preemption_rate"] > 0
+
+        duration, cost, num_preemptions = 0, 0, 0
+        while True:
+            attempt_time = self.__sample(self.config["boot_time"], self.config["boot_time_cv"]) \
+                           + transfer_time + self.__sample(runtime, runtime_cv)
+
+            if is_preemptible:
+                price = nr_cpus * self.config["preemptible_cpu_price"] + mem * self.config["preemptible_mem_price"]
+
+                # Start over on a new processor if the processor is preempted before the task finishes
+                preempted_after = self.random.expovariate(self.config["preemption_rate"] / 3600.0)
+                if preempted_after < attempt_time:
+                    duration += preempted_after
+                    cost += price * preempted_after / 3600
+                    num_preemptions += 1
+
+                    # Switch to a standard processor once out of resets
+                    if num_preemptions >= self.config["max_resets"]:
+                        is_preemptible = False
+                    continue
+            else:
+                price = nr_cpus * self.config["cpu_price"] + mem * self.config["mem_price"]
+
+            duration += attempt_time
+            cost += price * attempt_time / 3600
+            return duration, cost, num_preemptions
+
+    def __get_task_resources(self, task, platform):
+        # Return CPUs, memory, and disk space requested by a task
+        task_config = self.__get_task_config(task)
+        module_args = task.module.get_arguments()
+        config_args = task.get_graph_config_args()
+
+        # Resources declared in simulation config take precedence over the graph config and module defaults
+        resources = {}
+        for arg_type in ["nr_cpus", "mem"]:
+            if task_config.get(arg_type) is not None:
+                resources[arg_type] = task_config[arg_type]
+            elif arg_type in config_args:
+                resources[arg_type] = config_args[arg_type]
+            elif arg_type in module_args and module_args[arg_type].get_default_value() is not None:
+                resources[arg_type] = module_args[arg_type].get_default_value()
+            else:
+                resources[arg_type] = 1
+
+        # CPUs = 'max' converted to platform maximum cpus
+        nr_cpus = resources["nr_cpus"]
+        if isinstance(nr_cpus, str) and nr_cpus.lower() == "max":
+            nr_cpus = platform.get_max_nr_cpus()
+        nr_cpus = min(int(nr_cpus), platform.get_max_nr_cpus())
+
+        # Memory can be platform max or scale with nr_cpus (e.g. 'nr_cpus * 1.5')
+        mem = resources["mem"]
+        if isinstance(mem, str) and mem.lower() == "max":
+            mem = platform.get_max_mem()
+        elif isinstance(mem, str) and "nr_cpus" in mem.lower():
+            mem = int(eval(mem.lower().replace("nr_cpus", str(nr_cpus))))
+        mem = min(int(mem), platform.get_max_mem())
+
+        # Disk needs room for the input files
+        input_multiplier = platform.config.get("input_multiplier", 5)
+        disk_space = platform.get_min_disk_space() + int(math.ceil(input_multiplier * task_config.get("input_size", 0)))
+        disk_space = min(disk_space, platform.get_max_disk_space())
+
+        return nr_cpus, mem, disk_space
+
+    def __make_splits(self, task):
+        # Give splitter the number of splits declared in the simulation config
+        task_config = self.__get_task_config(task)
+        num_splits = self.config["default_splits"] if task_config.get("splits") is None else task_config["splits"]
+        for i in range(num_splits):
+            task.module.make_split(split_id="split%d" % i)
+
+    def __get_task_config(self, task):
+        # Split tasks share the simulation config of the task they were split from
+        return self.config["tasks"].get(task.get_ID().split(".")[0], {})
+
+    def __sample(self, mean, cv):
+        # Sample from a log-normal distribution with the given mean and coefficient of variation
+        if mean <= 0 or cv <= 0:
+            return mean
+        sigma_sq = math.log(1 + cv ** 2)
+        return self.random.lognormvariate(math.log(mean) - sigma_sq / 2, math.sqrt(sigma_sq))
+
+
+class SimulationReport(object):
+    # Predicted makespan (sec), cost, and peak resource use across simulated runs of a pipeline
+
+    def __init__(self, results):
+        self.results = results
+
+    def to_dict(self):
+        report = OrderedDict()
+        report["num_runs"] = len(self.results)
+        for key in ["makespan", "cost", "peak_nr_cpus", "peak_mem", "peak_disk_space", "num_preemptions"]:
+            values = sorted([result[key] for result in self.results])
+            report[key] = OrderedDict()
+            report[key]["mean"] = sum(values) / len(values)
+            report[key]["p50"]  = self.__get_percentile(values, 50)
+            report[key]["p90"]  = self.__get_percentile(values, 90)
+            report[key]["max"]  = values[-1]
+        report["runs"] = self.results
+        return report
+
+    def __str__(self):
+        return json.dumps(self.to_dict(), indent=4)
+
+    @staticmethod
+    def __get_percentile(values, percentile):
+        # Nearest-rank percentile of sorted values
+        return values[max(0, int(math.ceil(percentile / 100.0 * len(values))) - 1)]
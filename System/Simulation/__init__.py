@@ -0,0 +1,2 @@
+from .SimulatedPlatform import SimulatedPlatform
+from .Simulator import Simulator, SimulationReport
@@ -40,6 +40,9 @@ class InputValidator(Validator):
         # Wait for all tasks to finish
         self.thread_pool.wait_completion()
 
+        # Get checksums of all input files that were found
+        self.__set_checksums(inputs["resource"] + inputs["sample"])
+
         # Run through all files and see if they've been validated
         for input_file_src in inputs:
             for input_file in inputs[input_file_src]:
@@ -75,6 +78,24 @@ class InputValidator(Validator):
 
         return has_errors
 
+    def __set_checksums(self, input_files):
+        # Set checksums of input files found during validation with a single command
+        input_files = [input_file for input_file in input_files
+                       if input_file.is_flagged("validated") and not input_file.is_flagged("validation_failed")
+                       and not input_file.is_flagged("missing")]
+        if len(input_files) == 0:
+            return
+
+        try:
+            checksums = self.storage_helper.get_file_checksum([input_file.get_transferrable_path() for input_file in input_files],
+                                                              job_name="get_checksum_inputs")
+        except BaseException:
+            self.report_error("Could not determine checksums of input files! Check error log for details.")
+            return
+
+        for input_file, checksum in zip(input_files, checksums):
+            input_file.set_checksum(checksum)
+
     @staticmethod
     def __get_input_desc(input_obj, input_source):
         # Return an informative description about an input
@@ -181,3 +202,8 @@ class InputWorker(PoolWorker):
             job_name = "get_size_%s" % docker_obj.get_ID()
             image_size = self.docker_helper.get_image_size(image_name, job_name=job_name)
             docker_obj.set_size(image_size)
+
+            # Get/set content digest of docker image
+            job_name = "get_digest_%s" % docker_obj.get_ID()
+            image_digest = self.docker_helper.get_image_digest(image_name, job_name=job_name)
+            docker_obj.set_digest(image_digest)